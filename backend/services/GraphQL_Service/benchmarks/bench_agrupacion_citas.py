@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark de usuarios_con_citas_*: bucles anidados vs agrupación en una pasada.
+
+Solo mide el cruce en memoria (sin HTTP) con objetos Usuario/Cita/Servicio
+reales. El algoritmo anterior es O(U×C×S): con el tamaño completo tardaría
+horas, así que se mide sobre una fracción (--fraccion) y se extrapola
+linealmente en U×C (cota baja: el next() sobre servicios suma más). Sobre esa
+fracción también se comprueba que ambos dan el mismo resultado.
+
+Uso (desde backend/services/GraphQL_Service):
+    JWT_SECRET=x python benchmarks/bench_agrupacion_citas.py [--usuarios 10000] [--citas 200000] [--servicios 1000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gql_types.cita_types import Cita
+from gql_types.servicio_types import Servicio
+from gql_types.usuario_types import CitaInfo, Usuario, UsuarioCitasDTO
+from resolvers.usuarios_resolver import UsuariosResolver
+
+
+def generar(usuarios: int, citas: int, servicios: int):
+    random.seed(11)
+    lista_usuarios = [
+        Usuario(id=f"u{i}", email=f"u{i}@x.com", password="-", rol="cliente",
+                nombre_completo=f"Usuario {i}", creadoEn="2025-01-01T00:00:00")
+        for i in range(usuarios)
+    ]
+    lista_servicios = [
+        Servicio(id=f"s{i}", negocio_id=f"n{i % 50}", nombre=f"Servicio {i}", duracion_minutos=30, precio_centavos=1000)
+        for i in range(servicios)
+    ]
+    lista_citas = [
+        Cita(id=f"c{i}", cliente_id=f"u{random.randrange(usuarios)}", negocio_id="n1",
+             servicio_id=f"s{random.randrange(servicios)}", fecha="2025-06-01",
+             hora_inicio="10:00:00", hora_fin="11:00:00", estado="pendiente")
+        for i in range(citas)
+    ]
+    return lista_usuarios, lista_citas, lista_servicios
+
+
+def anidado(usuarios, citas, servicios):
+    """Implementación anterior de usuarios_con_citas_pendientes."""
+    result = []
+    for usuario in usuarios:
+        user_citas = [c for c in citas if c.cliente_id == usuario.id]
+        if user_citas:
+            citas_info = []
+            for cita in user_citas:
+                servicio = next((s for s in servicios if s.id == cita.servicio_id), None)
+                citas_info.append(CitaInfo(fecha=cita.fecha, servicio=servicio.nombre if servicio else None))
+            result.append(UsuarioCitasDTO(usuario=usuario.nombre_completo, citas=citas_info))
+    return result
+
+
+def resumen(resultado):
+    return [(d.usuario, [(c.fecha, c.servicio) for c in d.citas]) for d in resultado]
+
+
+def cronometrar(funcion, *args):
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--usuarios", type=int, default=10_000)
+    parser.add_argument("--citas", type=int, default=200_000)
+    parser.add_argument("--servicios", type=int, default=1_000)
+    parser.add_argument("--fraccion", type=float, default=0.05, help="Fracción de usuarios y citas para el algoritmo anterior")
+    args = parser.parse_args()
+
+    usuarios, citas, servicios = generar(args.usuarios, args.citas, args.servicios)
+    print(f"{args.usuarios} usuarios, {args.citas} citas, {args.servicios} servicios")
+
+    resultado, segundos = cronometrar(UsuariosResolver.agrupar_citas_por_usuario, usuarios, citas, servicios)
+    print(f"  una pasada (completo): {segundos * 1000:10.1f} ms  ({len(resultado)} usuarios con citas)")
+
+    u_sub, c_sub = int(args.usuarios * args.fraccion), int(args.citas * args.fraccion)
+    sub_usuarios, sub_citas, _ = generar(u_sub, c_sub, args.servicios)
+    esperado, segundos_anidado = cronometrar(anidado, sub_usuarios, sub_citas, servicios)
+    obtenido, segundos_pasada = cronometrar(UsuariosResolver.agrupar_citas_por_usuario, sub_usuarios, sub_citas, servicios)
+    assert resumen(esperado) == resumen(obtenido), "los resultados no coinciden"
+
+    escala = (args.usuarios * args.citas) / (u_sub * c_sub)
+    print(f"  fracción {args.fraccion:g} ({u_sub} usuarios, {c_sub} citas), mismo resultado:")
+    print(f"    anidado   : {segundos_anidado * 1000:10.1f} ms")
+    print(f"    una pasada: {segundos_pasada * 1000:10.1f} ms")
+    print(f"  anidado extrapolado al completo: ~{segundos_anidado * escala:,.0f} s "
+          f"(x{segundos_anidado * escala / segundos:,.0f} más lento)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los agregados de citas (services/agregados.py) y su motor
+columnar (services/analitica.py) a 1M de citas.
+
+Parte del JSON ya parseado (lista de dicts, como lo devuelve la REST API) y
+mide lo que corre la app en cada carga o refresco de un ámbito
+(AgregadoCitas.aplicar recalcula todo con la tabla columnar) frente a
+contar cita por cita, con el mismo resultado. El refresco tras cambiar
+una fracción CAMBIADAS de las citas cuesta lo mismo que la carga.
+
+Los informes leen de los contadores ya calculados, así que no se miden aquí.
+
+Uso (desde backend/services/GraphQL_Service):
+    JWT_SECRET=x python benchmarks/bench_analitica.py [citas] [servicios] [estaciones] [cambiadas]
+"""
+import os
+import random
+import sys
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gql_types.enums import EstadoCita
+from services.agregados import AgregadoCitas
+from services.analitica import dia_de
+
+CITAS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+SERVICIOS = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000
+ESTACIONES = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+CAMBIADAS = float(sys.argv[4]) if len(sys.argv) > 4 else 0.01
+ESTADOS = ("pendiente", "atendida", "cancelada")
+
+
+def generar():
+    random.seed(3)
+    inicio = date(2025, 1, 1)
+    dias = [(inicio + timedelta(days=d)).isoformat() for d in range(365)]
+    return [
+        {
+            "id": f"c{i}", "cliente_id": f"u{i % 10_000}", "negocio_id": "n1",
+            "servicio_id": f"s{random.randrange(SERVICIOS)}", "estacion_id": f"e{random.randrange(ESTACIONES)}",
+            "fecha": random.choice(dias), "estado": random.choice(ESTADOS)
+        }
+        for i in range(CITAS)
+    ]
+
+
+def modificar(citas):
+    """Copia de la lista con una fracción CAMBIADAS de citas en otro estado."""
+    random.seed(7)
+    nuevas = list(citas)
+    for i in random.sample(range(len(citas)), int(len(citas) * CAMBIADAS)):
+        nuevas[i] = {**citas[i], "estado": random.choice([e for e in ESTADOS if e != citas[i]["estado"]])}
+    return nuevas
+
+
+def cronometrar(funcion, *args):
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def por_cita(citas):
+    """Contadores sumando cita por cita (lo que hacía aplicar antes del motor columnar)."""
+    resultado = AgregadoCitas("n1")
+    atendida = EstadoCita.ATENDIDA.value
+    for cita in citas:
+        estado, servicio_id, dia = cita.get("estado"), cita.get("servicio_id"), dia_de(cita.get("fecha"))
+        resultado.por_estado[estado] += 1
+        resultado.por_servicio[servicio_id] += 1
+        resultado.por_estacion.setdefault(cita.get("estacion_id"), Counter())[estado] += 1
+        resultado.por_dia[dia] += 1
+        if estado == atendida:
+            resultado.atendidas_servicio_dia[(servicio_id, dia)] += 1
+    resultado.total = len(citas)
+    return resultado
+
+
+def vectorizado(citas):
+    resultado = AgregadoCitas("n1")
+    resultado.aplicar(citas)
+    return resultado
+
+
+def iguales(a, b):
+    for campo in ("total", "por_estado", "por_servicio", "por_dia", "atendidas_servicio_dia", "por_estacion"):
+        assert getattr(a, campo) == getattr(b, campo), campo
+
+
+def main() -> None:
+    citas = generar()
+    print(f"{CITAS} citas, {SERVICIOS} servicios, {ESTACIONES} estaciones")
+
+    esperado, t_por_cita = cronometrar(por_cita, citas)
+    agregado, t_vectorizado = cronometrar(vectorizado, citas)
+    iguales(esperado, agregado)
+    print("Carga de agregados (mismo resultado):")
+    print(f"  cita por cita: {t_por_cita * 1000:9.1f} ms")
+    print(f"  vectorizado  : {t_vectorizado * 1000:9.1f} ms  (x{t_por_cita / t_vectorizado:.1f})")
+
+    modificadas = modificar(citas)
+    _, t_refresco = cronometrar(agregado.aplicar, modificadas)
+    iguales(por_cita(modificadas), agregado)
+    print(f"Refresco con {CAMBIADAS:.0%} de citas cambiadas: {t_refresco * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
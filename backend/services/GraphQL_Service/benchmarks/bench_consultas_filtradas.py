@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark de listados filtrados en la REST API vs descargar todo y filtrar.
+
+Levanta una REST API de prueba con uvicorn que, como la real, filtra
+/api/citas/ por negocio_id o cliente_id y /api/servicios por negocio_id.
+Compara, por escenario, los bytes recibidos y la latencia:
+
+  - resumen_negocio: citas y servicios de un negocio
+  - citas de un cliente (perfil_completo_usuario, informe PDF)
+
+"antes" replica el patrón anterior (find_all + comprensión de lista) y
+"ahora" usa los resolvers con Consulta.
+
+Uso (desde backend/services/GraphQL_Service):
+    JWT_SECRET=x python benchmarks/bench_consultas_filtradas.py [citas] [negocios] [clientes] [repeticiones]
+"""
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import sys
+import threading
+import time
+from urllib.parse import parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn
+
+CITAS = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+NEGOCIOS = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+CLIENTES = int(sys.argv[3]) if len(sys.argv) > 3 else 5_000
+REPETICIONES = int(sys.argv[4]) if len(sys.argv) > 4 else 10
+
+random.seed(7)
+DATOS_CITAS = [
+    {
+        "id": f"c{i}", "cliente_id": f"u{random.randrange(CLIENTES)}", "negocio_id": f"n{random.randrange(NEGOCIOS)}",
+        "estacion_id": "e1", "servicio_id": f"s{random.randrange(NEGOCIOS * 5)}", "fecha": "2025-06-01",
+        "hora_inicio": "10:00:00", "hora_fin": "11:00:00", "estado": random.choice(["pendiente", "atendida", "cancelada"])
+    }
+    for i in range(CITAS)
+]
+DATOS_SERVICIOS = [
+    {"id": f"s{i}", "negocio_id": f"n{i % NEGOCIOS}", "nombre": f"Servicio {i}", "duracion_minutos": 30, "precio_centavos": 1500}
+    for i in range(NEGOCIOS * 5)
+]
+bytes_enviados = 0
+
+
+def _filtrar(items, query, campos):
+    for campo in campos:
+        valor = query.get(campo)
+        if valor:
+            return [item for item in items if item[campo] == valor[0]]
+    return items
+
+
+async def rest_stub(scope, receive, send):
+    """REST API de prueba con los filtros de la real."""
+    global bytes_enviados
+    if scope["type"] != "http":
+        return
+    ruta = scope["path"]
+    query = parse_qs(scope["query_string"].decode())
+    if ruta == "/api/citas/":
+        datos = _filtrar(DATOS_CITAS, query, ("negocio_id", "estacion_id", "cliente_id"))
+    elif ruta == "/api/servicios":
+        datos = _filtrar(DATOS_SERVICIOS, query, ("negocio_id",))
+    elif ruta.startswith("/api/negocios/"):
+        datos = {"id": ruta.rsplit("/", 1)[-1], "admin_negocio_id": "u0", "nombre": "Negocio", "categoria": "spa", "estado": "activo"}
+    else:
+        datos = []
+    cuerpo = json.dumps(datos).encode()
+    bytes_enviados += len(cuerpo)
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": cuerpo})
+
+
+def levantar_stub() -> str:
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    puerto = sock.getsockname()[1]
+    servidor = uvicorn.Server(uvicorn.Config(rest_stub, log_level="warning", lifespan="off"))
+    threading.Thread(target=servidor.run, kwargs={"sockets": [sock]}, daemon=True).start()
+    while not servidor.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{puerto}"
+
+
+async def medir(nombre: str, llamada) -> None:
+    global bytes_enviados
+    latencias = []
+    bytes_enviados = 0
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        await llamada()
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    print(
+        f"  {nombre:>6}: {bytes_enviados / REPETICIONES / 1024:10.1f} KiB/consulta  "
+        f"p50 {statistics.median(latencias):8.2f} ms  max {max(latencias):8.2f} ms"
+    )
+
+
+async def main() -> None:
+    from config import config
+    config.REST_API_BASE_URL = levantar_stub()
+    from services.http_client import http_client
+    from resolvers.citas_resolver import CitasResolver
+    from resolvers.negocios_resolver import NegociosResolver
+    from resolvers.servicios_resolver import ServiciosResolver
+    http_client.base_url = config.REST_API_BASE_URL
+    await http_client.start()
+
+    negocio_id, cliente_id = "n7", "u42"
+
+    async def resumen_antes():
+        negocio = await NegociosResolver.find_one(negocio_id)
+        servicios = await ServiciosResolver.find_all()
+        citas = await CitasResolver.find_all()
+        return negocio, [s for s in servicios if s.negocio_id == negocio_id], [c for c in citas if c.negocio_id == negocio_id]
+
+    async def citas_cliente_antes():
+        return [c for c in await CitasResolver.find_all() if c.cliente_id == cliente_id]
+
+    print(f"{CITAS} citas, {NEGOCIOS} negocios, {CLIENTES} clientes; {REPETICIONES} repeticiones")
+    print("resumen_negocio:")
+    await medir("antes", resumen_antes)
+    await medir("ahora", lambda: NegociosResolver.resumen_negocio(negocio_id))
+    print("citas de un cliente:")
+    await medir("antes", citas_cliente_antes)
+    await medir("ahora", lambda: CitasResolver.find_by(cliente_id=cliente_id))
+
+    await http_client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
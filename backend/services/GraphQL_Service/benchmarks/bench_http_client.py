@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark del cliente HTTP hacia la REST API: un AsyncClient por llamada
+(lo que hacia services/http_client.py) vs el pool compartido.
+
+Levanta una REST API de prueba con uvicorn en un puerto local que responde
+/api/citas/ con una lista JSON fija, y mide llamadas secuenciales (como un
+resolver que encadena awaits) y concurrentes (varias queries a la vez).
+
+Uso (desde backend/services/GraphQL_Service):
+    JWT_SECRET=x python benchmarks/bench_http_client.py [llamadas] [concurrencia] [latencia_ms]
+"""
+import asyncio
+import json
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import uvicorn
+
+LLAMADAS = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+CONCURRENCIA = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+LATENCIA_MS = float(sys.argv[3]) if len(sys.argv) > 3 else 2.0
+
+CUERPO = json.dumps([
+    {"id": f"c{i}", "negocio_id": "n1", "cliente_id": f"u{i % 50}", "servicio_id": "s1", "estado": "pendiente"}
+    for i in range(100)
+]).encode()
+
+
+async def rest_stub(scope, receive, send):
+    """REST API de prueba: responde JSON tras LATENCIA_MS."""
+    if scope["type"] != "http":
+        return
+    await asyncio.sleep(LATENCIA_MS / 1000)
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": CUERPO})
+
+
+def levantar_stub() -> str:
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    puerto = sock.getsockname()[1]
+    servidor = uvicorn.Server(uvicorn.Config(rest_stub, log_level="warning", lifespan="off"))
+    threading.Thread(target=servidor.run, kwargs={"sockets": [sock]}, daemon=True).start()
+    while not servidor.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{puerto}"
+
+
+async def por_llamada(base_url: str) -> None:
+    """Patron anterior: cliente nuevo (conexion nueva) en cada request."""
+    async with httpx.AsyncClient(timeout=5) as client:
+        response = await client.get(f"{base_url}/api/citas/")
+        response.raise_for_status()
+        response.json()
+
+
+async def medir(nombre: str, llamada, concurrencia: int) -> None:
+    semaforo = asyncio.Semaphore(concurrencia)
+    latencias = []
+
+    async def una():
+        async with semaforo:
+            inicio = time.perf_counter()
+            await llamada()
+            latencias.append((time.perf_counter() - inicio) * 1000)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(una() for _ in range(LLAMADAS)))
+    total = time.perf_counter() - inicio
+    latencias.sort()
+    print(
+        f"  {nombre:>22}: {LLAMADAS / total:8.0f} req/s  p50 {statistics.median(latencias):6.2f} ms  "
+        f"p95 {latencias[int(len(latencias) * 0.95)]:6.2f} ms"
+    )
+
+
+async def main() -> None:
+    base_url = levantar_stub()
+    os.environ["REST_API_BASE_URL"] = base_url
+    from services.http_client import HTTPClient
+    from config import config
+    config.REST_API_BASE_URL = base_url
+    pool = HTTPClient()
+    await pool.start()
+
+    print(f"{LLAMADAS} GET /api/citas/ ({len(CUERPO)} bytes), stub con {LATENCIA_MS} ms de latencia")
+    for concurrencia in (1, CONCURRENCIA):
+        print(f"Concurrencia {concurrencia}:")
+        await medir("cliente por llamada", lambda: por_llamada(base_url), concurrencia)
+        await medir("pool compartido", lambda: pool.get("/api/citas/"), concurrencia)
+
+    await pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -21,8 +21,38 @@ class Config:
     HOST: str = os.getenv("HOST", "0.0.0.0")
     
     # HTTP client configuration
-    HTTP_TIMEOUT: int = 5
+    HTTP_TIMEOUT: float = float(os.getenv("HTTP_TIMEOUT", "5"))
+    HTTP_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "2"))
     HTTP_MAX_REDIRECTS: int = 5
+
+    # Pool de conexiones hacia la REST API (un cliente por proceso)
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE: int = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    # HTTP/2 requiere el extra httpx[http2]
+    HTTP2: bool = os.getenv("HTTP2", "false").lower() == "true"
+
+    # Agregados de citas por negocio (dashboard, métricas, informes)
+    AGREGADOS_TTL: float = float(os.getenv("AGREGADOS_TTL", "30"))
+    AGREGADOS_MAX_NEGOCIOS: int = int(os.getenv("AGREGADOS_MAX_NEGOCIOS", "1000"))
+
+    # Tokens JWT ya verificados que se recuerdan (hasta su exp)
+    JWT_CACHE_MAX: int = int(os.getenv("JWT_CACHE_MAX", "10000"))
+
+    # Generación de PDFs en procesos aparte (services/pdf_pool.py)
+    PDF_WORKERS: int = int(os.getenv("PDF_WORKERS", str(min(2, os.cpu_count() or 1))))
+    PDF_MAX_PENDIENTES: int = int(os.getenv("PDF_MAX_PENDIENTES", "16"))
+    # Por encima de este tamaño pdfBase64 va vacío y se descarga por /informes/{tipo}
+    PDF_BASE64_MAX_BYTES: int = int(os.getenv("PDF_BASE64_MAX_BYTES", str(512 * 1024)))
+    # PDFs ya generados que urlDescarga sirve sin regenerarlos (services/descargas_pdf.py)
+    PDF_DESCARGA_TTL: float = float(os.getenv("PDF_DESCARGA_TTL", "300"))
+    PDF_DESCARGA_MAX_BYTES: int = int(os.getenv("PDF_DESCARGA_MAX_BYTES", str(64 * 1024 * 1024)))
+
+    # Caché de respuestas GraphQL (services/cache_respuestas.py)
+    RESPUESTAS_CACHE: bool = os.getenv("RESPUESTAS_CACHE", "true").lower() == "true"
+    RESPUESTAS_CACHE_MAX: int = int(os.getenv("RESPUESTAS_CACHE_MAX", "5000"))
+    # Ruta de un SQLite local para compartir la caché entre workers (vacío = solo memoria)
+    RESPUESTAS_CACHE_DB: str = os.getenv("RESPUESTAS_CACHE_DB", "")
     
 
 config = Config()
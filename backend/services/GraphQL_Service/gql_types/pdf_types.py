@@ -1,11 +1,36 @@
+import base64
+from urllib.parse import urlencode
+
 import strawberry
 from typing import Optional
 
+from config import config
+from services.descargas_pdf import descargas
+
 
 @strawberry.type
 class InformePDF:
     """Tipo para el resultado de generación de PDF"""
     success: bool
-    pdf_base64: str = strawberry.field(description="PDF codificado en base64")
     nombre_archivo: str = strawberry.field(description="Nombre sugerido para el archivo")
     mensaje: str = strawberry.field(description="Mensaje de éxito o error")
+    pdf: strawberry.Private[bytes] = b""
+    ruta_descarga: strawberry.Private[Optional[str]] = None  # /informes/{tipo}?...
+    sujeto: strawberry.Private[Optional[str]] = None  # usuario del JWT
+
+    @strawberry.field(description="Ruta GET (con el mismo Authorization) que descarga el PDF sin base64")
+    def url_descarga(self) -> Optional[str]:
+        if not self.ruta_descarga:
+            return None
+        # El PDF ya generado queda guardado unos minutos para esta descarga
+        token = descargas.guardar(self.sujeto, self.nombre_archivo, self.pdf) if self.pdf and self.sujeto else None
+        if token is None:
+            return self.ruta_descarga
+        separador = "&" if "?" in self.ruta_descarga else "?"
+        return f"{self.ruta_descarga}{separador}{urlencode({'descarga': token})}"
+
+    @strawberry.field(description="PDF codificado en base64 (vacío si supera PDF_BASE64_MAX_BYTES; usar url_descarga)")
+    def pdf_base64(self) -> str:
+        if not self.pdf or len(self.pdf) > config.PDF_BASE64_MAX_BYTES:
+            return ""
+        return base64.b64encode(self.pdf).decode('utf-8')
@@ -1,8 +1,19 @@
 import uvicorn
-from fastapi import FastAPI, Request
+from typing import Optional
+from urllib.parse import quote
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from strawberry.fastapi import GraphQLRouter
 from schema import schema
+from services.http_client import http_client
+from services.loaders import RestLoaders
+from services.cache_respuestas import respuestas
+from services.decode import decode_jwt
+from services.pdf_pool import generador_pdf
+from services.descargas_pdf import descargas, sujeto_de
+from resolvers.pdf_resolver import PdfResolver
+from contextlib import asynccontextmanager
 from datetime import datetime
 import logging
 
@@ -13,10 +24,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Workers de PDF arrancados antes de abrir conexiones (en Linux se crean con fork)
+    generador_pdf.start()
+    # Un solo pool de conexiones hacia la REST API para todo el proceso
+    await http_client.start()
+    yield
+    await http_client.close()
+    generador_pdf.close()
+
 app = FastAPI(
     title="Practica 6 GraphQL API",
     description="GraphQL API for managing appointments, services, and businesses",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -44,7 +66,22 @@ async def get_context(request: Request):
         logger.warning("⚠️  Request SIN Authorization header")
         logger.debug(f"Headers recibidos: {dict(request.headers)}")
     
-    return {"request": request, "auth_header": auth_header}
+    # El token se verifica una sola vez por petición; los resolvers leen los claims
+    claims, jwt_error = None, None
+    if auth_header:
+        try:
+            claims = decode_jwt(auth_header)
+        except Exception as e:
+            jwt_error = str(e)
+
+    # Loaders nuevos por operación: memoizan y agrupan las llamadas a la REST API
+    return {
+        "request": request,
+        "auth_header": auth_header,
+        "claims": claims,
+        "jwt_error": jwt_error,
+        "loaders": RestLoaders(auth_header)
+    }
 
 # GraphQL endpoint con contexto
 graphql_app = GraphQLRouter(schema, context_getter=get_context)
@@ -66,6 +103,58 @@ async def health():
         "timestamp": datetime.now().isoformat()
     }
 
+# Descarga de informes PDF como bytes (sin base64), con el mismo Authorization
+INFORMES = {
+    "usuario": PdfResolver.generar_informe_usuario,
+    "servicios-mas-solicitados": PdfResolver.generar_reporte_servicios_mas_solicitados_por_negocio,
+    "ocupacion-estaciones": PdfResolver.generar_reporte_ocupacion_estaciones,
+    "ingresos": PdfResolver.generar_reporte_ingresos,
+}
+
+@app.get("/informes/{tipo}")
+async def descargar_informe(
+    tipo: str,
+    request: Request,
+    fecha_inicio: Optional[str] = None,
+    fecha_fin: Optional[str] = None,
+    descarga: Optional[str] = None
+):
+    if tipo not in INFORMES:
+        raise HTTPException(status_code=404, detail=f"Informe desconocido: {tipo}")
+    context = await get_context(request)
+    # PDF ya generado por la query que dio esta URL (mismo usuario)
+    guardado = descargas.obtener(descarga, sujeto_de(context["claims"])) if descarga else None
+    if guardado is not None:
+        return _respuesta_pdf(*guardado)
+
+    if tipo == "ingresos":
+        informe = await INFORMES[tipo](context, fecha_inicio, fecha_fin)
+    else:
+        informe = await INFORMES[tipo](context)
+    if not informe.success:
+        status = 401 if not context["claims"] else 400
+        return JSONResponse(status_code=status, content={"success": False, "mensaje": informe.mensaje})
+    return _respuesta_pdf(informe.nombre_archivo, informe.pdf)
+
+def _respuesta_pdf(nombre: str, pdf: bytes) -> StreamingResponse:
+    def trozos(tamano: int = 64 * 1024):
+        for inicio in range(0, len(pdf), tamano):
+            yield pdf[inicio:inicio + tamano]
+
+    nombre_ascii = nombre.encode("ascii", "ignore").decode() or "informe.pdf"
+    return StreamingResponse(
+        trozos(),
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f"attachment; filename=\"{nombre_ascii}\"; filename*=UTF-8''{quote(nombre)}",
+            "Content-Length": str(len(pdf)),
+        }
+    )
+
+@app.get("/metrics/cache")
+async def metrics_cache():
+    return respuestas.metricas()
+
 if __name__ == "__main__":
     print("Application is running on: http://localhost:3001")
     print("GraphQL Playground: http://localhost:3001/graphql")
@@ -1,31 +1,49 @@
 from typing import List, Optional, Dict
-from services.http_client import http_client
+from services.http_client import Consulta
+from services.loaders import RECURSOS, RestLoaders, get_consulta, get_lista, get_por_id
+from services.agregados import agregados
 from gql_types.cita_types import Cita, MetricasTemporales
 from datetime import datetime, timedelta
 
 
-def _headers_from_token(token: Optional[str]) -> Optional[Dict[str, str]]:
-    return {"Authorization": token} if token else None
-
 class CitasResolver:
     @staticmethod
-    async def find_all(token: Optional[str] = None) -> List[Cita]:
-        """Get all appointments from REST API. If token is provided, it will be forwarded as Authorization header."""
-        headers = _headers_from_token(token)
-        data = await http_client.get("/api/citas/", headers=headers)
+    async def find_all(token: Optional[str] = None, loaders: Optional[RestLoaders] = None) -> List[Cita]:
+        """Get all appointments from REST API. If token is provided, it will be forwarded as Authorization header.
+        With the request loaders the list is downloaded once per GraphQL operation."""
+        data = await get_lista("citas", token, loaders)
         return [Cita(**cita) for cita in data]
     
     @staticmethod
-    async def find_one(id: str, token: Optional[str] = None) -> Cita:
+    async def find_by(
+        token: Optional[str] = None,
+        loaders: Optional[RestLoaders] = None,
+        *,
+        negocio_id: Optional[str] = None,
+        cliente_id: Optional[str] = None,
+        estacion_id: Optional[str] = None,
+        estado: Optional[str] = None,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None
+    ) -> List[Cita]:
+        """Get appointments filtered by the REST API where it can (negocio/estacion/cliente), the rest locally.
+        desde/hasta are inclusive ISO dates compared against fecha."""
+        consulta = Consulta(RECURSOS["citas"][0]).donde(
+            negocio_id=negocio_id, cliente_id=cliente_id, estacion_id=estacion_id, estado=estado
+        ).entre(desde, hasta)
+        data = await get_consulta(consulta, token, loaders)
+        return [Cita(**cita) for cita in data]
+
+    @staticmethod
+    async def find_one(id: str, token: Optional[str] = None, loaders: Optional[RestLoaders] = None) -> Cita:
         """Get a single appointment by ID. Forward token if provided."""
-        headers = _headers_from_token(token)
-        data = await http_client.get(f"/api/citas/{id}", headers=headers)
+        data = await get_por_id("citas", id, token, loaders)
         return Cita(**data)
     
     @staticmethod
-    async def metricas_temporales(token: Optional[str] = None) -> MetricasTemporales:
-        """Get temporal metrics for appointments"""
-        citas = await CitasResolver.find_all(token)
+    async def metricas_temporales(token: Optional[str] = None, loaders: Optional[RestLoaders] = None) -> MetricasTemporales:
+        """Get temporal metrics for appointments (from the per-day counts of all citas)"""
+        agregado = await agregados.obtener(None, token, loaders)
         
         now = datetime.now()
         today_str = now.strftime('%Y-%m-%d')
@@ -33,15 +51,10 @@ class CitasResolver:
         month_start = now.replace(day=1).strftime('%Y-%m-%d')
         tomorrow_str = (now + timedelta(days=1)).strftime('%Y-%m-%d')
         
-        total_citas = len(citas)
-        # Comparar fechas como strings ISO (funciona porque YYYY-MM-DD es ordenable)
-        citas_hoy = len([c for c in citas if c.fecha >= today_str and c.fecha < tomorrow_str])
-        citas_semana = len([c for c in citas if c.fecha >= week_start])
-        citas_mes = len([c for c in citas if c.fecha >= month_start])
-        
+        # Comparar días como strings ISO (funciona porque YYYY-MM-DD es ordenable)
         return MetricasTemporales(
-            total_citas=total_citas,
-            citas_hoy=citas_hoy,
-            citas_semana=citas_semana,
-            citas_mes=citas_mes
+            total_citas=agregado.total,
+            citas_hoy=agregado.citas_desde(today_str, tomorrow_str),
+            citas_semana=agregado.citas_desde(week_start),
+            citas_mes=agregado.citas_desde(month_start)
         )
@@ -1,12 +1,9 @@
 from typing import List, Optional, Dict
-from services.http_client import http_client
+from services.http_client import Consulta
+from services.loaders import RECURSOS, RestLoaders, get_consulta, get_lista, get_por_id
 from gql_types.estacion_types import Estacion
 
 
-def _headers_from_token(token: Optional[str]) -> Optional[Dict[str, str]]:
-    return {"Authorization": token} if token else None
-
-
 class EstacionesResolver:
     @staticmethod
     def _normalize_estacion_data(estacion_data: dict) -> dict:
@@ -18,15 +15,25 @@ class EstacionesResolver:
         return normalized
     
     @staticmethod
-    async def find_all(token: Optional[str] = None) -> List[Estacion]:
+    async def find_all(token: Optional[str] = None, loaders: Optional[RestLoaders] = None) -> List[Estacion]:
         """Get all stations from REST API. Forward token if provided."""
-        headers = _headers_from_token(token)
-        data = await http_client.get("/api/estaciones/", headers=headers)
+        data = await get_lista("estaciones", token, loaders)
+        return [Estacion(**EstacionesResolver._normalize_estacion_data(estacion)) for estacion in data]
+
+    @staticmethod
+    async def find_by(
+        token: Optional[str] = None,
+        loaders: Optional[RestLoaders] = None,
+        *,
+        negocio_id: Optional[str] = None
+    ) -> List[Estacion]:
+        """Get the stations of a business (/api/estaciones/negocio/{id} on the REST API)."""
+        consulta = Consulta(RECURSOS["estaciones"][0]).donde(negocio_id=negocio_id)
+        data = await get_consulta(consulta, token, loaders)
         return [Estacion(**EstacionesResolver._normalize_estacion_data(estacion)) for estacion in data]
 
     @staticmethod
-    async def find_one(id: str, token: Optional[str] = None) -> Estacion:
+    async def find_one(id: str, token: Optional[str] = None, loaders: Optional[RestLoaders] = None) -> Estacion:
         """Get a single station by ID. Forward token if provided."""
-        headers = _headers_from_token(token)
-        data = await http_client.get(f"/api/estaciones/{id}", headers=headers)
+        data = await get_por_id("estaciones", id, token, loaders)
         return Estacion(**EstacionesResolver._normalize_estacion_data(data))
@@ -1,12 +1,12 @@
 from typing import List, Optional, Dict
-from services.http_client import http_client
+from services.http_client import Consulta
+from services.loaders import RECURSOS, RestLoaders, get_consulta, get_lista, get_por_id
+from services.concurrencia import en_paralelo
+from services.agregados import agregados
 from gql_types.negocio_types import Negocio, DashboardNegocio, ResumenNegocio
 from gql_types.enums import EstadoCita
 
 
-def _headers_from_token(token: Optional[str]) -> Optional[Dict[str, str]]:
-    return {"Authorization": token} if token else None
-
 class NegociosResolver:
     @staticmethod
     def _normalize_negocio_data(negocio_data: dict) -> dict:
@@ -25,17 +25,27 @@ class NegociosResolver:
         return normalized
     
     @staticmethod
-    async def find_all(token: Optional[str] = None) -> List[Negocio]:
+    async def find_all(token: Optional[str] = None, loaders: Optional[RestLoaders] = None) -> List[Negocio]:
         """Get all businesses from REST API. Forward token if provided."""
-        headers = _headers_from_token(token)
-        data = await http_client.get("/api/negocios/", headers=headers)
+        data = await get_lista("negocios", token, loaders)
         return [Negocio(**NegociosResolver._normalize_negocio_data(negocio)) for negocio in data]
     
     @staticmethod
-    async def find_one(id: str, token: Optional[str] = None) -> Negocio:
+    async def find_by(
+        token: Optional[str] = None,
+        loaders: Optional[RestLoaders] = None,
+        *,
+        admin_negocio_id: Optional[str] = None
+    ) -> List[Negocio]:
+        """Get businesses by admin. The REST API has no such filter, so it is applied locally."""
+        consulta = Consulta(RECURSOS["negocios"][0]).donde(admin_negocio_id=admin_negocio_id)
+        data = await get_consulta(consulta, token, loaders)
+        return [Negocio(**NegociosResolver._normalize_negocio_data(negocio)) for negocio in data]
+
+    @staticmethod
+    async def find_one(id: str, token: Optional[str] = None, loaders: Optional[RestLoaders] = None) -> Negocio:
         """Get a single business by ID. Forward token if provided."""
-        headers = _headers_from_token(token)
-        data = await http_client.get(f"/api/negocios/{id}", headers=headers)
+        data = await get_por_id("negocios", id, token, loaders)
         # Si la API devuelve una lista, tomar el primer elemento
         if isinstance(data, list):
             if len(data) == 0:
@@ -44,45 +54,32 @@ class NegociosResolver:
         return Negocio(**NegociosResolver._normalize_negocio_data(data))
     
     @staticmethod
-    async def dashboard_negocio(negocio_id: str, token: Optional[str] = None) -> DashboardNegocio:
-        """Get business dashboard with metrics"""
-        from resolvers.servicios_resolver import ServiciosResolver
-        from resolvers.citas_resolver import CitasResolver
-
-        negocio = await NegociosResolver.find_one(negocio_id, token)
-        servicios = await ServiciosResolver.find_all(token)
-        citas = await CitasResolver.find_all(token)
-        
-        servicios_negocio = [s for s in servicios if s.negocio_id == negocio_id]
-        citas_negocio = [c for c in citas if c.negocio_id == negocio_id]
-        
-        citas_pendientes = len([c for c in citas_negocio if c.EstadoCita == EstadoCita.PENDIENTE])
-        citas_atendidas = len([c for c in citas_negocio if c.EstadoCita == EstadoCita.ATENDIDA])
+    async def dashboard_negocio(negocio_id: str, token: Optional[str] = None, loaders: Optional[RestLoaders] = None) -> DashboardNegocio:
+        """Get business dashboard with metrics (read from the per-business aggregates)"""
+        negocio, agregado = await en_paralelo(
+            NegociosResolver.find_one(negocio_id, token, loaders),
+            agregados.obtener(negocio_id, token, loaders)
+        )
         
         return DashboardNegocio(
             nombre_negocio=negocio.nombre,
-            total_servicios=len(servicios_negocio),
-            total_citas=len(citas_negocio),
-            citas_pendientes=citas_pendientes,
-            citas_atendidas=citas_atendidas
+            total_servicios=len(agregado.servicios),
+            total_citas=agregado.total,
+            citas_pendientes=agregado.conteo(EstadoCita.PENDIENTE.value),
+            citas_atendidas=agregado.conteo(EstadoCita.ATENDIDA.value)
         )
     
     @staticmethod
-    async def resumen_negocio(negocio_id: str, token: Optional[str] = None) -> ResumenNegocio:
-        """Get business summary"""
-        from resolvers.servicios_resolver import ServiciosResolver
-        from resolvers.citas_resolver import CitasResolver
-
-        negocio = await NegociosResolver.find_one(negocio_id, token)
-        servicios = await ServiciosResolver.find_all(token)
-        citas = await CitasResolver.find_all(token)
-        
-        servicios_negocio = [s for s in servicios if s.negocio_id == negocio_id]
-        citas_negocio = [c for c in citas if c.negocio_id == negocio_id]
+    async def resumen_negocio(negocio_id: str, token: Optional[str] = None, loaders: Optional[RestLoaders] = None) -> ResumenNegocio:
+        """Get business summary (read from the per-business aggregates)"""
+        negocio, agregado = await en_paralelo(
+            NegociosResolver.find_one(negocio_id, token, loaders),
+            agregados.obtener(negocio_id, token, loaders)
+        )
         
         return ResumenNegocio(
             id=negocio.id,
             nombre=negocio.nombre,
-            totalServicios=len(servicios_negocio),
-            totalCitas=len(citas_negocio)
+            totalServicios=len(agregado.servicios),
+            totalCitas=agregado.total
         )
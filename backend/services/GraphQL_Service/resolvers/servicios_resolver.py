@@ -2,14 +2,13 @@ from typing import List, Optional, Dict
 
 from strawberry import Info
 from services.decode import decode_jwt
-from services.http_client import http_client
+from services.http_client import Consulta
+from services.loaders import RECURSOS, RestLoaders, get_consulta, get_lista, get_por_id
+from services.agregados import agregados
 from gql_types.servicio_types import Servicio, RankingServicios
 from resolvers.citas_resolver import CitasResolver
 
 
-def _headers_from_token(token: Optional[str]) -> Optional[Dict[str, str]]:
-    return {"Authorization": token} if token else None
-
 
 class ServiciosResolver:
     @staticmethod
@@ -28,17 +27,27 @@ class ServiciosResolver:
         return normalized
     
     @staticmethod
-    async def find_all(token: Optional[str] = None) -> List[Servicio]:
+    async def find_all(token: Optional[str] = None, loaders: Optional[RestLoaders] = None) -> List[Servicio]:
         """Get all services from REST API. Forward token if provided."""
-        headers = _headers_from_token(token)
-        data = await http_client.get("/api/servicios", headers=headers)
+        data = await get_lista("servicios", token, loaders)
         return [Servicio(**ServiciosResolver._normalize_servicio_data(servicio)) for servicio in data]
     
     @staticmethod
-    async def find_one(id: str, token: Optional[str] = None) -> Servicio:
+    async def find_by(
+        token: Optional[str] = None,
+        loaders: Optional[RestLoaders] = None,
+        *,
+        negocio_id: Optional[str] = None
+    ) -> List[Servicio]:
+        """Get the services of a business (?negocio_id= on the REST API)."""
+        consulta = Consulta(RECURSOS["servicios"][0]).donde(negocio_id=negocio_id)
+        data = await get_consulta(consulta, token, loaders)
+        return [Servicio(**ServiciosResolver._normalize_servicio_data(servicio)) for servicio in data]
+
+    @staticmethod
+    async def find_one(id: str, token: Optional[str] = None, loaders: Optional[RestLoaders] = None) -> Servicio:
         """Get a single service by ID. Forward token if provided."""
-        headers = _headers_from_token(token)
-        data = await http_client.get(f"/api/servicios/{id}", headers=headers)
+        data = await get_por_id("servicios", id, token, loaders)
         # Si la API devuelve una lista, tomar el primer elemento
         if isinstance(data, list):
             if len(data) == 0:
@@ -46,6 +55,12 @@ class ServiciosResolver:
             data = data[0]
         return Servicio(**ServiciosResolver._normalize_servicio_data(data))
 
+    @staticmethod
+    async def ranking_servicios(token: Optional[str] = None, loaders: Optional[RestLoaders] = None) -> List[RankingServicios]:
+        """Ranking of the most requested services across all businesses (from the aggregates)."""
+        agregado = await agregados.obtener(None, token, loaders)
+        return [RankingServicios(**fila) for fila in agregado.ranking_servicios()]
+
 
     # @staticmethod
     # async def generar_reporte_servicios_mas_solicitados_por_negocio(info: Info) -> List[RankingServicios]:
@@ -1,7 +1,10 @@
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
 
-from services.decode import decode_jwt
+from services.decode import claims_de_contexto
 from services.http_client import http_client
+from services.loaders import RestLoaders, get_lista, get_por_id
+from services.concurrencia import en_paralelo
+from services.agregaciones import agrupar_por, indice_por
 from gql_types.usuario_types import Usuario, UsuarioCitasDTO, PerfilCompletoUsuario, CitaInfo
 from gql_types.enums import EstadoCita
 from datetime import datetime
@@ -14,85 +17,96 @@ def _headers_from_token(token: Optional[str]) -> Optional[Dict[str, str]]:
 
 class UsuariosResolver:
     @staticmethod
-    async def find_all(token: Optional[str] = None) -> List[Usuario]:
+    async def find_all(token: Optional[str] = None, loaders: Optional[RestLoaders] = None) -> List[Usuario]:
         """Get all usuarios from REST API"""
-        headers = _headers_from_token(token)
-        data = await http_client.get("/api/usuarios/", headers=headers)
+        data = await get_lista("usuarios", token, loaders)
         return [Usuario(**user) for user in data]
 
     @staticmethod
-    async def find_one(id: str, token: Optional[str] = None) -> Usuario:
+    async def find_one(id: str, token: Optional[str] = None, loaders: Optional[RestLoaders] = None) -> Usuario:
         """Get a single user by ID, sending Authorization header if token provided"""
-        headers = _headers_from_token(token)
-        data = await http_client.get(f"/api/usuarios/id/{id}", headers=headers)
+        data = await get_por_id("usuarios", id, token, loaders)
         return Usuario(**data)      
     
     @staticmethod
-    async def find_one_by_email(email: str, token: Optional[str] = None) -> Usuario:
+    async def find_one_by_email(email: str, token: Optional[str] = None, loaders: Optional[RestLoaders] = None) -> Usuario:
         """Get a single user by email, sending Authorization header if token provided"""
-        headers = _headers_from_token(token)
-        data = await http_client.get(f"/api/usuarios/{email}", headers=headers)
+        if loaders is not None:
+            data = await loaders.get(f"/api/usuarios/{email}")
+        else:
+            headers = _headers_from_token(token)
+            data = await http_client.get(f"/api/usuarios/{email}", headers=headers)
         print(data)
         return Usuario(**data)
 
     @staticmethod
-    async def usuarios_con_citas_pendientes(token: Optional[str] = None) -> List[UsuarioCitasDTO]:
-        """Get usuarios with pending appointments"""
+    async def usuario_con_citas(
+        email: str,
+        usuario_id: Optional[str] = None,
+        token: Optional[str] = None,
+        loaders: Optional[RestLoaders] = None
+    ) -> Tuple[Usuario, list]:
+        """Usuario por email y sus citas (?cliente_id= en la REST API).
+
+        Si el token trae el id del usuario, ambas llamadas van a la vez; si no
+        coincide con el del usuario encontrado, se vuelven a pedir sus citas.
+        """
         from resolvers.citas_resolver import CitasResolver
-        from resolvers.servicios_resolver import ServiciosResolver
-        
-
-
-        usuarios = await UsuariosResolver.find_all(token)
-        citas = await CitasResolver.find_all(token)
-        servicios = await ServiciosResolver.find_all(token)
-
-        pendientes = [c for c in citas if c.estado == EstadoCita.PENDIENTE.value]
 
-        result = []
-        for usuario in usuarios:
-            user_citas = [c for c in pendientes if c.cliente_id == usuario.id]
-            if user_citas:
-                citas_info = []
-                for cita in user_citas:
-                    servicio = next((s for s in servicios if s.id == cita.servicio_id), None)
-                    citas_info.append(CitaInfo(
-                        fecha=cita.fecha,
-                        servicio=servicio.nombre if servicio else None
-                    ))
-                result.append(UsuarioCitasDTO(
-                    usuario=usuario.nombre_completo,
-                    citas=citas_info
-                ))
+        if usuario_id:
+            usuario, citas = await en_paralelo(
+                UsuariosResolver.find_one_by_email(email, token, loaders),
+                CitasResolver.find_by(token, loaders, cliente_id=usuario_id)
+            )
+            if str(usuario.id) == str(usuario_id):
+                return usuario, citas
+        else:
+            usuario = await UsuariosResolver.find_one_by_email(email, token, loaders)
+        return usuario, await CitasResolver.find_by(token, loaders, cliente_id=usuario.id)
 
-        return result
+    @staticmethod
+    async def usuarios_con_citas_pendientes(token: Optional[str] = None, loaders: Optional[RestLoaders] = None) -> List[UsuarioCitasDTO]:
+        """Get usuarios with pending appointments"""
+        return await UsuariosResolver._usuarios_con_citas(EstadoCita.PENDIENTE.value, token, loaders)
 
     @staticmethod
-    async def usuarios_con_citas_atendidas(token: Optional[str] = None) -> List[UsuarioCitasDTO]:
+    async def usuarios_con_citas_atendidas(token: Optional[str] = None, loaders: Optional[RestLoaders] = None) -> List[UsuarioCitasDTO]:
         """Get usuarios with completed appointments"""
+        return await UsuariosResolver._usuarios_con_citas(EstadoCita.ATENDIDA.value, token, loaders)
+
+    @staticmethod
+    async def _usuarios_con_citas(estado: str, token: Optional[str] = None, loaders: Optional[RestLoaders] = None) -> List[UsuarioCitasDTO]:
+        """Usuarios con sus citas en un estado, con el nombre del servicio de cada cita"""
         from resolvers.citas_resolver import CitasResolver
         from resolvers.servicios_resolver import ServiciosResolver
 
-        usuarios = await UsuariosResolver.find_all(token)
-        citas = await CitasResolver.find_all(token)
-        servicios = await ServiciosResolver.find_all(token)
+        usuarios, citas, servicios = await en_paralelo(
+            UsuariosResolver.find_all(token, loaders),
+            CitasResolver.find_by(token, loaders, estado=estado),
+            ServiciosResolver.find_all(token, loaders)
+        )
+        return UsuariosResolver.agrupar_citas_por_usuario(usuarios, citas, servicios)
 
-        atendidas = [c for c in citas if c.estado == EstadoCita.ATENDIDA.value]
+    @staticmethod
+    def agrupar_citas_por_usuario(usuarios: list, citas: list, servicios: list) -> List[UsuarioCitasDTO]:
+        """Cruza usuarios, citas y servicios en una pasada por listado (O(U+C+S)).
+
+        Mantiene el orden de los usuarios y, dentro de cada uno, el de sus citas;
+        los usuarios sin citas no aparecen.
+        """
+        nombres_servicio = {servicio_id: s.nombre for servicio_id, s in indice_por(servicios).items()}
+        citas_por_cliente = agrupar_por(citas, "cliente_id")
 
         result = []
         for usuario in usuarios:
-            user_citas = [c for c in atendidas if c.cliente_id == usuario.id]
+            user_citas = citas_por_cliente.get(usuario.id)
             if user_citas:
-                citas_info = []
-                for cita in user_citas:
-                    servicio = next((s for s in servicios if s.id == cita.servicio_id), None)
-                    citas_info.append(CitaInfo(
-                        fecha=cita.fecha,
-                        servicio=servicio.nombre if servicio else None
-                    ))
                 result.append(UsuarioCitasDTO(
                     usuario=usuario.nombre_completo,
-                    citas=citas_info
+                    citas=[
+                        CitaInfo(fecha=cita.fecha, servicio=nombres_servicio.get(cita.servicio_id))
+                        for cita in user_citas
+                    ]
                 ))
 
         return result
@@ -102,28 +116,23 @@ class UsuariosResolver:
         """Obtiene el perfil completo de un usuario con sus citas agregadas."""
         from resolvers.citas_resolver import CitasResolver
 
-        # Obtener el token del header HTTP (case-insensitive)
-        token = (
-            info.context.get("auth_header") or
-            info.context.get("request", {}).headers.get("authorization") or
-            info.context.get("request", {}).headers.get("Authorization")
-        )
+        # Token y claims que get_context ya extrajo y verificó
+        token = info.context.get("auth_header")
         
         if not token:
             raise Exception("Token no proporcionado en la cabecera Authorization")
 
-        data = decode_jwt(token)
+        data = claims_de_contexto(info.context)
 
         # Usar el email del token en lugar del ID para buscar al usuario
         # porque el REST API espera email como identificador
         usuario_email = data.get("email") or data.get("sub") or data.get("id")
         
         # Llamar a los resolvers que hacen peticiones HTTP, reenviando el token
-        usuario = await UsuariosResolver.find_one_by_email(usuario_email, token)
-        todas_citas = await CitasResolver.find_all(token)
-        
-        # Filtrar citas del usuario - usar cliente_id en lugar de estacion_id
-        citas_usuario = [c for c in todas_citas if c.cliente_id == usuario.id]
+        loaders = info.context.get("loaders")
+        usuario, citas_usuario = await UsuariosResolver.usuario_con_citas(
+            usuario_email, data.get("id"), token, loaders
+        )
         print("Citas del usuario:", citas_usuario)
 
         #  Calcular estadísticas
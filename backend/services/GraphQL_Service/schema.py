@@ -9,6 +9,9 @@ from resolvers.estaciones_resolver import EstacionesResolver
 from resolvers.horarios_atencion_resolver import HorariosAtencionResolver
 from resolvers.admin_sistema_resolver import AdminSistemaResolver
 from resolvers.pdf_resolver import PdfResolver
+from services.loaders import RestLoaders
+from services.cache_respuestas import CacheConsultas
+from config import config
 
 # Import all types (use gql_types to avoid naming conflict with Python stdlib 'types')
 from gql_types.usuario_types import Usuario, UsuarioCitasDTO, PerfilCompletoUsuario
@@ -39,28 +42,33 @@ def get_auth_token(info: Info) -> Optional[str]:
     return None
 
 
+def get_loaders(info: Info) -> Optional[RestLoaders]:
+    """DataLoaders de la operación actual (creados en get_context)"""
+    return info.context.get("loaders")
+
+
 @strawberry.type
 class Query:
     # Usuarios queries
     @strawberry.field(description="Obtener todos los usuarios")
     async def usuarios(self, info: Info) -> List[Usuario]:
         token = get_auth_token(info)
-        return await UsuariosResolver.find_all(token)
+        return await UsuariosResolver.find_all(token, get_loaders(info))
     
     @strawberry.field(description="Obtener un usuario por ID")
     async def usuario(self, info: Info, id: str) -> Usuario:
         token = get_auth_token(info)
-        return await UsuariosResolver.find_one(id, token)
+        return await UsuariosResolver.find_one(id, token, get_loaders(info))
     
     @strawberry.field(description="Lista los usuarios con sus citas pendientes")
     async def usuarios_con_citas_pendientes(self, info: Info) -> List[UsuarioCitasDTO]:
         token = get_auth_token(info)
-        return await UsuariosResolver.usuarios_con_citas_pendientes(token)
+        return await UsuariosResolver.usuarios_con_citas_pendientes(token, get_loaders(info))
     
     @strawberry.field(description="Lista los usuarios con sus citas atendidas")
     async def usuarios_con_citas_atendidas(self, info: Info) -> List[UsuarioCitasDTO]:
         token = get_auth_token(info)
-        return await UsuariosResolver.usuarios_con_citas_atendidas(token)
+        return await UsuariosResolver.usuarios_con_citas_atendidas(token, get_loaders(info))
     
     @strawberry.field(description="Perfil completo del usuario")
     async def perfil_completo_usuario(self, info: Info) -> PerfilCompletoUsuario:
@@ -71,77 +79,77 @@ class Query:
     @strawberry.field(description="Obtener todas las citas")
     async def citas(self, info: Info) -> List[Cita]:
         token = get_auth_token(info)
-        return await CitasResolver.find_all(token)
+        return await CitasResolver.find_all(token, get_loaders(info))
     
     @strawberry.field(description="Obtener una cita por ID")
     async def cita(self, info: Info, id: str) -> Cita:
         token = get_auth_token(info)
-        return await CitasResolver.find_one(id, token)
+        return await CitasResolver.find_one(id, token, get_loaders(info))
     
     @strawberry.field(description="Métricas temporales de citas")
     async def metricas_temporales(self, info: Info) -> MetricasTemporales:
         token = get_auth_token(info)
-        return await CitasResolver.metricas_temporales(token)
+        return await CitasResolver.metricas_temporales(token, get_loaders(info))
     
     # Servicios queries
     @strawberry.field(description="Obtener todos los servicios")
     async def servicios(self, info: Info) -> List[Servicio]:
         token = get_auth_token(info)
-        return await ServiciosResolver.find_all(token)
+        return await ServiciosResolver.find_all(token, get_loaders(info))
     
     @strawberry.field(description="Obtener un servicio por ID")
     async def servicio(self, info: Info, id: str) -> Servicio:
         token = get_auth_token(info)
-        return await ServiciosResolver.find_one(id, token)
+        return await ServiciosResolver.find_one(id, token, get_loaders(info))
     
     @strawberry.field(description="Ranking de servicios más solicitados")
     async def ranking_servicios(self, info: Info) -> List[RankingServicios]:
         token = get_auth_token(info)
-        return await ServiciosResolver.ranking_servicios(token)
+        return await ServiciosResolver.ranking_servicios(token, get_loaders(info))
     
     # Negocios queries
     @strawberry.field(description="Obtener todos los negocios")
     async def negocios(self, info: Info) -> List[Negocio]:
         token = get_auth_token(info)
-        return await NegociosResolver.find_all(token)
+        return await NegociosResolver.find_all(token, get_loaders(info))
     
     @strawberry.field(description="Obtener un negocio por ID")
     async def negocio(self, info: Info, id: str) -> Negocio:
         token = get_auth_token(info)
-        return await NegociosResolver.find_one(id, token)
+        return await NegociosResolver.find_one(id, token, get_loaders(info))
     
     @strawberry.field(description="Dashboard del negocio")
     async def dashboard_negocio(self, info: Info, negocio_id: str) -> DashboardNegocio:
         token = get_auth_token(info)
-        return await NegociosResolver.dashboard_negocio(negocio_id, token)
+        return await NegociosResolver.dashboard_negocio(negocio_id, token, get_loaders(info))
     
     @strawberry.field(description="Resumen del negocio")
     async def resumen_negocio(self, info: Info, negocio_id: str) -> ResumenNegocio:
         token = get_auth_token(info)
-        return await NegociosResolver.resumen_negocio(negocio_id, token)
+        return await NegociosResolver.resumen_negocio(negocio_id, token, get_loaders(info))
     
     # Estaciones queries
     @strawberry.field(description="Obtener todas las estaciones")
     async def estaciones(self, info: Info) -> List[Estacion]:
         token = get_auth_token(info)
-        return await EstacionesResolver.find_all(token)
+        return await EstacionesResolver.find_all(token, get_loaders(info))
     
     @strawberry.field(description="Obtener una estación por ID")
     async def estacion(self, info: Info, id: str) -> Estacion:
         token = get_auth_token(info)
-        return await EstacionesResolver.find_one(id, token)
+        return await EstacionesResolver.find_one(id, token, get_loaders(info))
     
 
     # Horarios queries
     @strawberry.field(description="Obtener todos los horarios de atención")
     async def horarios_atencion(self, info: Info) -> List[HorarioAtencion]:
         token = get_auth_token(info)
-        return await HorariosAtencionResolver.find_all(token)
+        return await HorariosAtencionResolver.find_all(token, get_loaders(info))
     
     @strawberry.field(description="Obtener un horario por ID")
     async def horario_atencion(self, info: Info, id: str) -> HorarioAtencion:
         token = get_auth_token(info)
-        return await HorariosAtencionResolver.find_one(id, token)
+        return await HorariosAtencionResolver.find_one(id, token, get_loaders(info))
     
     # Admin Sistema queries
     @strawberry.field(description="Obtener todos los administradores del sistema")
@@ -152,18 +160,21 @@ class Query:
     # PDF queries
     @strawberry.field(description="Generar informe PDF del perfil del usuario autenticado")
     async def generar_informe_pdf(self, info: Info) -> InformePDF:
-        return await PdfResolver.generar_informe_usuario(info)
+        return await PdfResolver.generar_informe_usuario(info.context)
     
     @strawberry.field(description="Generar informe PDF de servicios más solicitados del negocio del usuario autenticado")
     async def generar_reporte_servicios_mas_solicitados_por_negocio(self, info: Info) -> InformePDF:
-        return await PdfResolver.generar_reporte_servicios_mas_solicitados_por_negocio(info)
+        return await PdfResolver.generar_reporte_servicios_mas_solicitados_por_negocio(info.context)
     
     @strawberry.field(description="Generar informe PDF de ocupación por estación del negocio del usuario autenticado")
     async def generar_reporte_ocupacion_estaciones(self, info: Info) -> InformePDF:
-        return await PdfResolver.generar_reporte_ocupacion_estaciones(info)
+        return await PdfResolver.generar_reporte_ocupacion_estaciones(info.context)
     
     @strawberry.field(description="Generar informe PDF de ingresos del negocio del usuario autenticado")
     async def generar_reporte_ingresos(self, info: Info, fecha_inicio: Optional[str] = None, fecha_fin: Optional[str] = None) -> InformePDF:
-        return await PdfResolver.generar_reporte_ingresos(info, fecha_inicio, fecha_fin)
+        return await PdfResolver.generar_reporte_ingresos(info.context, fecha_inicio, fecha_fin)
 
-schema = strawberry.Schema(query=Query)
+schema = strawberry.Schema(
+    query=Query,
+    extensions=[CacheConsultas] if config.RESPUESTAS_CACHE else []
+)
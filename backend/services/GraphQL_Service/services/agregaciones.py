@@ -0,0 +1,24 @@
+"""
+Agregaciones en una sola pasada para resolvers que cruzan listados.
+
+En lugar de buscar, por cada usuario, sus citas en toda la lista y, por
+cada cita, su servicio en toda la lista (O(U×C×S)), se indexa cada
+listado una vez y los cruces son búsquedas en diccionarios (O(U+C+S)).
+"""
+from typing import Any, Dict, Hashable, Iterable, List
+
+
+def indice_por(items: Iterable[Any], campo: str = "id") -> Dict[Hashable, Any]:
+    """campo -> item. Si hay repetidos gana el primero, como next(...) sobre la lista."""
+    indice: Dict[Hashable, Any] = {}
+    for item in items:
+        indice.setdefault(getattr(item, campo), item)
+    return indice
+
+
+def agrupar_por(items: Iterable[Any], campo: str) -> Dict[Hashable, List[Any]]:
+    """campo -> items con ese valor, en el orden original."""
+    grupos: Dict[Hashable, List[Any]] = {}
+    for item in items:
+        grupos.setdefault(getattr(item, campo), []).append(item)
+    return grupos
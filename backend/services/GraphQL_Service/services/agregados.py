@@ -0,0 +1,207 @@
+"""
+Agregados de citas por negocio, en memoria, con TTL.
+
+dashboard_negocio, resumen_negocio, metricas_temporales, ranking_servicios y
+los informes PDF leen conteos de aquí en lugar de recorrer todas las citas
+en cada petición. Cada ámbito (un negocio, o None para todas las citas)
+guarda:
+
+- conteos por estado, por servicio, por estación y estado, y por día
+- citas atendidas por (servicio, día), para sumar ingresos en un rango
+- nombre y precio de los servicios del ámbito
+
+Al vencer el TTL se vuelven a pedir las citas del ámbito (filtradas en la
+REST API) y los contadores se recalculan enteros con el motor columnar
+(services/analitica.py). Con 1M de citas ya parseadas eso toma 0.6-0.85 s
+frente a 2.3-3.4 s cita por cita, unas 3-4.5 veces menos
+(benchmarks/bench_analitica.py). Un índice por cita para aplicar solo las
+diferencias tardaba ~1.7 s con 1% de citas cambiadas, más que recalcular,
+así que no se guarda. El recálculo corre en un hilo para no bloquear el
+event loop. Un solo refresco por ámbito a la vez; las lecturas
+concurrentes esperan ese mismo refresco.
+
+La REST API no expone cambios, así que la frescura la da el TTL
+(AGREGADOS_TTL): una cita creada o modificada directamente en la REST API
+puede tardar hasta ese tiempo en verse. Las mutaciones que pasan por este
+servicio llaman a invalidar() (desde CacheConsultas, services/cache_respuestas.py),
+que fuerza el refresco en la próxima lectura. Cada refresco descarga la
+lista completa de citas del ámbito.
+"""
+import asyncio
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import config
+from gql_types.enums import EstadoCita
+from services.analitica import TablaCitas
+from services.http_client import Consulta
+from services.loaders import RECURSOS, RestLoaders, get_consulta
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AgregadoCitas:
+    """Contadores de las citas de un ámbito."""
+
+    def __init__(self, negocio_id: Optional[str] = None):
+        self.negocio_id = negocio_id
+        self.por_estado: Counter = Counter()
+        self.por_servicio: Counter = Counter()
+        self.por_estacion: Dict[str, Counter] = {}
+        self.por_dia: Counter = Counter()
+        self.atendidas_servicio_dia: Counter = Counter()
+        self.servicios: Dict[str, Tuple[str, int]] = {}  # id -> (nombre, precio_centavos)
+        self.actualizado: float = 0.0
+        self.total = 0
+
+    def aplicar(self, citas: Iterable[Dict[str, Any]]) -> int:
+        """Recalcula los contadores con la lista completa de citas del ámbito; devuelve cuántas hay."""
+        tabla = TablaCitas.desde_citas(citas)
+        self._reconstruir(tabla)
+        self.total = tabla.filas
+        return self.total
+
+    def _reconstruir(self, tabla: TablaCitas) -> None:
+        """Recalcula todos los contadores con group-by vectorizados."""
+        self.por_estado = Counter(tabla.contar("estado"))
+        self.por_servicio = Counter(tabla.contar("servicio"))
+        self.por_dia = Counter(tabla.contar("dia"))
+        self.por_estacion = {}
+        for (estacion_id, estado), total in tabla.contar_por_par("estacion", "estado").items():
+            self.por_estacion.setdefault(estacion_id, Counter())[estado] = total
+        atendidas = tabla.donde("estado", EstadoCita.ATENDIDA.value)
+        self.atendidas_servicio_dia = Counter(tabla.contar_por_par("servicio", "dia", atendidas))
+
+    def conteo(self, estado: str) -> int:
+        return self.por_estado.get(estado, 0)
+
+    def citas_desde(self, desde: str, hasta: Optional[str] = None) -> int:
+        """Citas con día en [desde, hasta) (días como YYYY-MM-DD)."""
+        return sum(
+            n for dia, n in self.por_dia.items()
+            if dia is not None and dia >= desde and (hasta is None or dia < hasta)
+        )
+
+    def ranking_servicios(self) -> List[Dict[str, Any]]:
+        """Citas por nombre de servicio (solo servicios conocidos), de mayor a menor."""
+        por_nombre: Counter = Counter()
+        for servicio_id, total in self.por_servicio.items():
+            if servicio_id in self.servicios:
+                por_nombre[self.servicios[servicio_id][0]] += total
+        return [{"servicio": nombre, "total_citas": total} for nombre, total in por_nombre.most_common()]
+
+    def ocupacion(self, estaciones: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Citas por estación (en el orden recibido), incluidas las que no tienen citas."""
+        resultado = []
+        for estacion in estaciones:
+            conteos = self.por_estacion.get(estacion.id, Counter())
+            resultado.append({
+                "nombre": estacion.nombre,
+                "total_citas": sum(conteos.values()),
+                "citas_atendidas": conteos.get(EstadoCita.ATENDIDA.value, 0),
+                "citas_pendientes": conteos.get(EstadoCita.PENDIENTE.value, 0)
+            })
+        return resultado
+
+    def ingresos(self, desde: Optional[str] = None, hasta: Optional[str] = None) -> Tuple[float, Dict[str, float]]:
+        """Ingresos (en unidades, no centavos) de citas atendidas con día en [desde, hasta]."""
+        por_servicio: Dict[str, float] = {}
+        total = 0.0
+        for (servicio_id, dia), cantidad in self.atendidas_servicio_dia.items():
+            if servicio_id not in self.servicios:
+                continue
+            if desde is not None and (dia is None or dia < desde):
+                continue
+            if hasta is not None and (dia is None or dia > hasta):
+                continue
+            nombre, precio_centavos = self.servicios[servicio_id]
+            importe = cantidad * precio_centavos / 100.0
+            por_servicio[nombre] = por_servicio.get(nombre, 0.0) + importe
+            total += importe
+        return total, por_servicio
+
+
+class AlmacenAgregados:
+    """Agregados por ámbito con TTL y tope de ámbitos (LRU)."""
+
+    def __init__(self, ttl_segundos: Optional[float] = None, max_negocios: Optional[int] = None):
+        self.ttl = config.AGREGADOS_TTL if ttl_segundos is None else ttl_segundos
+        self.max_negocios = max_negocios or config.AGREGADOS_MAX_NEGOCIOS
+        self._agregados: "OrderedDict[Optional[str], AgregadoCitas]" = OrderedDict()
+        self._vencidos: set = set()
+        self._locks: Dict[Optional[str], asyncio.Lock] = {}
+        self.refrescos = 0
+
+    async def obtener(
+        self,
+        negocio_id: Optional[str] = None,
+        token: Optional[str] = None,
+        loaders: Optional[RestLoaders] = None
+    ) -> AgregadoCitas:
+        """Agregado del negocio (o de todas las citas con None), refrescado si venció."""
+        agregado = self._agregados.get(negocio_id)
+        if agregado is not None and not self._vencido(negocio_id, agregado):
+            self._agregados.move_to_end(negocio_id)
+            return agregado
+
+        lock = self._locks.setdefault(negocio_id, asyncio.Lock())
+        async with lock:
+            agregado = self._agregados.get(negocio_id)
+            if agregado is None or self._vencido(negocio_id, agregado):
+                agregado = await self._refrescar(negocio_id, token, loaders)
+        return agregado
+
+    def invalidar(self, negocio_id: Optional[str] = None) -> None:
+        """Fuerza el refresco del negocio (y del ámbito global) en la próxima lectura."""
+        self._vencidos.update({negocio_id, None})
+
+    def invalidar_todos(self) -> None:
+        """Fuerza el refresco de todos los ámbitos en memoria."""
+        self._vencidos.update(self._agregados.keys())
+        self._vencidos.add(None)
+
+    def limpiar(self) -> None:
+        self._agregados.clear()
+        self._vencidos.clear()
+        self._locks.clear()
+
+    def _vencido(self, negocio_id: Optional[str], agregado: AgregadoCitas) -> bool:
+        return negocio_id in self._vencidos or time.monotonic() - agregado.actualizado >= self.ttl
+
+    async def _refrescar(
+        self,
+        negocio_id: Optional[str],
+        token: Optional[str],
+        loaders: Optional[RestLoaders]
+    ) -> AgregadoCitas:
+        from services.concurrencia import en_paralelo
+
+        citas, servicios = await en_paralelo(
+            get_consulta(Consulta(RECURSOS["citas"][0]).donde(negocio_id=negocio_id), token, loaders),
+            get_consulta(Consulta(RECURSOS["servicios"][0]).donde(negocio_id=negocio_id), token, loaders)
+        )
+        # El recálculo corre en un hilo (el lock del ámbito ya serializa los
+        # refrescos) sobre un agregado nuevo: las lecturas siguen viendo el
+        # anterior completo hasta el reemplazo
+        agregado = AgregadoCitas(negocio_id)
+        await asyncio.to_thread(agregado.aplicar, citas)
+        agregado.servicios = {
+            str(s.get("id")): (s.get("nombre"), s.get("precio_centavos") or 0) for s in servicios
+        }
+        agregado.actualizado = time.monotonic()
+        self._vencidos.discard(negocio_id)
+        self.refrescos += 1
+
+        self._agregados[negocio_id] = agregado
+        self._agregados.move_to_end(negocio_id)
+        while len(self._agregados) > self.max_negocios:
+            expulsado, _ = self._agregados.popitem(last=False)
+            self._locks.pop(expulsado, None)
+        logger.debug(f"Agregados de {negocio_id or 'todas las citas'}: {agregado.total} citas")
+        return agregado
+
+
+# Singleton instance
+agregados = AlmacenAgregados()
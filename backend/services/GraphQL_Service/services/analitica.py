@@ -0,0 +1,110 @@
+"""
+Motor columnar (NumPy) para analítica de citas.
+
+TablaCitas guarda las citas como columnas categóricas: cada columna
+(estado, servicio, estación, día) es un array int32 de códigos más la
+lista de valores distintos. Los group-by son np.bincount sobre los códigos
+y el día se calcula una vez por fecha distinta (no por cita).
+
+Lo usan los agregados por negocio (services/agregados.py) para
+reconstruir sus contadores de una vez en lugar de cita por cita; los
+informes leen de esos contadores, no de la tabla.
+"""
+from itertools import count, repeat
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+class Columna:
+    """Columna categórica: códigos int32 y el valor de cada código."""
+
+    __slots__ = ("codigos", "valores", "_indice")
+
+    def __init__(self, datos: Iterable[Hashable], filas: Optional[int] = None):
+        if filas is None:
+            datos = list(datos)
+            filas = len(datos)
+        # setdefault y count() corren en C: cada fila guarda la posición de la
+        # primera aparición de su valor, que luego se compacta a 0..k-1
+        indice: Dict[Hashable, int] = {}
+        primeras = np.fromiter(map(indice.setdefault, datos, count()), dtype=np.int64, count=filas)
+        compactar = np.zeros(filas, dtype=np.int32)
+        compactar[np.fromiter(indice.values(), dtype=np.int64, count=len(indice))] = np.arange(len(indice), dtype=np.int32)
+        self.codigos = compactar[primeras]
+        self.valores: List[Hashable] = list(indice)
+        self._indice = {valor: i for i, valor in enumerate(self.valores)}
+
+    def codigo(self, valor: Hashable) -> int:
+        """Código del valor, o -1 si no aparece en la columna."""
+        return self._indice.get(valor, -1)
+
+    def mapear(self, funcion: Callable[[Hashable], Hashable]) -> "Columna":
+        """Nueva columna aplicando funcion una vez por valor distinto (no por fila)."""
+        categorias = Columna([funcion(v) for v in self.valores])
+        resultado = Columna.__new__(Columna)
+        resultado.codigos = categorias.codigos[self.codigos]
+        resultado.valores = categorias.valores
+        resultado._indice = categorias._indice
+        return resultado
+
+    def por_fila(self) -> List[Hashable]:
+        """Valor de cada fila."""
+        valores = np.empty(len(self.valores), dtype=object)
+        valores[:] = self.valores
+        return valores[self.codigos].tolist()
+
+
+def dia_de(fecha: Any) -> Optional[str]:
+    """Día (YYYY-MM-DD) de una fecha de la REST API."""
+    return str(fecha)[:10] if fecha else None
+
+
+class TablaCitas:
+    """Citas en formato columnar con categorías codificadas."""
+
+    def __init__(self, estado: Columna, servicio: Columna, estacion: Columna, dia: Columna):
+        self.filas = len(estado.codigos)
+        self.estado = estado
+        self.servicio = servicio
+        self.estacion = estacion
+        self.dia = dia
+
+    @classmethod
+    def desde_citas(cls, citas: Iterable[Dict[str, Any]]) -> "TablaCitas":
+        """Desde el JSON de la REST API; el día son los 10 primeros caracteres de fecha."""
+        citas = citas if isinstance(citas, list) else list(citas)
+
+        def columna(campo: str) -> Columna:
+            return Columna(map(dict.get, citas, repeat(campo)), len(citas))
+
+        return cls(columna("estado"), columna("servicio_id"), columna("estacion_id"), columna("fecha").mapear(dia_de))
+
+    # Filtros (máscaras booleanas por fila)
+
+    def donde(self, columna: str, valor: Hashable) -> np.ndarray:
+        col: Columna = getattr(self, columna)
+        return col.codigos == col.codigo(valor)
+
+    # Group-by
+
+    def contar(self, columna: str, mascara: Optional[np.ndarray] = None) -> Dict[Hashable, int]:
+        """Filas por valor de la columna."""
+        col: Columna = getattr(self, columna)
+        codigos = col.codigos if mascara is None else col.codigos[mascara]
+        conteos = np.bincount(codigos, minlength=len(col.valores))
+        return {col.valores[i]: int(conteos[i]) for i in np.flatnonzero(conteos)}
+
+    def contar_por_par(self, primera: str, segunda: str, mascara: Optional[np.ndarray] = None) -> Dict[Tuple, int]:
+        """Filas por (valor de primera, valor de segunda)."""
+        a: Columna = getattr(self, primera)
+        b: Columna = getattr(self, segunda)
+        ancho = max(len(b.valores), 1)
+        combinado = a.codigos.astype(np.int64) * ancho + b.codigos
+        if mascara is not None:
+            combinado = combinado[mascara]
+        conteos = np.bincount(combinado, minlength=len(a.valores) * ancho)
+        return {
+            (a.valores[i // ancho], b.valores[i % ancho]): int(conteos[i])
+            for i in np.flatnonzero(conteos)
+        }
@@ -0,0 +1,265 @@
+"""
+Caché de respuestas GraphQL para consultas de lectura.
+
+Los listados de negocios, servicios, estaciones y horarios cambian poco,
+pero cada query volvía a pedirlos a la REST API. CacheConsultas es una
+extensión de Strawberry (registrada en schema.py) que guarda el resultado
+completo de la operación y, si vuelve la misma, lo devuelve sin ejecutar
+ningún resolver.
+
+- Clave: texto de la query + nombre de operación + variables + sujeto del
+  JWT (id del usuario). Cada usuario tiene sus propias entradas; las
+  peticiones sin token comparten las de "anónimo" y las de token inválido
+  no se cachean.
+- Solo se cachean operaciones cuyos campos raíz estén todos en
+  TTL_POR_CAMPO; el TTL de la operación es el menor de esos campos. Las
+  respuestas con errores no se guardan.
+- Una mutación invalida las entradas de los campos que afecta (o todas si
+  no está en INVALIDA_POR_MUTACION) y los agregados de citas
+  (services/agregados.py): los del negocio de sus variables (negocioId)
+  o todos. Hoy el esquema no tiene mutaciones.
+- En memoria: LRU con tope de entradas (RESPUESTAS_CACHE_MAX). Con
+  RESPUESTAS_CACHE_DB se comparte además en un SQLite local entre los
+  workers del mismo host.
+- respuestas.metricas() da aciertos, fallos y ratio (ruta /metrics/cache).
+"""
+import hashlib
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Tuple
+
+from graphql import ExecutionResult, FieldNode, FragmentSpreadNode, InlineFragmentNode, OperationDefinitionNode, OperationType
+from strawberry.extensions import SchemaExtension
+
+from config import config
+from services.agregados import agregados
+from services.decode import claims_de_contexto
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Campo raíz (nombre GraphQL) -> segundos de vida de su respuesta
+TTL_POR_CAMPO: Dict[str, float] = {
+    "negocios": 300,
+    "negocio": 300,
+    "servicios": 300,
+    "servicio": 300,
+    "estaciones": 300,
+    "estacion": 300,
+    "horariosAtencion": 600,
+    "horarioAtencion": 600,
+    "usuarios": 60,
+    "usuario": 60,
+    "__typename": float("inf"),
+}
+
+# Mutación -> campos raíz cuyas respuestas deja obsoletas
+INVALIDA_POR_MUTACION: Dict[str, Tuple[str, ...]] = {}
+
+SUJETO_ANONIMO = "anónimo"
+
+Entrada = Tuple[float, FrozenSet[str], Any]  # (expira, campos, data)
+
+
+class AlmacenCompartido:
+    """Entradas en un SQLite local para que las vean todos los workers."""
+
+    def __init__(self, ruta: str):
+        self._escrituras = 0
+        self._db = sqlite3.connect(ruta, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS respuestas (clave TEXT PRIMARY KEY, expira REAL, campos TEXT, data TEXT)"
+        )
+
+    def get(self, clave: str) -> Optional[Entrada]:
+        fila = self._db.execute(
+            "SELECT expira, campos, data FROM respuestas WHERE clave = ?", (clave,)
+        ).fetchone()
+        if fila is None:
+            return None
+        return fila[0], frozenset(json.loads(fila[1])), json.loads(fila[2])
+
+    def set(self, clave: str, entrada: Entrada) -> None:
+        expira, campos, data = entrada
+        self._db.execute(
+            "INSERT OR REPLACE INTO respuestas VALUES (?, ?, ?, ?)",
+            (clave, expira, json.dumps(sorted(campos)), json.dumps(data))
+        )
+        self._escrituras += 1
+        if self._escrituras % 500 == 0:
+            self.purgar()
+
+    def invalidar(self, campos: Optional[Iterable[str]] = None) -> None:
+        if campos is None:
+            self._db.execute("DELETE FROM respuestas")
+            return
+        for campo in campos:
+            self._db.execute("DELETE FROM respuestas WHERE campos LIKE ?", (f'%"{campo}"%',))
+
+    def purgar(self) -> None:
+        self._db.execute("DELETE FROM respuestas WHERE expira <= ?", (time.time(),))
+
+
+class CacheRespuestas:
+    """LRU de respuestas con expiración por entrada, invalidación por campo y métricas."""
+
+    def __init__(self, max_entradas: Optional[int] = None, ruta_compartida: Optional[str] = None):
+        self.max_entradas = max_entradas or config.RESPUESTAS_CACHE_MAX
+        self._entradas: "OrderedDict[str, Entrada]" = OrderedDict()
+        ruta_compartida = config.RESPUESTAS_CACHE_DB if ruta_compartida is None else ruta_compartida
+        self.compartido = AlmacenCompartido(ruta_compartida) if ruta_compartida else None
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+
+    def get(self, clave: str) -> Optional[Any]:
+        entrada = self._entradas.get(clave)
+        if entrada is None and self.compartido is not None:
+            entrada = self.compartido.get(clave)
+            if entrada is not None:
+                self._guardar_local(clave, entrada)
+        if entrada is None or entrada[0] <= time.time():
+            if entrada is not None:
+                self._entradas.pop(clave, None)
+            self.fallos += 1
+            return None
+        self._entradas.move_to_end(clave)
+        self.aciertos += 1
+        return entrada[2]
+
+    def set(self, clave: str, data: Any, campos: Iterable[str], ttl: float) -> None:
+        entrada: Entrada = (time.time() + ttl, frozenset(campos), data)
+        self._guardar_local(clave, entrada)
+        if self.compartido is not None and ttl != float("inf"):
+            self.compartido.set(clave, entrada)
+
+    def invalidar(self, campos: Optional[Iterable[str]] = None) -> None:
+        """Borra las entradas que incluyen alguno de los campos (todas con None)."""
+        campos = None if campos is None else frozenset(campos)
+        if campos is None:
+            self._entradas.clear()
+        else:
+            for clave in [c for c, (_, suyos, _) in self._entradas.items() if suyos & campos]:
+                del self._entradas[clave]
+        if self.compartido is not None:
+            self.compartido.invalidar(campos)
+
+    def limpiar(self) -> None:
+        self.invalidar()
+        self.aciertos = self.fallos = self.expulsiones = 0
+
+    def metricas(self) -> Dict[str, Any]:
+        consultas = self.aciertos + self.fallos
+        return {
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "ratio_aciertos": round(self.aciertos / consultas, 4) if consultas else 0.0,
+            "entradas": len(self._entradas),
+            "max_entradas": self.max_entradas,
+            "expulsiones": self.expulsiones,
+            "compartido": self.compartido is not None,
+        }
+
+    def _guardar_local(self, clave: str, entrada: Entrada) -> None:
+        self._entradas[clave] = entrada
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+            self.expulsiones += 1
+
+
+def _campos_raiz(documento: Any, operacion: OperationDefinitionNode) -> Optional[FrozenSet[str]]:
+    """Nombres de los campos raíz de la operación (resolviendo fragmentos)."""
+    fragmentos = {d.name.value: d for d in documento.definitions if hasattr(d, "type_condition")}
+    campos = set()
+    pendientes = list(operacion.selection_set.selections)
+    while pendientes:
+        seleccion = pendientes.pop()
+        if isinstance(seleccion, FieldNode):
+            campos.add(seleccion.name.value)
+        elif isinstance(seleccion, InlineFragmentNode):
+            pendientes.extend(seleccion.selection_set.selections)
+        elif isinstance(seleccion, FragmentSpreadNode) and seleccion.name.value in fragmentos:
+            pendientes.extend(fragmentos[seleccion.name.value].selection_set.selections)
+        else:
+            return None
+    return frozenset(campos)
+
+
+def _operacion(documento: Any, nombre: Optional[str]) -> Optional[OperationDefinitionNode]:
+    operaciones = [d for d in documento.definitions if isinstance(d, OperationDefinitionNode)]
+    if nombre is None:
+        return operaciones[0] if len(operaciones) == 1 else None
+    return next((o for o in operaciones if o.name and o.name.value == nombre), None)
+
+
+def _sujeto(contexto: Any) -> Optional[str]:
+    """Id del usuario del JWT, SUJETO_ANONIMO sin token, o None si el token no es válido."""
+    token = contexto.get("auth_header") if isinstance(contexto, dict) else None
+    if not token:
+        return SUJETO_ANONIMO
+    try:
+        payload = claims_de_contexto(contexto)
+    except Exception:
+        return None
+    sujeto = payload.get("sub") or payload.get("id") or payload.get("email")
+    return str(sujeto) if sujeto is not None else None
+
+
+def _invalidar_agregados(variables: Dict[str, Any]) -> None:
+    """Tras una mutación, refrescar los agregados del negocio afectado (o todos)."""
+    negocio_id = variables.get("negocioId") or variables.get("negocio_id")
+    if negocio_id is not None:
+        agregados.invalidar(str(negocio_id))
+    else:
+        agregados.invalidar_todos()
+
+
+class CacheConsultas(SchemaExtension):
+    """Devuelve de la caché las queries de solo lectura ya resueltas para el mismo usuario."""
+
+    def on_execute(self):
+        ctx = self.execution_context
+        operacion = _operacion(ctx.graphql_document, ctx.operation_name) if ctx.graphql_document else None
+        if operacion is None:
+            yield
+            return
+
+        if operacion.operation == OperationType.MUTATION:
+            yield
+            campos = _campos_raiz(ctx.graphql_document, operacion) or frozenset()
+            afectados = [c for m in campos for c in INVALIDA_POR_MUTACION.get(m, ())]
+            todos = any(m not in INVALIDA_POR_MUTACION for m in campos)
+            respuestas.invalidar(None if todos else afectados)
+            _invalidar_agregados(ctx.variables or {})
+            return
+
+        campos = _campos_raiz(ctx.graphql_document, operacion)
+        sujeto = _sujeto(ctx.context)
+        if (
+            operacion.operation != OperationType.QUERY or sujeto is None
+            or not campos or not campos <= TTL_POR_CAMPO.keys()
+        ):
+            yield
+            return
+
+        clave = hashlib.sha256(json.dumps(
+            [ctx.query, ctx.operation_name, ctx.variables or {}, sujeto], sort_keys=True, default=str
+        ).encode()).hexdigest()
+        data = respuestas.get(clave)
+        if data is not None:
+            ctx.result = ExecutionResult(data=data)
+            yield
+            return
+
+        yield
+        resultado = ctx.result
+        if isinstance(resultado, ExecutionResult) and not resultado.errors and resultado.data is not None:
+            respuestas.set(clave, resultado.data, campos, min(TTL_POR_CAMPO[c] for c in campos))
+
+
+# Singleton instance
+respuestas = CacheRespuestas()
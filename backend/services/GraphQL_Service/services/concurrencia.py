@@ -0,0 +1,32 @@
+"""
+Concurrencia estructurada para resolvers que combinan varias llamadas.
+
+Los resolvers compuestos (dashboard, resumen, listados por usuario, informes
+PDF) necesitan varios listados independientes de la REST API. Con
+en_paralelo se piden a la vez y la latencia total es la de la llamada más
+lenta, no la suma.
+
+A diferencia de asyncio.gather a secas, si una llamada falla se cancelan
+las demás antes de propagar el error, y el error es la excepción original
+(no un ExceptionGroup como en asyncio.TaskGroup), así los mensajes de error
+que ya devuelven los resolvers no cambian.
+"""
+import asyncio
+from typing import Any, Awaitable, List
+
+
+async def en_paralelo(*llamadas: Awaitable[Any]) -> List[Any]:
+    """
+    Ejecuta las llamadas concurrentemente y devuelve sus resultados en orden.
+
+    Si alguna falla (o se cancela quien espera), cancela las que sigan en
+    curso, espera a que terminen y relanza la primera excepción.
+    """
+    tareas = [asyncio.ensure_future(llamada) for llamada in llamadas]
+    try:
+        return await asyncio.gather(*tareas)
+    except BaseException:
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+        raise
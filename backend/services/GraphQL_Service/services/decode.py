@@ -1,17 +1,56 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
 import jwt
 from config import config
 
+# sha256(token) -> (exp, claims): tokens ya verificados, hasta que expiran
+_verificados: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+
 def decode_jwt(token: str):
     if not token:
         raise Exception("Token vacío o no enviado")
 
     # Quitar "Bearer "
-    token = token.replace("Bearer ", "")
+    if token.startswith("Bearer "):
+        token = token[7:]
+
+    # Mismo token ya verificado y aún vigente: sin volver a comprobar la firma
+    clave = hashlib.sha256(token.encode()).hexdigest()
+    verificado = _verificados.get(clave)
+    if verificado is not None:
+        if time.time() < verificado[0]:
+            _verificados.move_to_end(clave)
+            return dict(verificado[1])
+        del _verificados[clave]
 
     try:
         payload = jwt.decode(token, config.JWT_SECRET, algorithms=["HS256"])
-        return payload
     except jwt.ExpiredSignatureError:
         raise Exception("Token expirado")
     except jwt.InvalidTokenError:
         raise Exception("Token inválido")
+
+    exp = payload.get("exp")
+    _verificados[clave] = (float(exp) if exp is not None else float("inf"), payload)
+    while len(_verificados) > config.JWT_CACHE_MAX:
+        _verificados.popitem(last=False)
+    return dict(payload)
+
+
+def claims_de_contexto(context: Dict[str, Any]) -> Dict[str, Any]:
+    """Claims del JWT que get_context ya verificó para esta petición.
+
+    Relanza el mismo error que daría decode_jwt si el token falta o no es
+    válido.
+    """
+    error: Optional[str] = context.get("jwt_error")
+    if error:
+        raise Exception(error)
+    claims = context.get("claims")
+    if claims is None:
+        claims = decode_jwt(context.get("auth_header"))
+    return claims
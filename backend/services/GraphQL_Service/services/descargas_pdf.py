@@ -0,0 +1,81 @@
+"""
+PDFs ya generados, guardados unos minutos para descargarlos sin volver a
+generarlos.
+
+Cuando una query de informe pide urlDescarga, los bytes del PDF quedan
+aquí bajo un token aleatorio ligado al usuario del JWT, y la URL lleva ese
+token: GET /informes/{tipo}?descarga=<token> los devuelve tal cual. Si el
+token venció, fue expulsado o lo guardó otro worker, la ruta genera el
+informe de nuevo, como sin token.
+
+En memoria y por proceso, con TTL (PDF_DESCARGA_TTL) y tope de bytes
+(PDF_DESCARGA_MAX_BYTES): al pasarlo se expulsan los más antiguos.
+"""
+import secrets
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from config import config
+
+# token -> (expira, sujeto, nombre_archivo, pdf)
+Descarga = Tuple[float, str, str, bytes]
+
+
+def sujeto_de(claims: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Usuario del JWT (sub, id o email), o None sin claims."""
+    if not claims:
+        return None
+    sujeto = claims.get("sub") or claims.get("id") or claims.get("email")
+    return str(sujeto) if sujeto is not None else None
+
+
+class AlmacenDescargas:
+    """PDFs por token con TTL y tope total de bytes (LRU por antigüedad)."""
+
+    def __init__(self, ttl_segundos: Optional[float] = None, max_bytes: Optional[int] = None):
+        self.ttl = config.PDF_DESCARGA_TTL if ttl_segundos is None else ttl_segundos
+        self.max_bytes = config.PDF_DESCARGA_MAX_BYTES if max_bytes is None else max_bytes
+        self._descargas: "OrderedDict[str, Descarga]" = OrderedDict()
+        self._bytes = 0
+
+    def guardar(self, sujeto: str, nombre_archivo: str, pdf: bytes) -> Optional[str]:
+        """Guarda el PDF y devuelve su token, o None si no cabe."""
+        if len(pdf) > self.max_bytes:
+            return None
+        self._purgar(time.monotonic())
+        token = secrets.token_urlsafe(24)
+        self._descargas[token] = (time.monotonic() + self.ttl, sujeto, nombre_archivo, pdf)
+        self._bytes += len(pdf)
+        while self._bytes > self.max_bytes:
+            self._quitar(next(iter(self._descargas)))
+        return token
+
+    def obtener(self, token: str, sujeto: Optional[str]) -> Optional[Tuple[str, bytes]]:
+        """(nombre_archivo, pdf) del token si sigue vigente y es del mismo usuario."""
+        descarga = self._descargas.get(token)
+        if descarga is None:
+            return None
+        expira, dueno, nombre_archivo, pdf = descarga
+        if time.monotonic() >= expira:
+            self._quitar(token)
+            return None
+        if sujeto is None or dueno != sujeto:
+            return None
+        return nombre_archivo, pdf
+
+    def limpiar(self) -> None:
+        self._descargas.clear()
+        self._bytes = 0
+
+    def _purgar(self, ahora: float) -> None:
+        # Insertados en orden y con el mismo TTL: los vencidos están al principio
+        while self._descargas and next(iter(self._descargas.values()))[0] <= ahora:
+            self._quitar(next(iter(self._descargas)))
+
+    def _quitar(self, token: str) -> None:
+        self._bytes -= len(self._descargas.pop(token)[3])
+
+
+# Singleton instance
+descargas = AlmacenDescargas()
@@ -1,53 +1,216 @@
 import httpx
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote, urlencode
 from config import config
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Filtros que la REST API aplica en el servidor, por endpoint de lista.
+# /api/citas/ solo aplica UNO (el primero presente, en este orden).
+FILTROS_SERVIDOR: Dict[str, Tuple[Tuple[str, ...], bool]] = {
+    "/api/citas/": (("negocio_id", "estacion_id", "cliente_id"), True),
+    "/api/servicios": (("negocio_id",), False),
+}
+
+# Filtros que la REST API expone como ruta en lugar de query string
+RUTAS_FILTRADAS: Dict[Tuple[str, str], str] = {
+    ("/api/estaciones/", "negocio_id"): "/api/estaciones/negocio/{valor}",
+}
+
+
+class Consulta:
+    """
+    Query builder para listados de la REST API.
+
+    Los filtros que el endpoint soporta van en la URL (query string o ruta);
+    el resto se aplica en Python sobre la respuesta. filtrar() siempre
+    vuelve a aplicar todos, así el resultado es el mismo aunque la REST API
+    ignore un parámetro.
+
+    Ejemplo:
+        Consulta("/api/citas/").donde(negocio_id=n, estado="atendida").entre("2025-01-01", "2025-01-31")
+    """
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.filtros: Dict[str, Any] = {}
+        self.campo_fecha = "fecha"
+        self.desde: Optional[str] = None
+        self.hasta: Optional[str] = None
+
+    def donde(self, **filtros: Any) -> "Consulta":
+        """Filtros por igualdad; los None se ignoran."""
+        self.filtros.update({k: v for k, v in filtros.items() if v is not None})
+        return self
+
+    def entre(self, desde: Optional[str] = None, hasta: Optional[str] = None, campo: str = "fecha") -> "Consulta":
+        """Rango inclusivo sobre un campo de fecha ISO (YYYY-MM-DD...)."""
+        self.campo_fecha = campo
+        self.desde = desde
+        self.hasta = hasta
+        return self
+
+    @property
+    def vacia(self) -> bool:
+        return not self.filtros and self.desde is None and self.hasta is None
+
+    def del_servidor(self) -> Dict[str, Any]:
+        """Filtros que viajan a la REST API."""
+        for campo, valor in self.filtros.items():
+            if (self.endpoint, campo) in RUTAS_FILTRADAS:
+                return {campo: valor}
+        soportados, uno_solo = FILTROS_SERVIDOR.get(self.endpoint, ((), False))
+        enviados = {campo: self.filtros[campo] for campo in soportados if campo in self.filtros}
+        if uno_solo and enviados:
+            primero = next(iter(enviados))
+            return {primero: enviados[primero]}
+        return enviados
+
+    def url(self) -> str:
+        """Endpoint con los filtros del servidor aplicados."""
+        enviados = self.del_servidor()
+        for campo, valor in enviados.items():
+            ruta = RUTAS_FILTRADAS.get((self.endpoint, campo))
+            if ruta:
+                return ruta.format(valor=quote(str(valor), safe=""))
+        if not enviados:
+            return self.endpoint
+        return f"{self.endpoint}?{urlencode(enviados)}"
+
+    def cumple(self, item: Dict[str, Any]) -> bool:
+        for campo, valor in self.filtros.items():
+            if str(item.get(campo)) != str(valor):
+                return False
+        if self.desde is not None or self.hasta is not None:
+            fecha = item.get(self.campo_fecha)
+            if fecha is None:
+                return False
+            fecha = str(fecha)
+            if self.desde is not None and fecha[:len(self.desde)] < self.desde:
+                return False
+            if self.hasta is not None and fecha[:len(self.hasta)] > self.hasta:
+                return False
+        return True
+
+    def filtrar(self, items: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Aplica todos los filtros en Python (ruta de respaldo)."""
+        if self.vacia:
+            return list(items)
+        return [item for item in items if self.cumple(item)]
+
 
 class HTTPClient:
+    """
+    Cliente de la REST API con un único httpx.AsyncClient por proceso.
+
+    El pool de conexiones se abre en el lifespan de la app (start) y se
+    reutiliza en todas las llamadas, así cada resolver no paga un handshake
+    TCP nuevo. Si se usa fuera del lifespan (scripts), se abre al primer uso.
+    """
+
     def __init__(self):
         self.base_url = config.REST_API_BASE_URL
         self.timeout = config.HTTP_TIMEOUT
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _build_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=config.HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY
+        )
+        timeout = httpx.Timeout(self.timeout, connect=config.HTTP_CONNECT_TIMEOUT)
+        try:
+            return httpx.AsyncClient(
+                base_url=self.base_url, timeout=timeout, limits=limits,
+                http2=config.HTTP2, max_redirects=config.HTTP_MAX_REDIRECTS
+            )
+        except ImportError:
+            logger.warning("HTTP2=true pero falta el paquete h2 (pip install httpx[http2]); usando HTTP/1.1")
+            return httpx.AsyncClient(
+                base_url=self.base_url, timeout=timeout, limits=limits,
+                max_redirects=config.HTTP_MAX_REDIRECTS
+            )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
 
-    async def get(self, endpoint: str, headers: Optional[Dict[str, str]] = None) -> Any:
+    async def start(self) -> None:
+        """Open the connection pool (called from the app lifespan)."""
+        _ = self.client
+
+    async def close(self) -> None:
+        """Close the connection pool (called from the app lifespan)."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get(
+        self,
+        endpoint: str,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None
+    ) -> Any:
         """Make a GET request to the REST API. Optional headers can be provided (e.g. Authorization)."""
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                if headers:
-                    auth_header = headers.get("Authorization", "")
-                    if auth_header:
-                        logger.info(f"Reenviando Authorization a REST API: {endpoint} - {auth_header[:20]}...")
-                
-                response = await client.get(f"{self.base_url}{endpoint}", headers=headers)
-                response.raise_for_status()
-                return response.json()
-            except httpx.HTTPError as e:
-                logger.error(f"HTTP error en GET {endpoint}: {e}")
-                raise
-            except Exception as e:
-                logger.error(f"Error en GET {endpoint}: {e}")
-                raise
-
-    async def post(self, endpoint: str, data: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> Any:
+        try:
+            if headers:
+                auth_header = headers.get("Authorization", "")
+                if auth_header:
+                    logger.info(f"Reenviando Authorization a REST API: {endpoint} - {auth_header[:20]}...")
+            
+            response = await self.client.get(endpoint, headers=headers, **self._timeout(timeout))
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            logger.error(f"HTTP error en GET {endpoint}: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Error en GET {endpoint}: {e}")
+            raise
+
+    async def post(
+        self,
+        endpoint: str,
+        data: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None
+    ) -> Any:
         """Make a POST request to the REST API. Optional headers can be provided (e.g. Authorization)."""
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                if headers:
-                    auth_header = headers.get("Authorization", "")
-                    if auth_header:
-                        logger.info(f"Reenviando Authorization a REST API: {endpoint} - {auth_header[:20]}...")
-                
-                response = await client.post(f"{self.base_url}{endpoint}", json=data, headers=headers)
-                response.raise_for_status()
-                return response.json()
-            except httpx.HTTPError as e:
-                logger.error(f"HTTP error en POST {endpoint}: {e}")
-                raise
-            except Exception as e:
-                logger.error(f"Error en POST {endpoint}: {e}")
-                raise
+        try:
+            if headers:
+                auth_header = headers.get("Authorization", "")
+                if auth_header:
+                    logger.info(f"Reenviando Authorization a REST API: {endpoint} - {auth_header[:20]}...")
+            
+            response = await self.client.post(endpoint, json=data, headers=headers, **self._timeout(timeout))
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            logger.error(f"HTTP error en POST {endpoint}: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Error en POST {endpoint}: {e}")
+            raise
+
+    async def consultar(
+        self,
+        consulta: Consulta,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """GET de un listado filtrado: lo que soporta la REST API va en la URL, el resto se filtra aquí."""
+        data = await self.get(consulta.url(), headers=headers, timeout=timeout)
+        return consulta.filtrar(data)
+
+    def _timeout(self, timeout: Optional[float]) -> Dict[str, Any]:
+        """Per-request timeout override; the pool default applies otherwise."""
+        if timeout is None:
+            return {}
+        return {"timeout": httpx.Timeout(timeout, connect=config.HTTP_CONNECT_TIMEOUT)}
 
 
 # Singleton instance
@@ -0,0 +1,121 @@
+"""
+DataLoaders por petición GraphQL.
+
+get_context crea un RestLoaders por operación y lo deja en
+info.context["loaders"]. Durante esa operación:
+
+- consultar(consulta) pide listados filtrados (services.http_client.Consulta);
+  si el listado completo ya se descargó en esta operación, filtra sobre él.
+- get(endpoint) memoiza el JSON de cada endpoint: si varios campos (o un
+  resolver compuesto y un PDF) piden /api/citas/, se descarga una sola vez,
+  aunque las llamadas lleguen a la vez.
+- citas/servicios/negocios/estaciones/usuarios/horarios son DataLoaders
+  por id: agrupan los load(id) del mismo tick, descartan ids repetidos y,
+  si la lista del recurso ya se descargó en esta operación, resuelven
+  desde ella sin ir a la red.
+
+Todo trabaja con el JSON crudo de la REST API; los resolvers siguen
+construyendo los tipos GraphQL. Nada se comparte entre peticiones.
+"""
+import asyncio
+from typing import Any, Dict, List, Optional, Sequence
+
+from strawberry.dataloader import DataLoader
+
+from services.http_client import Consulta, http_client
+
+# recurso -> (endpoint de lista, endpoint por id)
+RECURSOS: Dict[str, tuple] = {
+    "citas": ("/api/citas/", "/api/citas/{id}"),
+    "servicios": ("/api/servicios", "/api/servicios/{id}"),
+    "negocios": ("/api/negocios/", "/api/negocios/{id}"),
+    "estaciones": ("/api/estaciones/", "/api/estaciones/{id}"),
+    "usuarios": ("/api/usuarios/", "/api/usuarios/id/{id}"),
+    "horarios": ("/api/horarios-atencion/", "/api/horarios-atencion/{id}"),
+}
+
+
+class RestLoaders:
+    """Caché y batching de llamadas a la REST API para una sola operación GraphQL."""
+
+    def __init__(self, token: Optional[str] = None):
+        self.headers = {"Authorization": token} if token else None
+        self._respuestas: Dict[str, asyncio.Future] = {}
+        self.peticiones = 0  # GETs reales enviados (para logs y benchmarks)
+
+        self.citas = self._loader("citas")
+        self.servicios = self._loader("servicios")
+        self.negocios = self._loader("negocios")
+        self.estaciones = self._loader("estaciones")
+        self.usuarios = self._loader("usuarios")
+        self.horarios = self._loader("horarios")
+
+    async def get(self, endpoint: str) -> Any:
+        """GET memoizado: una sola petición por endpoint durante la operación."""
+        respuesta = self._respuestas.get(endpoint)
+        if respuesta is None:
+            respuesta = asyncio.ensure_future(self._fetch(endpoint))
+            self._respuestas[endpoint] = respuesta
+        # shield: si se cancela un resolver, la descarga sigue para los demás
+        return await asyncio.shield(respuesta)
+
+    async def lista(self, recurso: str) -> List[Dict[str, Any]]:
+        """Lista completa de un recurso de RECURSOS, memoizada."""
+        return await self.get(RECURSOS[recurso][0])
+
+    async def consultar(self, consulta: Consulta) -> List[Dict[str, Any]]:
+        """Listado filtrado, memoizado por URL."""
+        completo = self._respuestas.get(consulta.endpoint)
+        if completo is not None and completo.done() and not completo.exception():
+            return consulta.filtrar(completo.result())
+        return consulta.filtrar(await self.get(consulta.url()))
+
+    async def _fetch(self, endpoint: str) -> Any:
+        self.peticiones += 1
+        return await http_client.get(endpoint, headers=self.headers)
+
+    def _loader(self, recurso: str) -> DataLoader:
+        async def cargar(ids: List[str]) -> Sequence[Any]:
+            return await self._cargar_por_id(recurso, ids)
+        return DataLoader(load_fn=cargar)
+
+    async def _cargar_por_id(self, recurso: str, ids: List[str]) -> Sequence[Any]:
+        endpoint_lista, endpoint_id = RECURSOS[recurso]
+        indice: Dict[str, Any] = {}
+        lista = self._respuestas.get(endpoint_lista)
+        if lista is not None and lista.done() and not lista.exception() and isinstance(lista.result(), list):
+            indice = {str(item.get("id")): item for item in lista.result() if isinstance(item, dict)}
+
+        faltantes = [i for i in ids if str(i) not in indice]
+        if faltantes:
+            resultados = await asyncio.gather(
+                *(self.get(endpoint_id.format(id=i)) for i in faltantes),
+                return_exceptions=True
+            )
+            indice.update({str(i): r for i, r in zip(faltantes, resultados)})
+        # DataLoader propaga las excepciones devueltas solo al load() de ese id
+        return [indice[str(i)] for i in ids]
+
+
+async def get_lista(recurso: str, token: Optional[str] = None, loaders: Optional[RestLoaders] = None) -> Any:
+    """Lista de un recurso: memoizada si hay loaders (dentro de una operación), directa si no."""
+    if loaders is not None:
+        return await loaders.lista(recurso)
+    headers = {"Authorization": token} if token else None
+    return await http_client.get(RECURSOS[recurso][0], headers=headers)
+
+
+async def get_por_id(recurso: str, id: str, token: Optional[str] = None, loaders: Optional[RestLoaders] = None) -> Any:
+    """Un elemento por id: vía DataLoader si hay loaders, GET directo si no."""
+    if loaders is not None:
+        return await getattr(loaders, recurso).load(id)
+    headers = {"Authorization": token} if token else None
+    return await http_client.get(RECURSOS[recurso][1].format(id=id), headers=headers)
+
+
+async def get_consulta(consulta: Consulta, token: Optional[str] = None, loaders: Optional[RestLoaders] = None) -> List[Dict[str, Any]]:
+    """Listado filtrado: memoizado si hay loaders, directo si no."""
+    if loaders is not None:
+        return await loaders.consultar(consulta)
+    headers = {"Authorization": token} if token else None
+    return await http_client.consultar(consulta, headers=headers)
@@ -0,0 +1,99 @@
+"""
+Generación de PDFs fuera del event loop.
+
+SimpleDocTemplate.build es CPU puro y tarda lo que tarde el informe; dentro
+de un resolver async bloqueaba todas las demás peticiones del proceso.
+GeneradorPdf lo manda a un ProcessPoolExecutor:
+
+- workers calientes: se arrancan en el lifespan de la app y cada uno crea
+  su PdfService (hojas de estilo de ReportLab) una sola vez al iniciar
+- acotado: PDF_WORKERS procesos y como mucho PDF_MAX_PENDIENTES informes
+  en curso o en cola; el resto espera sin ocupar memoria del pool
+- si un worker muere (BrokenProcessPool) se recrea el pool y se reintenta
+  una vez; el arranque del pool nuevo (que espera a los workers) corre en
+  un hilo para no frenar el event loop
+
+Los datos del informe viajan al worker por pickle y vuelve el dict de
+PdfService con los bytes del PDF.
+"""
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+from config import config
+from services.pdf_service import PdfService
+import logging
+
+logger = logging.getLogger(__name__)
+
+# PdfService del worker, creado por el initializer del pool
+_servicio: Optional[PdfService] = None
+
+
+def _iniciar_worker() -> None:
+    global _servicio
+    _servicio = PdfService()
+
+
+def _listo() -> int:
+    return os.getpid()
+
+
+def _renderizar(metodo: str, datos: Dict[str, Any]) -> Dict[str, Any]:
+    servicio = _servicio if _servicio is not None else PdfService()
+    return getattr(servicio, metodo)(datos)
+
+
+class GeneradorPdf:
+    """Pool de procesos acotado para los métodos generar_* de PdfService."""
+
+    def __init__(self, workers: Optional[int] = None, max_pendientes: Optional[int] = None):
+        self.workers = workers or config.PDF_WORKERS
+        self.max_pendientes = max_pendientes or config.PDF_MAX_PENDIENTES
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._cupos: Optional[asyncio.Semaphore] = None
+        self._arranque: Optional[asyncio.Lock] = None
+
+    def start(self) -> None:
+        """Arranca los workers y espera a que todos tengan su PdfService listo."""
+        if self._pool is not None:
+            return
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_iniciar_worker)
+        # Cada submit sin worker libre lanza uno nuevo: así arrancan todos ahora
+        pids = {f.result() for f in [self._pool.submit(_listo) for _ in range(self.workers)]}
+        logger.info(f"Pool de PDFs listo: {len(pids)} workers")
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def generar(self, metodo: str, datos: Dict[str, Any]) -> Dict[str, Any]:
+        """Ejecuta PdfService.<metodo>(datos) en un worker."""
+        if self._cupos is None:
+            self._cupos = asyncio.Semaphore(self.max_pendientes)
+            self._arranque = asyncio.Lock()
+        async with self._cupos:
+            for intento in range(2):
+                if self._pool is None:
+                    async with self._arranque:
+                        if self._pool is None:
+                            await asyncio.to_thread(self.start)
+                pool = self._pool
+                try:
+                    return await asyncio.get_running_loop().run_in_executor(
+                        pool, _renderizar, metodo, datos
+                    )
+                except BrokenProcessPool:
+                    if self._pool is pool:
+                        logger.error("Pool de PDFs roto, recreándolo")
+                        pool.shutdown(wait=False, cancel_futures=True)
+                        self._pool = None
+                    if intento:
+                        raise
+
+
+# Singleton instance
+generador_pdf = GeneradorPdf()
@@ -7,7 +7,6 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib.enums import TA_CENTER
 from datetime import datetime
 from io import BytesIO
-import base64
 
 
 class PdfService:
@@ -167,7 +166,7 @@ class PdfService:
                 - ranking: list (lista de servicios con nombre y total_citas)
         
         Returns:
-            dict con 'pdfBase64', 'nombreArchivo' y 'mensaje'
+            dict con 'pdf' (bytes), 'nombreArchivo' y 'mensaje'
         """
         try:
             buffer = BytesIO()
@@ -221,15 +220,12 @@ class PdfService:
             pdf_bytes = buffer.getvalue()
             buffer.close()
             
-            # Convertir a base64
-            pdf_base64 = base64.b64encode(pdf_bytes).decode('utf-8')
-            
             # Generar nombre de archivo
             nombre_archivo = f"Reporte_Servicios_Mas_Solicitados_{nombre_negocio.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
             
             return {
                 'success': True,
-                'pdfBase64': pdf_base64,
+                'pdf': pdf_bytes,
                 'nombreArchivo': nombre_archivo,
                 'mensaje': 'PDF generado exitosamente'
             }
@@ -237,7 +233,7 @@ class PdfService:
         except Exception as e:
             return {
                 'success': False,
-                'pdfBase64': '',
+                'pdf': b'',
                 'nombreArchivo': '',
                 'mensaje': f'Error al generar PDF: {str(e)}'
             }
@@ -252,7 +248,7 @@ class PdfService:
                 - estaciones: list (lista de estaciones con nombre, total_citas, citas_atendidas, etc.)
         
         Returns:
-            dict con 'pdfBase64', 'nombreArchivo' y 'mensaje'
+            dict con 'pdf' (bytes), 'nombreArchivo' y 'mensaje'
         """
         try:
             buffer = BytesIO()
@@ -310,15 +306,12 @@ class PdfService:
             pdf_bytes = buffer.getvalue()
             buffer.close()
             
-            # Convertir a base64
-            pdf_base64 = base64.b64encode(pdf_bytes).decode('utf-8')
-            
             # Generar nombre de archivo
             nombre_archivo = f"Reporte_Ocupacion_Estaciones_{nombre_negocio.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
             
             return {
                 'success': True,
-                'pdfBase64': pdf_base64,
+                'pdf': pdf_bytes,
                 'nombreArchivo': nombre_archivo,
                 'mensaje': 'PDF generado exitosamente'
             }
@@ -326,7 +319,7 @@ class PdfService:
         except Exception as e:
             return {
                 'success': False,
-                'pdfBase64': '',
+                'pdf': b'',
                 'nombreArchivo': '',
                 'mensaje': f'Error al generar PDF: {str(e)}'
             }
@@ -345,7 +338,7 @@ class PdfService:
                 - ingresosPorMes: list (lista con mes y ingresos) - opcional
         
         Returns:
-            dict con 'pdfBase64', 'nombreArchivo' y 'mensaje'
+            dict con 'pdf' (bytes), 'nombreArchivo' y 'mensaje'
         """
         try:
             buffer = BytesIO()
@@ -443,15 +436,12 @@ class PdfService:
             pdf_bytes = buffer.getvalue()
             buffer.close()
             
-            # Convertir a base64
-            pdf_base64 = base64.b64encode(pdf_bytes).decode('utf-8')
-            
             # Generar nombre de archivo
             nombre_archivo = f"Reporte_Ingresos_{nombre_negocio.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
             
             return {
                 'success': True,
-                'pdfBase64': pdf_base64,
+                'pdf': pdf_bytes,
                 'nombreArchivo': nombre_archivo,
                 'mensaje': 'PDF generado exitosamente'
             }
@@ -459,21 +449,21 @@ class PdfService:
         except Exception as e:
             return {
                 'success': False,
-                'pdfBase64': '',
+                'pdf': b'',
                 'nombreArchivo': '',
                 'mensaje': f'Error al generar PDF: {str(e)}'
             }
 
     
-    def generar_pdf_base64(self, perfil_data: dict) -> dict:
+    def generar_pdf_perfil(self, perfil_data: dict) -> dict:
         """
-        Genera un PDF y lo retorna en base64
+        Genera el PDF del perfil del usuario
         
         Args:
             perfil_data: Diccionario con datos del perfil completo del usuario
             
         Returns:
-            dict con 'pdfBase64', 'nombreArchivo' y 'mensaje'
+            dict con 'pdf' (bytes), 'nombreArchivo' y 'mensaje'
         """
         try:
             # Crear buffer en memoria
@@ -511,16 +501,13 @@ class PdfService:
             pdf_bytes = buffer.getvalue()
             buffer.close()
             
-            # Convertir a base64
-            pdf_base64 = base64.b64encode(pdf_bytes).decode('utf-8')
-            
             # Generar nombre de archivo
             nombre_completo = perfil_data.get('nombreCompleto', 'Usuario')
             nombre_archivo = f"Informe_{nombre_completo.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
             
             return {
                 'success': True,
-                'pdfBase64': pdf_base64,
+                'pdf': pdf_bytes,
                 'nombreArchivo': nombre_archivo,
                 'mensaje': 'PDF generado exitosamente'
             }
@@ -528,7 +515,7 @@ class PdfService:
         except Exception as e:
             return {
                 'success': False,
-                'pdfBase64': '',
+                'pdf': b'',
                 'nombreArchivo': '',
                 'mensaje': f'Error al generar PDF: {str(e)}'
             }
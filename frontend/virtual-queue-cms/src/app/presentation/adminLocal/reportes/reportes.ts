@@ -47,9 +47,21 @@ export class Reportes {
 
     reporteObservable.subscribe({
       next: (response) => {
-        if (response.success) {
+        if (response.success && response.pdfBase64) {
           this.descargarPDF(response.pdfBase64, response.nombreArchivo);
           this.mostrarMensaje('Reporte generado exitosamente', 'success');
+        } else if (response.success && response.urlDescarga) {
+          // Informe grande: el PDF no viene en base64, se descarga aparte
+          this.reportesGraphQl.descargar_pdf(response.urlDescarga).subscribe({
+            next: (blob) => {
+              this.guardarPDF(blob, response.nombreArchivo);
+              this.mostrarMensaje('Reporte generado exitosamente', 'success');
+            },
+            error: (error) => {
+              console.error('Error al descargar PDF:', error);
+              this.mostrarMensaje('Error al descargar el PDF', 'error');
+            }
+          });
         } else {
           this.mostrarMensaje(response.mensaje || 'Error al generar el reporte', 'error');
         }
@@ -72,27 +84,29 @@ export class Reportes {
         byteNumbers[i] = byteCharacters.charCodeAt(i);
       }
       const byteArray = new Uint8Array(byteNumbers);
-      const blob = new Blob([byteArray], { type: 'application/pdf' });
-
-      // Crear enlace de descarga
-      const url = window.URL.createObjectURL(blob);
-      const link = document.createElement('a');
-      link.href = url;
-      link.download = nombreArchivo;
-
-      // Simular click para descargar
-      document.body.appendChild(link);
-      link.click();
-
-      // Limpiar
-      document.body.removeChild(link);
-      window.URL.revokeObjectURL(url);
+      this.guardarPDF(new Blob([byteArray], { type: 'application/pdf' }), nombreArchivo);
     } catch (error) {
       console.error('Error al descargar PDF:', error);
       this.mostrarMensaje('Error al descargar el PDF', 'error');
     }
   }
 
+  private guardarPDF(blob: Blob, nombreArchivo: string) {
+    // Crear enlace de descarga
+    const url = window.URL.createObjectURL(blob);
+    const link = document.createElement('a');
+    link.href = url;
+    link.download = nombreArchivo;
+
+    // Simular click para descargar
+    document.body.appendChild(link);
+    link.click();
+
+    // Limpiar
+    document.body.removeChild(link);
+    window.URL.revokeObjectURL(url);
+  }
+
   private mostrarMensaje(mensaje: string, tipo: 'success' | 'error') {
     this.mensaje.set(mensaje);
     this.mensajeTipo.set(tipo);
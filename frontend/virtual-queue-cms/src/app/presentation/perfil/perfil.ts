@@ -254,7 +254,7 @@ export class PerfilComponent implements OnInit {
     // Usar GraphQL directamente para generar el PDF
     this.userGraphQl.generar_informe_pdf().subscribe({
       next: (response) => {
-        if (response.success) {
+        if (response.success && response.pdfBase64) {
           // Convertir base64 a Blob
           const byteCharacters = atob(response.pdfBase64);
           const byteNumbers = new Array(byteCharacters.length);
@@ -262,29 +262,21 @@ export class PerfilComponent implements OnInit {
             byteNumbers[i] = byteCharacters.charCodeAt(i);
           }
           const byteArray = new Uint8Array(byteNumbers);
-          const blob = new Blob([byteArray], { type: 'application/pdf' });
+          this.guardarPDF(new Blob([byteArray], { type: 'application/pdf' }), response.nombreArchivo);
+        } else if (response.success && response.urlDescarga) {
+          // Informe grande: el PDF no viene en base64, se descarga aparte
+          this.userGraphQl.descargar_pdf(response.urlDescarga).subscribe({
+            next: (blob) => this.guardarPDF(blob, response.nombreArchivo),
+            error: (err) => {
+              console.error('Error al descargar el PDF:', err);
+              this.isSaving = false;
+              this.saveMessage = 'Error al descargar el informe PDF. Por favor, inténtalo de nuevo.';
 
-          // Crear enlace de descarga
-          const url = window.URL.createObjectURL(blob);
-          const link = document.createElement('a');
-          link.href = url;
-          link.download = response.nombreArchivo;
-
-          // Simular click para descargar
-          document.body.appendChild(link);
-          link.click();
-
-          // Limpiar
-          document.body.removeChild(link);
-          window.URL.revokeObjectURL(url);
-
-          this.isSaving = false;
-          this.saveMessage = '¡Informe PDF generado exitosamente!';
-
-          // Limpiar mensaje después de 3 segundos
-          setTimeout(() => {
-            this.saveMessage = '';
-          }, 3000);
+              setTimeout(() => {
+                this.saveMessage = '';
+              }, 5000);
+            }
+          });
         } else {
           // Error desde el servidor
           this.isSaving = false;
@@ -306,4 +298,28 @@ export class PerfilComponent implements OnInit {
       }
     });
   }
+
+  private guardarPDF(blob: Blob, nombreArchivo: string): void {
+    // Crear enlace de descarga
+    const url = window.URL.createObjectURL(blob);
+    const link = document.createElement('a');
+    link.href = url;
+    link.download = nombreArchivo;
+
+    // Simular click para descargar
+    document.body.appendChild(link);
+    link.click();
+
+    // Limpiar
+    document.body.removeChild(link);
+    window.URL.revokeObjectURL(url);
+
+    this.isSaving = false;
+    this.saveMessage = '¡Informe PDF generado exitosamente!';
+
+    // Limpiar mensaje después de 3 segundos
+    setTimeout(() => {
+      this.saveMessage = '';
+    }, 3000);
+  }
 }
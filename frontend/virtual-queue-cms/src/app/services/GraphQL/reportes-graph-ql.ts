@@ -1,11 +1,14 @@
 import { Injectable } from '@angular/core';
+import { HttpClient } from '@angular/common/http';
 import { Apollo, gql } from 'apollo-angular';
 import { Observable } from 'rxjs';
 import { map } from 'rxjs/operators';
+import { environment } from '../../environment/environment';
 
 interface InformePDFResponse {
   success: boolean;
-  pdfBase64: string;
+  pdfBase64: string; // vacío en informes grandes: usar urlDescarga
+  urlDescarga: string | null;
   nombreArchivo: string;
   mensaje: string;
 }
@@ -26,7 +29,14 @@ interface ReporteIngresosResponse {
   providedIn: 'root'
 })
 export class ReportesGraphQl {
-  constructor(private apollo: Apollo) { }
+  constructor(private apollo: Apollo, private http: HttpClient) { }
+
+  /**
+   * Descarga el PDF de un informe desde su urlDescarga (informes sin pdfBase64)
+   */
+  descargar_pdf(urlDescarga: string): Observable<Blob> {
+    return this.http.get(new URL(urlDescarga, environment.graphqlUrl).toString(), { responseType: 'blob' });
+  }
 
   /**
    * Genera un reporte PDF de servicios más solicitados del negocio
@@ -38,6 +48,7 @@ export class ReportesGraphQl {
           generarReporteServiciosMasSolicitadosPorNegocio {
             success
             pdfBase64
+            urlDescarga
             nombreArchivo
             mensaje
           }
@@ -59,6 +70,7 @@ export class ReportesGraphQl {
           generarReporteOcupacionEstaciones {
             success
             pdfBase64
+            urlDescarga
             nombreArchivo
             mensaje
           }
@@ -80,6 +92,7 @@ export class ReportesGraphQl {
           generarReporteIngresos {
             success
             pdfBase64
+            urlDescarga
             nombreArchivo
             mensaje
           }
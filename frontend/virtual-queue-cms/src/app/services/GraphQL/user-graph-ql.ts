@@ -1,7 +1,9 @@
 import { Injectable } from '@angular/core';
+import { HttpClient } from '@angular/common/http';
 import { Apollo, gql } from 'apollo-angular';
 import { Observable } from 'rxjs';
 import { map } from 'rxjs/operators';
+import { environment } from '../../environment/environment';
 
 interface PerfilCompletoResponse {
   perfilCompletoUsuario: {
@@ -19,7 +21,8 @@ interface PerfilCompletoResponse {
 interface InformePDFResponse {
   generarInformePdf: {
     success: boolean;
-    pdfBase64: string;
+    pdfBase64: string; // vacío en informes grandes: usar urlDescarga
+    urlDescarga: string | null;
     nombreArchivo: string;
     mensaje: string;
   };
@@ -34,7 +37,7 @@ export class UserGraphQl {
   private HOST = "http://localhost:5000";
   //private fullUrl = this.HOST + this.PATH;
 
-  constructor(private apollo: Apollo) { }
+  constructor(private apollo: Apollo, private http: HttpClient) { }
 
   perfil_completo_usuario() {
     return this.apollo.watchQuery<PerfilCompletoResponse>({
@@ -62,6 +65,7 @@ export class UserGraphQl {
           generarInformePdf {
             success
             pdfBase64
+            urlDescarga
             nombreArchivo
             mensaje
           }
@@ -72,4 +76,11 @@ export class UserGraphQl {
       map(result => result.data!.generarInformePdf)
     );
   }
+
+  /**
+   * Descarga el PDF de un informe desde su urlDescarga (informes sin pdfBase64)
+   */
+  descargar_pdf(urlDescarga: string): Observable<Blob> {
+    return this.http.get(new URL(urlDescarga, environment.graphqlUrl).toString(), { responseType: 'blob' });
+  }
 }
\ No newline at end of file
@@ -1,13 +1,28 @@
 """
 Adaptadores de pasarelas de pago.
 Implementan el patron Adapter para abstraer las diferentes pasarelas.
+
+Las clases concretas se importan bajo demanda (ver AdaptadorFactory):
+"from app.adaptador import StripeAdapter" sigue funcionando, pero importar
+el paquete no carga los modulos de cada pasarela.
 """
 from app.adaptador.base import ProveedorPagoBase, ResultadoPago, ResultadoReembolso
-from app.adaptador.mock_adapter import MockAdapter
-from app.adaptador.stripe_adapter import StripeAdapter
-from app.adaptador.mercadopago_adapter import MercadoPagoAdapter
 from app.adaptador.factory import obtener_adaptador, AdaptadorFactory
 
+_ADAPTADORES_PEREZOSOS = {
+    "MockAdapter": "mock",
+    "StripeAdapter": "stripe",
+    "MercadoPagoAdapter": "mercadopago",
+    "AdaptadorEnrutado": "enrutado"
+}
+
+
+def __getattr__(nombre: str):
+    if nombre in _ADAPTADORES_PEREZOSOS:
+        return AdaptadorFactory.obtener_clase(_ADAPTADORES_PEREZOSOS[nombre])
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
+
 __all__ = [
     "ProveedorPagoBase",
     "ResultadoPago",
@@ -15,6 +30,7 @@ __all__ = [
     "MockAdapter",
     "StripeAdapter",
     "MercadoPagoAdapter",
+    "AdaptadorEnrutado",
     "obtener_adaptador",
     "AdaptadorFactory"
 ]
@@ -2,13 +2,51 @@
 Interfaz base para proveedores de pago.
 Define el contrato que todos los adaptadores deben implementar.
 """
+import functools
+import time
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional, Dict, Any
 
+from app.metricas import metricas
 from app.modelos.pago import EstadoPago
 
+# Operaciones contra la pasarela cuya latencia se mide
+OPERACIONES_MEDIDAS = (
+    "crear_pago",
+    "verificar_pago",
+    "procesar_reembolso",
+    "crear_suscripcion",
+    "cancelar_suscripcion"
+)
+
+_latencia_pasarela = metricas.histograma(
+    "payment_pasarela_llamada_ms",
+    "Latencia de llamadas a la pasarela de pago por adaptador y operacion",
+    ("adaptador", "operacion", "resultado")
+)
+
+
+def _medir_operacion(operacion: str, metodo):
+    """Envuelve una operacion async del adaptador para medir su latencia."""
+
+    @functools.wraps(metodo)
+    async def medida(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        resultado = "error"
+        try:
+            respuesta = await metodo(self, *args, **kwargs)
+            resultado = "exitoso" if getattr(respuesta, "exitoso", True) else "fallido"
+            return respuesta
+        finally:
+            _latencia_pasarela.etiquetas(self.nombre, operacion, resultado).observar(
+                (time.perf_counter() - inicio) * 1000
+            )
+
+    medida._medida = True
+    return medida
+
 
 @dataclass
 class ResultadoPago:
@@ -24,6 +62,9 @@ class ResultadoPago:
     error: Optional[str] = None
     metadatos: Optional[Dict[str, Any]] = None
     timestamp: datetime = None
+    # La pasarela pudo haber procesado la operacion aunque no hubo respuesta
+    # (timeout, error de red): no es seguro repetirla en otra pasarela
+    incierto: bool = False
     
     def __post_init__(self):
         if self.timestamp is None:
@@ -48,8 +89,18 @@ class ProveedorPagoBase(ABC):
     """
     Interfaz abstracta para proveedores de pago.
     Todos los adaptadores deben implementar estos metodos.
+    
+    Las operaciones de OPERACIONES_MEDIDAS que defina cada subclase se
+    envuelven automaticamente para registrar su latencia por adaptador.
     """
     
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for operacion in OPERACIONES_MEDIDAS:
+            metodo = cls.__dict__.get(operacion)
+            if metodo is not None and not getattr(metodo, "_medida", False):
+                setattr(cls, operacion, _medir_operacion(operacion, metodo))
+    
     @property
     @abstractmethod
     def nombre(self) -> str:
@@ -187,3 +238,26 @@ class ProveedorPagoBase(ABC):
             True si la firma es valida
         """
         pass
+    
+    def precalentar(self) -> None:
+        """
+        Carga el SDK y los clientes de la pasarela antes de la primera
+        operacion. Por defecto no hace nada.
+        """
+        pass
+    
+    def reconoce_id(self, id_transaccion: str) -> bool:
+        """
+        Indica si un ID (de pago, sesion o suscripcion) tiene el formato de
+        esta pasarela. Lo usa el enrutador cuando no recuerda el origen.
+        Por defecto no reconoce ninguno.
+        """
+        return False
+    
+    async def sondear(self) -> bool:
+        """
+        Comprueba si la pasarela responde (lo usa el enrutador para
+        rehabilitarla). Por defecto asume que si; el enrutador igual la
+        saca de rotacion si fallan las operaciones reales.
+        """
+        return True
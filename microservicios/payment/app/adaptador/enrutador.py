@@ -0,0 +1,496 @@
+"""
+Adaptador enrutador: reparte los pagos entre varias pasarelas.
+
+Implementa ProveedorPagoBase sobre un conjunto de adaptadores concretos.
+Los pagos y suscripciones nuevos van a la pasarela con mejor latencia
+observada y menor tasa de error; si falla, se reintenta en la siguiente,
+pero solo cuando la primera seguro no tomo el pedido: tras un timeout o
+un error de red (resultado incierto) repetirlo en otra podria cobrar dos
+veces, asi que se devuelve el error.
+Cada pasarela tiene un circuito: tras varios fallos seguidos queda fuera
+de la rotacion hasta que una sonda (o el enfriamiento) la rehabilita.
+
+Las operaciones sobre un pago existente (verificar, reembolsar, cancelar)
+van siempre a la pasarela que lo creo: la recordada en memoria (por
+id_transaccion e id_externo), la guardada por quien llama con
+recordar_origen (p. ej. la de la suscripcion) o, si no, la que reconoce
+el formato del ID. Los pagos y suscripciones nuevos llevan el nombre de
+la pasarela en metadatos["pasarela"]; los webhooks que lo traen de vuelta
+se delegan a ese adaptador.
+"""
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.adaptador.base import ProveedorPagoBase, ResultadoPago, ResultadoReembolso
+from app.config import configuracion
+from app.metricas import formatear_familia
+from app.modelos.pago import EstadoPago
+from app.registro import get_logger
+
+logger = get_logger("pasarelas.enrutador")
+
+# Peso de la ultima observacion en los promedios moviles
+ALFA = 0.2
+# Cuanto penaliza la tasa de error frente a la latencia al ordenar
+PENALIZACION_ERROR = 10.0
+# Pagos recordados para enrutar verificaciones y reembolsos
+MAX_ORIGENES = 100_000
+# Estados del circuito de una pasarela
+CIRCUITOS = ("cerrado", "abierto", "semiabierto")
+
+
+@dataclass
+class EstadoPasarela:
+    """Salud observada de una pasarela."""
+    latencia_ms: Optional[float] = None
+    tasa_error: float = 0.0
+    fallos_consecutivos: int = 0
+    abierto_hasta: float = 0.0  # time.monotonic(); circuito abierto mientras no se alcance
+    llamadas: int = 0
+    fallos: int = 0
+
+    def disponible(self, ahora: float) -> bool:
+        return ahora >= self.abierto_hasta
+
+    def puntaje(self) -> float:
+        """Menor es mejor. Sin mediciones, 0: se prueba primero."""
+        return (self.latencia_ms or 0.0) * (1 + PENALIZACION_ERROR * self.tasa_error)
+
+
+class AdaptadorEnrutado(ProveedorPagoBase):
+    """
+    Enrutador de pagos con failover entre pasarelas.
+
+    Args:
+        adaptadores: Pasarelas a enrutar (default: ENRUTADOR_PASARELAS desde la factory)
+        timeout_segundos: Tiempo maximo por llamada (al crear, vencerlo no pasa a la siguiente)
+        fallos_para_abrir: Fallos seguidos que sacan a una pasarela de la rotacion
+        enfriamiento_segundos: Tiempo fuera de rotacion antes de reintentar
+        intervalo_sondeo: Segundos entre sondas de salud
+    """
+
+    def __init__(
+        self,
+        adaptadores: Optional[List[ProveedorPagoBase]] = None,
+        timeout_segundos: Optional[float] = None,
+        fallos_para_abrir: Optional[int] = None,
+        enfriamiento_segundos: Optional[float] = None,
+        intervalo_sondeo: Optional[float] = None
+    ):
+        if adaptadores is None:
+            from app.adaptador.factory import AdaptadorFactory
+            adaptadores = [AdaptadorFactory.obtener(nombre) for nombre in configuracion.ENRUTADOR_PASARELAS]
+        if not adaptadores:
+            raise ValueError("El enrutador necesita al menos una pasarela")
+
+        self._adaptadores: Dict[str, ProveedorPagoBase] = {a.nombre: a for a in adaptadores}
+        if len(self._adaptadores) != len(adaptadores):
+            raise ValueError("Nombres de pasarela repetidos en el enrutador")
+        self._estados: Dict[str, EstadoPasarela] = {nombre: EstadoPasarela() for nombre in self._adaptadores}
+        self._origenes: "OrderedDict[str, str]" = OrderedDict()
+
+        self.timeout = timeout_segundos or configuracion.ENRUTADOR_TIMEOUT
+        self.fallos_para_abrir = fallos_para_abrir or configuracion.ENRUTADOR_FALLOS_PARA_ABRIR
+        self.enfriamiento = enfriamiento_segundos or configuracion.ENRUTADOR_ENFRIAMIENTO
+        self.intervalo_sondeo = intervalo_sondeo or configuracion.ENRUTADOR_INTERVALO_SONDEO
+        self._sondeo: Optional[asyncio.Task] = None
+
+    @property
+    def nombre(self) -> str:
+        return "enrutado"
+
+    def adaptador(self, nombre: str) -> ProveedorPagoBase:
+        """Adaptador concreto por nombre."""
+        return self._adaptadores[nombre]
+
+    def pasarela_de(self, id_transaccion: str) -> Optional[str]:
+        """
+        Pasarela que creo un pago o suscripcion: la recordada o, si no,
+        la unica cuyo formato de ID coincide.
+        """
+        nombre = self._origenes.get(id_transaccion)
+        if nombre is not None:
+            return nombre
+        candidatas = [n for n, a in self._adaptadores.items() if a.reconoce_id(id_transaccion)]
+        return candidatas[0] if len(candidatas) == 1 else None
+
+    def recordar_origen(self, id_transaccion: str, pasarela: Optional[str]) -> None:
+        """
+        Registra la pasarela guardada de un pago o suscripcion si no se
+        recuerda ya (ignora nombres desconocidos).
+        """
+        if pasarela in self._adaptadores and id_transaccion not in self._origenes:
+            self._recordar(id_transaccion, pasarela)
+
+    def orden(self) -> List[str]:
+        """
+        Pasarelas en el orden en que se intentarian ahora: las disponibles
+        por puntaje y despues las de circuito abierto, la que reabre antes
+        primero (mejor intentar que fallar sin intentar).
+        """
+        ahora = time.monotonic()
+        disponibles = [n for n, e in self._estados.items() if e.disponible(ahora)]
+        abiertas = [n for n, e in self._estados.items() if not e.disponible(ahora)]
+        disponibles.sort(key=lambda n: self._estados[n].puntaje())
+        abiertas.sort(key=lambda n: self._estados[n].abierto_hasta)
+        return disponibles + abiertas
+
+    def estado(self) -> Dict[str, Any]:
+        """Salud de cada pasarela y orden de enrutamiento actual."""
+        ahora = time.monotonic()
+        return {
+            "orden": self.orden(),
+            "pasarelas": {
+                nombre: {
+                    "disponible": e.disponible(ahora),
+                    "circuito": self._circuito(e, ahora),
+                    "latencia_ms": round(e.latencia_ms, 2) if e.latencia_ms is not None else None,
+                    "tasa_error": round(e.tasa_error, 4),
+                    "fallos_consecutivos": e.fallos_consecutivos,
+                    "llamadas": e.llamadas,
+                    "fallos": e.fallos
+                }
+                for nombre, e in self._estados.items()
+            }
+        }
+
+    def metricas_prometheus(self) -> List[str]:
+        """Circuito, puntaje y promedios moviles de cada pasarela."""
+        ahora = time.monotonic()
+        estados = list(self._estados.items())
+        lineas = formatear_familia(
+            "payment_enrutador_circuito",
+            "1 en el estado actual del circuito de la pasarela",
+            "gauge",
+            ("pasarela", "estado"),
+            [((n, c), int(self._circuito(e, ahora) == c)) for n, e in estados for c in CIRCUITOS]
+        )
+        for nombre, ayuda, valor in (
+            ("payment_enrutador_puntaje", "Puntaje de enrutamiento (menor se intenta antes)", lambda e: e.puntaje()),
+            ("payment_enrutador_latencia_ms", "Latencia promedio movil de la pasarela", lambda e: e.latencia_ms or 0.0),
+            ("payment_enrutador_tasa_error", "Tasa de error promedio movil de la pasarela", lambda e: e.tasa_error),
+        ):
+            lineas += formatear_familia(
+                nombre, ayuda, "gauge", ("pasarela",), [((n,), round(valor(e), 4)) for n, e in estados]
+            )
+        lineas += formatear_familia(
+            "payment_enrutador_llamadas_total",
+            "Llamadas enrutadas a la pasarela por resultado",
+            "counter",
+            ("pasarela", "resultado"),
+            [((n, "exitosa"), e.llamadas - e.fallos) for n, e in estados]
+            + [((n, "fallida"), e.fallos) for n, e in estados]
+        )
+        return lineas
+
+    def _circuito(self, estado: EstadoPasarela, ahora: float) -> str:
+        """
+        Abierto durante el enfriamiento; semiabierto cuando ya vencio pero
+        la pasarela aun no respondio bien; cerrado en otro caso.
+        """
+        if not estado.disponible(ahora):
+            return "abierto"
+        if estado.fallos_consecutivos >= self.fallos_para_abrir:
+            return "semiabierto"
+        return "cerrado"
+
+    # --- Operaciones nuevas: se enrutan con failover ---
+
+    async def crear_pago(
+        self,
+        monto: float,
+        moneda: str,
+        descripcion: str,
+        metadatos: Optional[Dict[str, Any]] = None,
+        url_retorno: Optional[str] = None,
+        url_cancelacion: Optional[str] = None
+    ) -> ResultadoPago:
+        return await self._enrutar(
+            "crear_pago",
+            lambda a: a.crear_pago(
+                monto, moneda, descripcion, self._con_pasarela(metadatos, a), url_retorno, url_cancelacion
+            )
+        )
+
+    async def crear_suscripcion(
+        self,
+        precio: float,
+        moneda: str,
+        intervalo: str,
+        metadatos: Optional[Dict[str, Any]] = None
+    ) -> ResultadoPago:
+        return await self._enrutar(
+            "crear_suscripcion",
+            lambda a: a.crear_suscripcion(precio, moneda, intervalo, self._con_pasarela(metadatos, a))
+        )
+
+    # --- Operaciones sobre pagos existentes: van a la pasarela de origen ---
+
+    async def verificar_pago(self, id_transaccion: str) -> ResultadoPago:
+        nombre = self.pasarela_de(id_transaccion)
+        if nombre is not None:
+            return await self._llamar(nombre, lambda a: a.verificar_pago(id_transaccion))
+
+        # Pago anterior al enrutador o ya olvidado: es una lectura, se consulta a todas
+        resultado = None
+        for nombre in self.orden():
+            try:
+                resultado = await self._llamar(nombre, lambda a: a.verificar_pago(id_transaccion))
+            except Exception:
+                continue
+            if resultado.exitoso:
+                self._recordar(id_transaccion, nombre)
+                return resultado
+        return resultado or ResultadoPago(
+            exitoso=False, id_transaccion=id_transaccion, estado=EstadoPago.FALLIDO, error="Pago no encontrado"
+        )
+
+    async def procesar_reembolso(
+        self,
+        id_transaccion: str,
+        monto: Optional[float] = None,
+        razon: Optional[str] = None
+    ) -> ResultadoReembolso:
+        nombre = self.pasarela_de(id_transaccion)
+        if nombre is None:
+            # Reembolsar en la pasarela equivocada no es una opcion: no se adivina
+            return ResultadoReembolso(
+                exitoso=False,
+                id_pago_original=id_transaccion,
+                estado=EstadoPago.FALLIDO,
+                error="Pasarela de origen desconocida para el pago"
+            )
+        return await self._llamar(nombre, lambda a: a.procesar_reembolso(id_transaccion, monto, razon))
+
+    async def cancelar_suscripcion(
+        self,
+        id_suscripcion: str,
+        inmediatamente: bool = False
+    ) -> ResultadoPago:
+        nombre = self.pasarela_de(id_suscripcion)
+        if nombre is None:
+            return ResultadoPago(
+                exitoso=False,
+                id_transaccion=id_suscripcion,
+                estado=EstadoPago.FALLIDO,
+                error="Pasarela de origen desconocida para la suscripcion"
+            )
+        return await self._llamar(nombre, lambda a: a.cancelar_suscripcion(id_suscripcion, inmediatamente))
+
+    # --- Webhooks: pertenecen a una pasarela concreta ---
+
+    def normalizar_webhook(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Normaliza con el adaptador de la pasarela nombrada en el webhook."""
+        nombre = self.pasarela_del_webhook(payload)
+        if nombre is None:
+            raise ValueError("Webhook sin pasarela de origen reconocible (metadatos.pasarela)")
+        return self._adaptadores[nombre].normalizar_webhook(payload)
+
+    def verificar_firma_webhook(self, payload: bytes, firma: str, secreto: str) -> bool:
+        """Verifica con el adaptador de la pasarela nombrada en el webhook; si no hay, rechaza."""
+        try:
+            datos = json.loads(payload)
+        except ValueError:
+            return False
+        nombre = self.pasarela_del_webhook(datos) if isinstance(datos, dict) else None
+        if nombre is None:
+            logger.warning("Firma de webhook rechazada: pasarela de origen desconocida")
+            return False
+        return self._adaptadores[nombre].verificar_firma_webhook(payload, firma, secreto)
+
+    def pasarela_del_webhook(self, payload: Dict[str, Any]) -> Optional[str]:
+        """
+        Pasarela nombrada en el webhook: "pasarela" en la raiz o en los
+        metadatos del evento (raiz, data o data.object, como los envia cada
+        pasarela).
+        """
+        niveles = [payload]
+        datos = payload.get("data") or payload.get("datos")
+        if isinstance(datos, dict):
+            niveles += [datos, datos.get("object")]
+        for nivel in niveles:
+            if not isinstance(nivel, dict):
+                continue
+            candidatos = [nivel.get("pasarela")]
+            for clave in ("metadata", "metadatos"):
+                if isinstance(nivel.get(clave), dict):
+                    candidatos.append(nivel[clave].get("pasarela"))
+            for nombre in candidatos:
+                if nombre in self._adaptadores:
+                    return nombre
+        return None
+
+    # --- Salud ---
+
+    def precalentar(self) -> None:
+        for adaptador in self._adaptadores.values():
+            adaptador.precalentar()
+
+    async def sondear(self) -> bool:
+        """Sondea todas las pasarelas; True si alguna responde."""
+        resultados = await asyncio.gather(*(self._sondear(n) for n in self._adaptadores))
+        return any(resultados)
+
+    def iniciar_sondeo(self) -> None:
+        """Arranca la tarea que sondea las pasarelas cada intervalo_sondeo."""
+        if self._sondeo is None or self._sondeo.done():
+            self._sondeo = asyncio.create_task(self._bucle_sondeo())
+
+    async def detener_sondeo(self) -> None:
+        if self._sondeo is not None:
+            self._sondeo.cancel()
+            try:
+                await self._sondeo
+            except asyncio.CancelledError:
+                pass
+            self._sondeo = None
+
+    async def _bucle_sondeo(self) -> None:
+        while True:
+            await asyncio.sleep(self.intervalo_sondeo)
+            await self.sondear()
+
+    async def _sondear(self, nombre: str) -> bool:
+        inicio = time.perf_counter()
+        try:
+            sana = await asyncio.wait_for(self._adaptadores[nombre].sondear(), self.timeout)
+        except Exception:
+            sana = False
+        estado = self._estados[nombre]
+        if sana:
+            self._observar_latencia(estado, (time.perf_counter() - inicio) * 1000)
+            if estado.fallos_consecutivos >= self.fallos_para_abrir:
+                # Se recupero: vuelve a competir sin arrastrar la tasa de error de la caida
+                logger.info("Pasarela %s rehabilitada por sonda", nombre)
+                estado.tasa_error = 0.0
+            else:
+                estado.tasa_error *= 1 - ALFA
+            estado.fallos_consecutivos = 0
+            estado.abierto_hasta = 0.0
+        else:
+            self._abrir(nombre, estado, "sonda fallida")
+        return sana
+
+    # --- Internos ---
+
+    async def _enrutar(
+        self,
+        operacion: str,
+        llamada: Callable[[ProveedorPagoBase], Awaitable[ResultadoPago]]
+    ) -> ResultadoPago:
+        """
+        Intenta la operacion en cada pasarela, en orden, hasta que una
+        responda bien. Un fallo incierto (timeout, excepcion o resultado
+        marcado incierto) corta el failover.
+        """
+        intentos: List[Tuple[str, str]] = []
+        for nombre in self.orden():
+            try:
+                resultado = await self._llamar(nombre, llamada, fallo_si_no_exitoso=True)
+            except Exception as e:
+                error = "timeout" if isinstance(e, asyncio.TimeoutError) else str(e) or type(e).__name__
+                return self._incierto(operacion, nombre, error, intentos)
+            if resultado.exitoso:
+                if intentos:
+                    logger.warning(
+                        "%s resuelto por failover en %s", operacion, nombre,
+                        extra={"intentos": intentos}
+                    )
+                for id_pago in (resultado.id_transaccion, resultado.id_externo):
+                    if id_pago:
+                        self._recordar(id_pago, nombre)
+                resultado.metadatos = {**(resultado.metadatos or {}), "pasarela": nombre}
+                return resultado
+            if resultado.incierto:
+                return self._incierto(operacion, nombre, resultado.error or "fallido", intentos)
+            intentos.append((nombre, resultado.error or "fallido"))
+
+        logger.error("%s fallo en todas las pasarelas", operacion, extra={"intentos": intentos})
+        return ResultadoPago(
+            exitoso=False,
+            estado=EstadoPago.FALLIDO,
+            error="; ".join(f"{nombre}: {error}" for nombre, error in intentos)
+        )
+
+    @staticmethod
+    def _incierto(operacion: str, nombre: str, error: str, intentos: List[Tuple[str, str]]) -> ResultadoPago:
+        """Resultado de un fallo en el que la pasarela pudo haber procesado el pedido."""
+        intentos = intentos + [(nombre, error)]
+        logger.error(
+            "%s con resultado incierto en %s, sin failover", operacion, nombre,
+            extra={"intentos": intentos}
+        )
+        return ResultadoPago(
+            exitoso=False,
+            estado=EstadoPago.FALLIDO,
+            error=f"{nombre}: {error} (resultado incierto, no se reintento en otra pasarela)",
+            metadatos={"pasarela": nombre},
+            incierto=True
+        )
+
+    async def _llamar(
+        self,
+        nombre: str,
+        llamada: Callable[[ProveedorPagoBase], Awaitable[Any]],
+        fallo_si_no_exitoso: bool = False
+    ) -> Any:
+        """
+        Ejecuta una llamada con timeout y actualiza la salud de la pasarela.
+
+        Las excepciones y timeouts siempre cuentan como fallo. Un resultado
+        no exitoso solo cuenta si fallo_si_no_exitoso: un "pago no
+        encontrado" al verificar no dice nada de la salud de la pasarela.
+        """
+        estado = self._estados[nombre]
+        estado.llamadas += 1
+        inicio = time.perf_counter()
+        try:
+            resultado = await asyncio.wait_for(llamada(self._adaptadores[nombre]), self.timeout)
+        except Exception as e:
+            self._registrar_fallo(nombre, estado, "timeout" if isinstance(e, asyncio.TimeoutError) else type(e).__name__)
+            raise
+        self._observar_latencia(estado, (time.perf_counter() - inicio) * 1000)
+        if fallo_si_no_exitoso and not resultado.exitoso:
+            self._registrar_fallo(nombre, estado, resultado.error or "fallido")
+        else:
+            estado.tasa_error *= 1 - ALFA
+            estado.fallos_consecutivos = 0
+        return resultado
+
+    @staticmethod
+    def _observar_latencia(estado: EstadoPasarela, latencia_ms: float) -> None:
+        if estado.latencia_ms is None:
+            estado.latencia_ms = latencia_ms
+        else:
+            estado.latencia_ms += ALFA * (latencia_ms - estado.latencia_ms)
+
+    def _registrar_fallo(self, nombre: str, estado: EstadoPasarela, motivo: str) -> None:
+        estado.fallos += 1
+        estado.fallos_consecutivos += 1
+        estado.tasa_error += ALFA * (1 - estado.tasa_error)
+        if estado.fallos_consecutivos >= self.fallos_para_abrir:
+            self._abrir(nombre, estado, motivo)
+
+    def _abrir(self, nombre: str, estado: EstadoPasarela, motivo: str) -> None:
+        ahora = time.monotonic()
+        if estado.disponible(ahora):
+            logger.warning(
+                "Pasarela %s fuera de rotacion por %ss", nombre, self.enfriamiento,
+                extra={"motivo": motivo, "fallos_consecutivos": estado.fallos_consecutivos}
+            )
+        estado.abierto_hasta = ahora + self.enfriamiento
+
+    @staticmethod
+    def _con_pasarela(metadatos: Optional[Dict[str, Any]], adaptador: ProveedorPagoBase) -> Dict[str, Any]:
+        """Metadatos para la pasarela, con su nombre para reconocer sus webhooks."""
+        return {**(metadatos or {}), "pasarela": adaptador.nombre}
+
+    def _recordar(self, id_transaccion: str, nombre: str) -> None:
+        self._origenes[id_transaccion] = nombre
+        self._origenes.move_to_end(id_transaccion)
+        if len(self._origenes) > MAX_ORIGENES:
+            self._origenes.popitem(last=False)
@@ -1,12 +1,14 @@
 """
 Factory para obtener el adaptador de pago correcto.
+
+Los adaptadores se registran por ruta ("modulo:Clase") y el modulo se
+importa la primera vez que se pide, asi el arranque no carga adaptadores
+de pasarelas que no se usan.
 """
-from typing import Dict, Type
+import importlib
+from typing import Dict, Type, Union
 
 from app.adaptador.base import ProveedorPagoBase
-from app.adaptador.mock_adapter import MockAdapter
-from app.adaptador.stripe_adapter import StripeAdapter
-from app.adaptador.mercadopago_adapter import MercadoPagoAdapter
 from app.config import configuracion
 
 
@@ -16,10 +18,12 @@ class AdaptadorFactory:
     Implementa el patron Factory para seleccionar el adaptador correcto.
     """
     
-    _adaptadores: Dict[str, Type[ProveedorPagoBase]] = {
-        "mock": MockAdapter,
-        "stripe": StripeAdapter,
-        "mercadopago": MercadoPagoAdapter
+    # Nombre -> clase, o ruta "modulo:Clase" aun no importada
+    _adaptadores: Dict[str, Union[str, Type[ProveedorPagoBase]]] = {
+        "mock": "app.adaptador.mock_adapter:MockAdapter",
+        "stripe": "app.adaptador.stripe_adapter:StripeAdapter",
+        "mercadopago": "app.adaptador.mercadopago_adapter:MercadoPagoAdapter",
+        "enrutado": "app.adaptador.enrutador:AdaptadorEnrutado"
     }
     
     _instancias: Dict[str, ProveedorPagoBase] = {}
@@ -48,21 +52,50 @@ class AdaptadorFactory:
             )
         
         if nombre_adaptador not in cls._instancias:
-            cls._instancias[nombre_adaptador] = cls._adaptadores[nombre_adaptador]()
+            cls._instancias[nombre_adaptador] = cls.obtener_clase(nombre_adaptador)()
         
         return cls._instancias[nombre_adaptador]
     
     @classmethod
-    def registrar(cls, nombre: str, adaptador: Type[ProveedorPagoBase]) -> None:
+    def obtener_clase(cls, nombre: str) -> Type[ProveedorPagoBase]:
+        """
+        Obtiene la clase de un adaptador, importando su modulo si hace falta.
+        
+        Raises:
+            KeyError: Si el adaptador no esta registrado
+        """
+        adaptador = cls._adaptadores[nombre]
+        if isinstance(adaptador, str):
+            modulo, _, clase = adaptador.partition(":")
+            adaptador = getattr(importlib.import_module(modulo), clase)
+            cls._adaptadores[nombre] = adaptador
+        return adaptador
+    
+    @classmethod
+    def precalentar(cls, nombre: str = None) -> ProveedorPagoBase:
+        """
+        Crea el adaptador y carga su SDK antes del primer pago, para que
+        la primera request no pague el import (stripe tarda ~150 ms).
+        
+        Args:
+            nombre: Nombre del adaptador. Si es None, usa el configurado.
+        """
+        adaptador = cls.obtener(nombre)
+        adaptador.precalentar()
+        return adaptador
+    
+    @classmethod
+    def registrar(cls, nombre: str, adaptador: Union[str, Type[ProveedorPagoBase]]) -> None:
         """
         Registra un nuevo adaptador en la factory.
         Util para extensiones o testing.
         
         Args:
             nombre: Nombre del adaptador
-            adaptador: Clase del adaptador
+            adaptador: Clase del adaptador o su ruta "modulo:Clase"
         """
         cls._adaptadores[nombre] = adaptador
+        cls._instancias.pop(nombre, None)
     
     @classmethod
     def listar_disponibles(cls) -> list[str]:
@@ -4,6 +4,7 @@ Implementa la integracion con la pasarela de pago MercadoPago.
 """
 import hmac
 import hashlib
+import re
 import uuid
 from datetime import datetime
 from typing import Optional, Dict, Any
@@ -40,6 +41,10 @@ class MercadoPagoAdapter(ProveedorPagoBase):
         except ImportError:
             return False
     
+    def precalentar(self) -> None:
+        """Importa el SDK si hay credenciales configuradas."""
+        self._inicializar_sdk()
+    
     @property
     def nombre(self) -> str:
         return "mercadopago"
@@ -77,7 +82,7 @@ class MercadoPagoAdapter(ProveedorPagoBase):
                     "pending": url_retorno or "https://localhost/pending"
                 },
                 "auto_return": "approved",
-                "external_reference": metadatos.get("referencia") if metadatos else str(uuid.uuid4()),
+                "external_reference": (metadatos or {}).get("referencia") or str(uuid.uuid4()),
                 "metadata": metadatos or {}
             }
             
@@ -104,10 +109,13 @@ class MercadoPagoAdapter(ProveedorPagoBase):
                 )
                 
         except Exception as e:
+            # El SDK devuelve los errores HTTP como status: una excepcion es
+            # de red y la pasarela pudo haber recibido el pedido
             return ResultadoPago(
                 exitoso=False,
                 estado=EstadoPago.FALLIDO,
-                error=str(e)
+                error=str(e),
+                incierto=True
             )
     
     async def verificar_pago(self, id_transaccion: str) -> ResultadoPago:
@@ -244,10 +252,13 @@ class MercadoPagoAdapter(ProveedorPagoBase):
                 )
                 
         except Exception as e:
+            # El SDK devuelve los errores HTTP como status: una excepcion es
+            # de red y la pasarela pudo haber recibido el pedido
             return ResultadoPago(
                 exitoso=False,
                 estado=EstadoPago.FALLIDO,
-                error=str(e)
+                error=str(e),
+                incierto=True
             )
     
     async def cancelar_suscripcion(
@@ -292,6 +303,14 @@ class MercadoPagoAdapter(ProveedorPagoBase):
                 error=str(e)
             )
     
+    def reconoce_id(self, id_transaccion: str) -> bool:
+        """Pagos (numericos), preferencias (<collector>-<uuid>) y preapprovals (32 hex)."""
+        return bool(
+            id_transaccion.isdigit()
+            or re.fullmatch(r"\d+-[0-9a-f]{8}(-[0-9a-f]{4}){3}-[0-9a-f]{12}", id_transaccion)
+            or re.fullmatch(r"[0-9a-f]{32}", id_transaccion)
+        )
+    
     def normalizar_webhook(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         """Normaliza un webhook de MercadoPago al formato interno."""
         tipo_evento = payload.get("type", payload.get("action", "unknown"))
@@ -2,6 +2,8 @@
 Adaptador Mock para desarrollo y pruebas.
 Simula una pasarela de pago sin conexion real.
 """
+import asyncio
+import random
 import uuid
 import hmac
 import hashlib
@@ -24,9 +26,53 @@ class MockAdapter(ProveedorPagoBase):
     _pagos: Dict[str, Dict[str, Any]] = {}
     _suscripciones: Dict[str, Dict[str, Any]] = {}
     
+    def __init__(
+        self,
+        nombre: str = "mock",
+        retardo_segundos: float = 0.0,
+        tasa_fallo: float = 0.0,
+        tasa_rechazo: float = 0.0
+    ):
+        """
+        Args:
+            nombre: Nombre de la instancia (para tener varias en el enrutador)
+            retardo_segundos: Latencia simulada por operacion
+            tasa_fallo: Probabilidad de que una operacion falle como un error de red
+                (resultado incierto: el enrutador no reintenta en otra pasarela)
+            tasa_rechazo: Probabilidad de que la pasarela rechace un pago o
+                suscripcion nuevo sin tomarlo (fallo definitivo: el enrutador
+                pasa a la siguiente); las sondas tambien fallan
+        """
+        self._nombre = nombre
+        self.retardo_segundos = retardo_segundos
+        self.tasa_fallo = tasa_fallo
+        self.tasa_rechazo = tasa_rechazo
+    
     @property
     def nombre(self) -> str:
-        return "mock"
+        return self._nombre
+    
+    async def _simular_red(self) -> None:
+        """Aplica la latencia y los fallos inyectados."""
+        if self.retardo_segundos:
+            await asyncio.sleep(self.retardo_segundos)
+        if self.tasa_fallo and random.random() < self.tasa_fallo:
+            raise ConnectionError(f"Fallo simulado en {self._nombre}")
+    
+    def _rechazo(self) -> Optional[ResultadoPago]:
+        """Rechazo inyectado: la pasarela respondio que no tomo la operacion."""
+        if self.tasa_rechazo and random.random() < self.tasa_rechazo:
+            return ResultadoPago(
+                exitoso=False,
+                estado=EstadoPago.FALLIDO,
+                error=f"Rechazo simulado en {self._nombre}",
+                incierto=False
+            )
+        return None
+    
+    async def sondear(self) -> bool:
+        await self._simular_red()
+        return not (self.tasa_rechazo and random.random() < self.tasa_rechazo)
     
     async def crear_pago(
         self,
@@ -38,6 +84,10 @@ class MockAdapter(ProveedorPagoBase):
         url_cancelacion: Optional[str] = None
     ) -> ResultadoPago:
         """Simula la creacion de un pago."""
+        await self._simular_red()
+        rechazo = self._rechazo()
+        if rechazo:
+            return rechazo
         id_transaccion = f"mock_pay_{uuid.uuid4().hex[:12]}"
         
         pago_data = {
@@ -65,6 +115,7 @@ class MockAdapter(ProveedorPagoBase):
     
     async def verificar_pago(self, id_transaccion: str) -> ResultadoPago:
         """Verifica el estado de un pago simulado."""
+        await self._simular_red()
         pago = self._pagos.get(id_transaccion)
         
         if not pago:
@@ -92,6 +143,7 @@ class MockAdapter(ProveedorPagoBase):
         razon: Optional[str] = None
     ) -> ResultadoReembolso:
         """Simula un reembolso."""
+        await self._simular_red()
         pago = self._pagos.get(id_transaccion)
         
         if not pago:
@@ -124,6 +176,10 @@ class MockAdapter(ProveedorPagoBase):
         metadatos: Optional[Dict[str, Any]] = None
     ) -> ResultadoPago:
         """Simula la creacion de una suscripcion."""
+        await self._simular_red()
+        rechazo = self._rechazo()
+        if rechazo:
+            return rechazo
         id_suscripcion = f"mock_sub_{uuid.uuid4().hex[:12]}"
         
         suscripcion_data = {
@@ -154,6 +210,7 @@ class MockAdapter(ProveedorPagoBase):
         inmediatamente: bool = False
     ) -> ResultadoPago:
         """Simula la cancelacion de una suscripcion."""
+        await self._simular_red()
         suscripcion = self._suscripciones.get(id_suscripcion)
         
         if not suscripcion:
@@ -174,6 +231,9 @@ class MockAdapter(ProveedorPagoBase):
             mensaje="Suscripcion cancelada" + (" inmediatamente" if inmediatamente else " al final del periodo")
         )
     
+    def reconoce_id(self, id_transaccion: str) -> bool:
+        return id_transaccion.startswith("mock_")
+    
     def normalizar_webhook(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         """Normaliza un webhook simulado."""
         tipo_evento = payload.get("tipo", payload.get("type", "unknown"))
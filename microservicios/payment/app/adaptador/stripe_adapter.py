@@ -41,6 +41,10 @@ class StripeAdapter(ProveedorPagoBase):
         except ImportError:
             return False
     
+    def precalentar(self) -> None:
+        """Importa el SDK si hay credenciales configuradas."""
+        self._inicializar_stripe()
+    
     @property
     def nombre(self) -> str:
         return "stripe"
@@ -98,10 +102,13 @@ class StripeAdapter(ProveedorPagoBase):
             )
             
         except Exception as e:
+            # Los errores con respuesta HTTP de Stripe son definitivos; el
+            # resto (conexion, timeout) pudo haber llegado a crear el objeto
             return ResultadoPago(
                 exitoso=False,
                 estado=EstadoPago.FALLIDO,
-                error=str(e)
+                error=str(e),
+                incierto=getattr(e, "http_status", None) is None
             )
     
     async def verificar_pago(self, id_transaccion: str) -> ResultadoPago:
@@ -225,10 +232,13 @@ class StripeAdapter(ProveedorPagoBase):
             )
             
         except Exception as e:
+            # Los errores con respuesta HTTP de Stripe son definitivos; el
+            # resto (conexion, timeout) pudo haber llegado a crear el objeto
             return ResultadoPago(
                 exitoso=False,
                 estado=EstadoPago.FALLIDO,
-                error=str(e)
+                error=str(e),
+                incierto=getattr(e, "http_status", None) is None
             )
     
     async def cancelar_suscripcion(
@@ -268,6 +278,10 @@ class StripeAdapter(ProveedorPagoBase):
                 error=str(e)
             )
     
+    def reconoce_id(self, id_transaccion: str) -> bool:
+        """PaymentIntent, sesion de checkout, cargo, suscripcion, precio o producto."""
+        return id_transaccion.startswith(("pi_", "cs_", "ch_", "sub_", "price_", "prod_"))
+    
     def normalizar_webhook(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         """Normaliza un webhook de Stripe al formato interno."""
         tipo_evento = payload.get("type", "unknown")
@@ -3,7 +3,7 @@ Configuracion del microservicio de pagos.
 Centraliza todas las variables de entorno y configuraciones.
 """
 import os
-from typing import Optional
+from typing import List, Optional
 
 
 class Configuracion:
@@ -18,8 +18,25 @@ class Configuracion:
     REST_API_URL: str = os.getenv("REST_API_URL", "http://rest-typescript:3000")
     GRAPHQL_URL: str = os.getenv("GRAPHQL_URL", "http://graphql-service:5000/graphql")
     
+    # Logging
+    LOG_NIVEL: str = os.getenv("LOG_NIVEL", "DEBUG" if DEBUG else "INFO")
+    LOG_FORMATO: str = os.getenv("LOG_FORMATO", "json")  # json, texto
+    LOG_REQUESTS_MUESTREO: float = float(os.getenv("LOG_REQUESTS_MUESTREO", "0.01"))  # Fraccion de requests registradas
+    LOG_REQUESTS_BODY: bool = os.getenv("LOG_REQUESTS_BODY", "false").lower() == "true"  # Solo para depuracion
+    LOG_REQUESTS_BODY_MAX: int = int(os.getenv("LOG_REQUESTS_BODY_MAX", "2048"))
+    
     # Configuracion de pasarelas de pago
-    PASARELA_ACTIVA: str = os.getenv("PASARELA_ACTIVA", "mock")  # mock, stripe, mercadopago
+    PASARELA_ACTIVA: str = os.getenv("PASARELA_ACTIVA", "mock")  # mock, stripe, mercadopago, enrutado
+    PASARELA_PRECALENTAR: bool = os.getenv("PASARELA_PRECALENTAR", "true").lower() == "true"  # Cargar el SDK al arrancar
+
+    # Enrutador de pasarelas (PASARELA_ACTIVA=enrutado)
+    ENRUTADOR_PASARELAS: List[str] = [
+        p.strip() for p in os.getenv("ENRUTADOR_PASARELAS", "stripe,mercadopago").split(",") if p.strip()
+    ]
+    ENRUTADOR_TIMEOUT: float = float(os.getenv("ENRUTADOR_TIMEOUT", "10"))  # Por llamada, antes del failover
+    ENRUTADOR_FALLOS_PARA_ABRIR: int = int(os.getenv("ENRUTADOR_FALLOS_PARA_ABRIR", "3"))
+    ENRUTADOR_ENFRIAMIENTO: float = float(os.getenv("ENRUTADOR_ENFRIAMIENTO", "30"))
+    ENRUTADOR_INTERVALO_SONDEO: float = float(os.getenv("ENRUTADOR_INTERVALO_SONDEO", "15"))
     
     # Stripe
     STRIPE_SECRET_KEY: Optional[str] = os.getenv("STRIPE_SECRET_KEY")
@@ -37,12 +54,30 @@ class Configuracion:
     # Configuracion de webhooks
     WEBHOOK_TIMEOUT: int = int(os.getenv("WEBHOOK_TIMEOUT", "30"))
     WEBHOOK_REINTENTOS: int = int(os.getenv("WEBHOOK_REINTENTOS", "3"))
-    
+
+    # Ingesta de webhooks de pasarelas (confirmar primero, procesar despues)
+    WEBHOOK_INGESTA_ASINCRONA: bool = os.getenv("WEBHOOK_INGESTA_ASINCRONA", "false").lower() == "true"
+    WEBHOOK_COLA_CAPACIDAD: int = int(os.getenv("WEBHOOK_COLA_CAPACIDAD", "10000"))
+    WEBHOOK_COLA_WORKERS: int = int(os.getenv("WEBHOOK_COLA_WORKERS", "4"))
+    WEBHOOK_COLA_DIRECTORIO: Optional[str] = os.getenv("WEBHOOK_COLA_DIRECTORIO")  # Journal en disco (opcional)
+    WEBHOOK_COLA_FSYNC: bool = os.getenv("WEBHOOK_COLA_FSYNC", "false").lower() == "true"  # fsync antes de responder
+    WEBHOOK_EVENTOS_CAPACIDAD: int = int(os.getenv("WEBHOOK_EVENTOS_CAPACIDAD", "1000"))  # Historial en memoria
+
+    # Importacion de eventos por lotes (NDJSON)
+    WEBHOOK_LOTE_CONCURRENCIA: int = int(os.getenv("WEBHOOK_LOTE_CONCURRENCIA", "16"))
+    WEBHOOK_LOTE_MAX_REGISTROS: int = int(os.getenv("WEBHOOK_LOTE_MAX_REGISTROS", "1000"))  # Registros por firma de lote
+
+    # Handlers locales de webhooks
+    HANDLER_TIMEOUT: float = float(os.getenv("HANDLER_TIMEOUT", "5.0"))
+    HANDLER_MAX_CONCURRENCIA: int = int(os.getenv("HANDLER_MAX_CONCURRENCIA", "10"))
+    HANDLER_HILOS: int = int(os.getenv("HANDLER_HILOS", "4"))
+
     # URL de pagina externa (para recibir/enviar informacion)
     EXTERNAL_PAGE_URL: Optional[str] = os.getenv("EXTERNAL_PAGE_URL")
     
     # Secreto para HMAC (DEBE configurarse en produccion)
     HMAC_SECRET_GLOBAL: str = os.getenv("HMAC_SECRET_GLOBAL", "secreto_desarrollo_cambiar_en_produccion")
+    HMAC_MAX_BODY_BYTES: int = int(os.getenv("HMAC_MAX_BODY_BYTES", str(1024 * 1024)))  # Limite del middleware HMAC
     
     # Love4Pets Partner (configuración B2B)
     LOVE4PETS_PARTNER_ID: Optional[str] = os.getenv("LOVE4PETS_PARTNER_ID")
@@ -64,6 +99,8 @@ class Configuracion:
             raise ValueError("STRIPE_SECRET_KEY es requerido cuando la pasarela es Stripe")
         if cls.PASARELA_ACTIVA == "mercadopago" and not cls.MERCADOPAGO_ACCESS_TOKEN:
             raise ValueError("MERCADOPAGO_ACCESS_TOKEN es requerido cuando la pasarela es MercadoPago")
+        if cls.PASARELA_ACTIVA == "enrutado" and not cls.ENRUTADOR_PASARELAS:
+            raise ValueError("ENRUTADOR_PASARELAS es requerido cuando la pasarela es enrutado")
         
         # Validar secreto HMAC en produccion
         if not cls.DEBUG:
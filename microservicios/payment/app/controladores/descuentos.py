@@ -1,11 +1,16 @@
 """
 Controlador de descuentos.
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Header
+from functools import partial
 from typing import List, Dict, Any
+import time
 import pydantic
 
 from app.servicios.descuentos import ServicioDescuentos, AlmacenDescuentos
+from app.partners.almacen import AlmacenPartners
+from app.webhooks.lote import ImportadorLote, ModoFirma
+from app.ndjson import iterar_lineas
 
 router = APIRouter(prefix="/descuentos", tags=["Descuentos"])
 
@@ -40,31 +45,49 @@ async def reclamar_descuentos(request: ReclamarDescuentoRequest):
     )
     return resultado
 
+@router.post("/importar/{partner_id}")
+async def importar_descuentos_partner(
+    partner_id: str,
+    request: Request,
+    x_webhook_timestamp: str = Header(..., alias="X-Webhook-Timestamp"),
+    x_firma_modo: ModoFirma = Header(ModoFirma.REGISTRO, alias="X-Firma-Modo")
+):
+    """
+    Carga retroactiva de descuentos por adopción desde la exportación de
+    un partner.
+
+    El body es NDJSON firmado con el secreto HMAC del partner, en el mismo
+    formato que /webhooks/love4pets/lote (ver app/webhooks/lote.py): solo
+    se aplican los registros cuya firma se verifica. Se procesa a medida
+    que llega, sin cargar el archivo completo en memoria:
+
+        curl -X POST --data-binary @adopciones.ndjson \\
+            -H "Content-Type: application/x-ndjson" \\
+            -H "X-Webhook-Timestamp: 1700000000" \\
+            http://localhost:8002/descuentos/importar/love4pets
+    """
+    if AlmacenPartners.obtener(partner_id) is None:
+        raise HTTPException(status_code=404, detail=f"Partner '{partner_id}' no encontrado")
+    secreto = AlmacenPartners.obtener_secreto(partner_id)
+    if not secreto:
+        raise HTTPException(status_code=403, detail=f"Partner '{partner_id}' no está activo")
+
+    try:
+        timestamp = int(x_webhook_timestamp)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Timestamp invalido")
+    if abs(int(time.time()) - timestamp) > 300:
+        raise HTTPException(status_code=401, detail="Timestamp fuera de tolerancia")
+
+    importador = ImportadorLote(
+        partial(ServicioDescuentos.importar_adopcion, partner_id), secreto, timestamp, modo=x_firma_modo
+    )
+    resultado = await importador.importar(iterar_lineas(request.stream()))
+    return {"partner_id": partner_id, "modo": x_firma_modo.value, **resultado}
+
 @router.get("/stats")
 async def obtener_estadisticas_descuentos():
     """
     Obtiene estadísticas generales de descuentos.
     """
-    todos_descuentos = []
-    for usuario_id in AlmacenDescuentos._por_usuario:
-        descuentos = AlmacenDescuentos.obtener_por_usuario(usuario_id, solo_activos=False)
-        todos_descuentos.extend(descuentos)
-    
-    activos = [d for d in todos_descuentos if d.activo]
-    por_tipo = {}
-    
-    for descuento in todos_descuentos:
-        tipo = descuento.tipo.value
-        if tipo not in por_tipo:
-            por_tipo[tipo] = {"total": 0, "activos": 0}
-        por_tipo[tipo]["total"] += 1
-        if descuento.activo:
-            por_tipo[tipo]["activos"] += 1
-    
-    return {
-        "total_descuentos": len(todos_descuentos),
-        "descuentos_activos": len(activos),
-        "por_tipo": por_tipo,
-        "usuarios_con_descuento": len(AlmacenDescuentos._por_usuario),
-        "descuentos_pendientes_email": len(AlmacenDescuentos._pendientes_por_email)
-    }
+    return AlmacenDescuentos.estadisticas()
@@ -12,6 +12,7 @@ from app.modelos.pago import (
     EstadoPago
 )
 from app.adaptador import obtener_adaptador, AdaptadorFactory
+from app.adaptador.enrutador import AdaptadorEnrutado
 
 router = APIRouter(prefix="/pagos", tags=["Pagos"])
 
@@ -48,7 +49,7 @@ async def crear_pago(request: CrearPagoRequest):
         moneda=resultado.moneda,
         estado=resultado.estado,
         tipo=request.tipo,
-        pasarela=adaptador.nombre,
+        pasarela=resultado.metadatos.get("pasarela", adaptador.nombre),
         id_transaccion_externa=resultado.id_externo,
         url_checkout=resultado.url_checkout,
         descripcion=request.descripcion,
@@ -69,12 +70,16 @@ async def obtener_pago(pago_id: str):
     if not resultado.exitoso:
         raise HTTPException(status_code=404, detail="Pago no encontrado")
     
+    pasarela = adaptador.nombre
+    if isinstance(adaptador, AdaptadorEnrutado):
+        pasarela = adaptador.pasarela_de(pago_id) or pasarela
+    
     return {
         "id": pago_id,
         "estado": resultado.estado.value,
         "monto": resultado.monto,
         "moneda": resultado.moneda,
-        "pasarela": adaptador.nombre,
+        "pasarela": pasarela,
         "metadatos": resultado.metadatos
     }
 
@@ -85,6 +90,9 @@ async def procesar_reembolso(request: ReembolsoRequest):
     Procesa un reembolso total o parcial.
     """
     adaptador = obtener_adaptador()
+    if isinstance(adaptador, AdaptadorEnrutado):
+        # Si el enrutador ya no recuerda el pago, usar la pasarela guardada
+        adaptador.recordar_origen(request.pago_id, request.pasarela)
     
     resultado = await adaptador.procesar_reembolso(
         id_transaccion=request.pago_id,
@@ -111,7 +119,11 @@ async def listar_pasarelas():
     """
     Lista las pasarelas de pago disponibles.
     """
-    return {
+    adaptador = obtener_adaptador()
+    respuesta = {
         "pasarelas": AdaptadorFactory.listar_disponibles(),
-        "activa": obtener_adaptador().nombre
+        "activa": adaptador.nombre
     }
+    if isinstance(adaptador, AdaptadorEnrutado):
+        respuesta["enrutamiento"] = adaptador.estado()
+    return respuesta
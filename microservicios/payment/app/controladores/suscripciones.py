@@ -11,7 +11,7 @@ from app.modelos.suscripcion import (
     VerificarPremiumResponse,
     TipoSuscripcion
 )
-from app.servicios.suscripciones import ServicioSuscripciones
+from app.servicios.suscripciones import ServicioSuscripciones, ErrorPasarela
 
 router = APIRouter(prefix="/suscripciones", tags=["Suscripciones Premium"])
 
@@ -72,7 +72,10 @@ async def cancelar_suscripcion(request: CancelarSuscripcionRequest):
     Por defecto, la suscripcion permanece activa hasta el final del periodo pagado.
     Si cancelar_inmediatamente es True, se cancela al instante.
     """
-    suscripcion = await ServicioSuscripciones.cancelar_suscripcion(request)
+    try:
+        suscripcion = await ServicioSuscripciones.cancelar_suscripcion(request)
+    except ErrorPasarela as e:
+        raise HTTPException(status_code=502, detail=str(e))
     if not suscripcion:
         raise HTTPException(status_code=404, detail="Suscripcion no encontrada")
     return suscripcion
@@ -1,9 +1,12 @@
 """
 Controlador de webhooks.
 """
-from fastapi import APIRouter, HTTPException, Request, Header
+from fastapi import APIRouter, HTTPException, Request, Header, Query
 from typing import Optional, Dict, Any
+from datetime import datetime
 import json
+import logging
+import time
 
 from app.modelos.webhook import (
     WebhookRecibidoResponse,
@@ -11,11 +14,17 @@ from app.modelos.webhook import (
 )
 from app.modelos.partner import TipoEvento
 from app.webhooks.procesador import ProcesadorWebhooks
+from app.webhooks.cola_ingesta import get_cola_ingesta
+from app.webhooks.lote import ImportadorLote, ModoFirma
 from app.adaptador import obtener_adaptador
-from app.seguridad.hmac_auth import verificar_firma_hmac
+from app.seguridad.firmas import es_formato_stripe
 from app.config import configuracion
 from app.partners.almacen import AlmacenPartners
 from app.servicios.descuentos import ServicioDescuentos
+from app.ndjson import iterar_lineas
+from app.registro import get_logger
+
+logger = get_logger("webhooks.controlador")
 
 router = APIRouter(prefix="/webhooks", tags=["Webhooks"])
 
@@ -87,7 +96,7 @@ async def webhook_mock(payload: Dict[str, Any]):
 async def webhook_externo(
     request: Request,
     x_webhook_signature: str = Header(..., alias="X-Webhook-Signature"),
-    x_webhook_timestamp: str = Header(..., alias="X-Webhook-Timestamp"),
+    x_webhook_timestamp: Optional[str] = Header(None, alias="X-Webhook-Timestamp"),
     x_partner_id: Optional[str] = Header(None, alias="X-Partner-ID")
 ):
     """
@@ -97,30 +106,16 @@ async def webhook_externo(
     Todos los webhooks deben estar firmados con HMAC-SHA256.
     
     Headers requeridos:
-    - X-Webhook-Signature: Firma HMAC del payload
-    - X-Webhook-Timestamp: Timestamp Unix del envio
-    - X-Partner-ID: (opcional) ID del partner que envia
+    - X-Webhook-Signature: Firma HMAC del payload (o t=<timestamp>,v1=<firma>)
+    - X-Webhook-Timestamp: Timestamp Unix del envio (solo formato simple)
+    - X-Partner-ID: ID del partner que envia (se firma con su secreto)
+    
+    La firma la verifica HMACMiddleware antes de llegar aqui: partner
+    ausente, desconocido o inactivo se rechaza sin secreto de respaldo.
     """
     body = await request.body()
     
-    try:
-        timestamp = int(x_webhook_timestamp)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Timestamp invalido")
-    
-    # Obtener secreto del partner o usar el global
-    secreto = configuracion.HMAC_SECRET_GLOBAL
-    if x_partner_id:
-        partner = AlmacenPartners.obtener(x_partner_id)
-        if partner:
-            secreto = partner.hmac_secret
-    
-    # Verificar firma
-    if not verificar_firma_hmac(body, x_webhook_signature, secreto, timestamp):
-        raise HTTPException(status_code=401, detail="Firma HMAC invalida")
-    
     # Parsear y procesar
-    import json
     try:
         payload = json.loads(body)
     except json.JSONDecodeError:
@@ -155,40 +150,12 @@ async def webhook_partner_especifico(
        Headers:
          - X-Webhook-Signature: t=<timestamp>,v1=<firma_hmac>
        Payload: {"event_type": "...", "data": {...}}
+    
+    HMACMiddleware ya comprobo que el partner existe y esta activo y
+    verifico la firma con su secreto (404, 403 o 401 si no).
     """
     body = await request.body()
     
-    # Detectar formato de firma (Stripe vs Simple)
-    if x_webhook_signature.startswith("t="):
-        # Formato Stripe: t=timestamp,v1=firma
-        try:
-            parts = dict(p.split("=", 1) for p in x_webhook_signature.split(","))
-            timestamp = int(parts.get("t", 0))
-            firma = parts.get("v1", "")
-        except (ValueError, KeyError):
-            raise HTTPException(status_code=400, detail="Formato de firma Stripe inválido. Esperado: t=timestamp,v1=firma")
-    else:
-        # Formato Simple: firma directa + header de timestamp
-        if not x_webhook_timestamp:
-            raise HTTPException(status_code=400, detail="X-Webhook-Timestamp requerido para formato simple")
-        try:
-            timestamp = int(x_webhook_timestamp)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Timestamp invalido")
-        firma = x_webhook_signature
-    
-    # Buscar el partner por ID
-    partner = AlmacenPartners.obtener(partner_id)
-    if not partner:
-        raise HTTPException(status_code=404, detail=f"Partner '{partner_id}' no encontrado")
-    
-    if not partner.activo:
-        raise HTTPException(status_code=403, detail=f"Partner '{partner_id}' no está activo")
-    
-    # Verificar firma con el secreto del partner
-    if not verificar_firma_hmac(body, firma, partner.hmac_secret, timestamp):
-        raise HTTPException(status_code=401, detail="Firma HMAC invalida")
-    
     # Parsear payload
     try:
         payload = json.loads(body)
@@ -200,9 +167,13 @@ async def webhook_partner_especifico(
     tipo_evento = payload.get("tipo_evento") or payload.get("event_type") or "external.service"
     datos = payload.get("datos") or payload.get("data") or payload
     
-    print(f"📥 Webhook recibido de partner: {partner_id}")
-    print(f"   Evento: {tipo_evento}")
-    print(f"   Formato: {'Stripe' if x_webhook_signature.startswith('t=') else 'Simple'}")
+    logger.info(
+        "Webhook recibido de partner %s: %s", partner_id, tipo_evento,
+        extra={
+            "partner_id": partner_id,
+            "formato": "stripe" if es_formato_stripe(x_webhook_signature) else "simple"
+        }
+    )
     
     return await ProcesadorWebhooks.procesar_webhook_externo(
         origen=origen,
@@ -236,17 +207,76 @@ async def webhook_love4pets(payload: Dict[str, Any]):
     - adoption.completed: Aplica 20% de descuento
     - adoption.created: Registra la adopción
     """
-    print(f"\n📥 Webhook recibido de Love4Pets")
-    print(f"   Payload: {payload}")
+    event_type = payload.get("event") or payload.get("event_type") or "unknown"
+    logger.info("Webhook recibido de Love4Pets: %s", event_type, extra={"partner_id": "love4pets"})
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Payload Love4Pets", extra={"payload": payload})
+    
+    return await procesar_evento_love4pets(payload)
+
+
+@router.post("/love4pets/lote")
+async def webhook_love4pets_lote(
+    request: Request,
+    x_webhook_timestamp: str = Header(..., alias="X-Webhook-Timestamp"),
+    x_firma_modo: ModoFirma = Header(ModoFirma.REGISTRO, alias="X-Firma-Modo")
+):
+    """
+    Recibe eventos de Love4Pets en lote, como NDJSON en streaming.
+    
+    Pensado para reenviar días de eventos: el body se procesa a medida
+    que llega y cada evento pasa por la misma lógica que /love4pets.
+    
+    Headers:
+    - X-Webhook-Timestamp: Timestamp Unix del envío, incluido en las firmas
+    - X-Firma-Modo: "registro" (una firma por línea) o "lote" (una línea
+      {"firma_lote": ...} cada WEBHOOK_LOTE_MAX_REGISTROS eventos).
+      Formato detallado en app/webhooks/lote.py
+    
+    Las firmas se verifican con el secreto del partner "love4pets" o, si
+    no está registrado, con LOVE4PETS_HMAC_SECRET (503 si no hay ninguno).
     
+    Responde con el conteo por resultado y los primeros errores por línea.
+    """
+    try:
+        timestamp = int(x_webhook_timestamp)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Timestamp invalido")
+    if abs(int(time.time()) - timestamp) > 300:
+        raise HTTPException(status_code=401, detail="Timestamp fuera de tolerancia")
+    
+    # Solo el secreto de Love4Pets: el del partner registrado o el configurado
+    if AlmacenPartners.obtener("love4pets") is not None:
+        secreto = AlmacenPartners.obtener_secreto("love4pets")
+        if secreto is None:
+            raise HTTPException(status_code=403, detail="Partner 'love4pets' no está activo")
+    else:
+        secreto = configuracion.LOVE4PETS_HMAC_SECRET
+        if not secreto:
+            raise HTTPException(status_code=503, detail="Secreto HMAC de Love4Pets no configurado")
+    
+    async def procesar(evento: Dict[str, Any]) -> str:
+        resultado = await procesar_evento_love4pets(evento)
+        if resultado.get("descuento_aplicado"):
+            return "descuento_aplicado"
+        return "sin_descuento" if resultado.get("procesado") else "no_procesado"
+    
+    importador = ImportadorLote(procesar, secreto, timestamp, modo=x_firma_modo)
+    resultado = await importador.importar(iterar_lineas(request.stream()))
+    return {"partner_id": "love4pets", "modo": x_firma_modo.value, **resultado}
+
+
+async def procesar_evento_love4pets(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Procesa un evento de Love4Pets (individual o de un lote).
+    
+    Los eventos de adopción aplican el descuento al adoptante.
+    """
     # Extraer datos del webhook
     event_type = payload.get("event") or payload.get("event_type") or "unknown"
     adopter_email = payload.get("adopter_email") or payload.get("data", {}).get("adopter_email")
     adopter_name = payload.get("adopter_name") or payload.get("data", {}).get("adopter_name")
     
-    print(f"   Evento: {event_type}")
-    print(f"   Email: {adopter_email}")
-    
     # Procesar según tipo de evento
     if event_type in ["adoption.completed", "adoption.created"]:
         if adopter_email:
@@ -262,7 +292,10 @@ async def webhook_love4pets(payload: Dict[str, Any]):
             )
             
             if resultado and resultado.get("status") == "success":
-                print(f"🎉 Descuento aplicado: {resultado.get('porcentaje')}%")
+                logger.info(
+                    "Descuento aplicado: %s%%", resultado.get("porcentaje"),
+                    extra={"descuento_id": resultado.get("descuento_id")}
+                )
                 return {
                     "recibido": True,
                     "procesado": True,
@@ -272,7 +305,7 @@ async def webhook_love4pets(payload: Dict[str, Any]):
                     "mensaje": f"Descuento del {resultado.get('porcentaje')}% aplicado al usuario {adopter_email}"
                 }
             else:
-                print(f"⚠️ No se pudo aplicar descuento: {resultado}")
+                logger.warning("No se pudo aplicar descuento", extra={"resultado": resultado})
                 return {
                     "recibido": True,
                     "procesado": True,
@@ -296,26 +329,63 @@ async def webhook_love4pets(payload: Dict[str, Any]):
 
 
 @router.get("/eventos")
-async def listar_eventos_procesados(limite: int = 50):
+async def listar_eventos_procesados(
+    limite: int = Query(50, ge=1, le=500),
+    tipo: Optional[str] = Query(None, description="Tipo de evento, ej. payment.success"),
+    pasarela: Optional[str] = Query(None, description="Pasarela u origen del evento"),
+    desde: Optional[datetime] = Query(None, description="Registrados desde (ISO 8601, UTC)"),
+    hasta: Optional[datetime] = Query(None, description="Registrados hasta (ISO 8601, UTC)"),
+    cursor: Optional[int] = Query(None, description="Valor siguiente_cursor de la pagina anterior")
+):
     """
-    Lista los ultimos eventos procesados.
+    Lista los eventos procesados, del mas reciente al mas antiguo.
+    
+    Soporta filtros por tipo, pasarela y rango de fechas, y paginacion por cursor.
     """
-    eventos = ProcesadorWebhooks.obtener_eventos_procesados(limite)
+    eventos, siguiente_cursor = ProcesadorWebhooks.consultar_eventos_procesados(
+        tipo=tipo,
+        pasarela=pasarela,
+        desde=desde,
+        hasta=hasta,
+        cursor=cursor,
+        limite=limite
+    )
     return {
         "total": len(eventos),
+        "siguiente_cursor": siguiente_cursor,
         "eventos": [
             {
+                "seq": seq,
                 "id": e.id,
                 "tipo": e.tipo.value,
                 "pasarela": e.pasarela,
                 "procesado": e.procesado,
-                "timestamp": e.timestamp.isoformat()
+                "timestamp": e.timestamp.isoformat(),
+                "registrado_en": registrado_en.isoformat()
             }
-            for e in eventos
+            for seq, registrado_en, e in eventos
         ]
     }
 
 
+@router.get("/ingesta/estadisticas")
+async def estadisticas_ingesta():
+    """
+    Estado de la cola de ingesta de webhooks de pasarelas.
+    
+    Incluye profundidad, ocupacion y tiempos de espera para detectar backpressure.
+    """
+    return get_cola_ingesta().estadisticas()
+
+
+@router.get("/handlers/estadisticas")
+async def estadisticas_handlers():
+    """
+    Latencia (histograma) y resultados de cada handler local registrado.
+    """
+    return ProcesadorWebhooks.estadisticas_handlers()
+
+
 # ========== FUNCIONES AUXILIARES PARA PARTNERS ==========
 
 async def procesar_evento_partner(
@@ -326,7 +396,7 @@ async def procesar_evento_partner(
     """
     Procesa un evento recibido de un partner.
     """
-    print(f"\n🔄 Procesando evento: {event_type.value}")
+    logger.info("Procesando evento de partner: %s", event_type.value, extra={"partner_id": partner_id})
     
     # Handler para adopciones de animales
     if event_type == TipoEvento.ANIMAL_ADOPTED:
@@ -338,7 +408,7 @@ async def procesar_evento_partner(
     
     # Handler genérico para otros eventos
     else:
-        print(f"ℹ️ Evento {event_type.value} recibido pero sin handler específico")
+        logger.info("Evento %s recibido pero sin handler específico", event_type.value)
         return {
             "processed": True,
             "handler": "generic",
@@ -367,7 +437,7 @@ async def manejar_adopcion_animal(
             "status": "failed"
         }
     
-    print(f"🐾 Procesando adopción para usuario: {usuario_email}")
+    logger.info("Procesando adopción", extra={"partner_id": partner_id, "animal_id": data.get("animal_id")})
     
     # Aplicar descuento automático
     resultado = await ServicioDescuentos.aplicar_descuento_adopcion(
@@ -383,7 +453,7 @@ async def manejar_adopcion_animal(
     )
     
     if resultado and resultado.get("status") == "success":
-        print(f"🎉 Descuento aplicado exitosamente!")
+        logger.info("Descuento por adopción aplicado", extra={"descuento_id": resultado.get("descuento_id")})
         return {
             "processed": True,
             "descuento_aplicado": True,
@@ -409,7 +479,7 @@ async def manejar_adopcion_completada(
     """
     usuario_email = data.get("usuario_email") or data.get("email")
     
-    print(f"✅ Adopción completada para: {usuario_email}")
+    logger.info("Adopción completada", extra={"partner_id": partner_id})
     
     # Aquí podrías agregar lógica adicional, como:
     # - Enviar email de bienvenida
@@ -0,0 +1,215 @@
+"""
+Primitivas de metricas en memoria para el microservicio de pagos.
+"""
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# Limites de buckets de latencia en milisegundos
+BUCKETS_LATENCIA_MS: Sequence[float] = (
+    1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000
+)
+
+
+class Histograma:
+    """
+    Histograma de buckets fijos.
+    Registrar una observacion es O(log buckets) y no reserva memoria.
+    """
+
+    def __init__(self, buckets: Optional[Sequence[float]] = None):
+        self.buckets: List[float] = list(buckets or BUCKETS_LATENCIA_MS)
+        self.conteos: List[int] = [0] * (len(self.buckets) + 1)  # Ultimo = +Inf
+        self.total = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+
+    def observar(self, valor: float) -> None:
+        """Registra una observacion."""
+        self.conteos[bisect_left(self.buckets, valor)] += 1
+        self.total += 1
+        self.suma += valor
+        if valor > self.maximo:
+            self.maximo = valor
+
+    def percentil(self, p: float) -> float:
+        """
+        Estima un percentil (0-100) con el limite superior de su bucket.
+        """
+        if not self.total:
+            return 0.0
+        objetivo = self.total * p / 100
+        acumulado = 0
+        for i, conteo in enumerate(self.conteos):
+            acumulado += conteo
+            if acumulado >= objetivo:
+                return self.buckets[i] if i < len(self.buckets) else self.maximo
+        return self.maximo
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Resumen serializable del histograma."""
+        return {
+            "total": self.total,
+            "promedio": round(self.suma / self.total, 3) if self.total else 0.0,
+            "maximo": round(self.maximo, 3),
+            "p50": self.percentil(50),
+            "p95": self.percentil(95),
+            "p99": self.percentil(99),
+            "buckets": {
+                **{str(limite): conteo for limite, conteo in zip(self.buckets, self.conteos)},
+                "+Inf": self.conteos[-1]
+            }
+        }
+
+
+# Buckets para operaciones en memoria (sub-milisegundo)
+BUCKETS_OPERACION_MS: Sequence[float] = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 50)
+
+# Buckets para tiempos de espera en cola (hasta una hora)
+BUCKETS_ESPERA_MS: Sequence[float] = (
+    100, 500, 1000, 5000, 15000, 30000, 60000, 300000, 900000, 1800000, 3600000
+)
+
+
+class Contador:
+    """Contador monotono."""
+
+    def __init__(self):
+        self.valor = 0.0
+
+    def incrementar(self, cantidad: float = 1) -> None:
+        self.valor += cantidad
+
+
+class FamiliaMetricas:
+    """
+    Metrica con etiquetas. Cada combinacion de valores tiene su propia
+    instancia (Contador o Histograma), creada la primera vez que se usa.
+
+    Todo corre en el event loop, asi que actualizar una serie es una suma
+    sin locks; cada serie es independiente de las demas.
+    """
+
+    def __init__(
+        self,
+        nombre: str,
+        ayuda: str,
+        tipo: str,
+        etiquetas: Sequence[str] = (),
+        buckets: Optional[Sequence[float]] = None
+    ):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.tipo = tipo
+        self.etiquetas_nombres = tuple(etiquetas)
+        self.buckets = buckets
+        self._series: Dict[Tuple[str, ...], Any] = {}
+
+    def etiquetas(self, *valores: Any) -> Any:
+        """Serie para los valores de etiqueta dados (en el orden declarado)."""
+        clave = tuple(str(v) for v in valores)
+        serie = self._series.get(clave)
+        if serie is None:
+            serie = Histograma(self.buckets) if self.tipo == "histogram" else Contador()
+            self._series[clave] = serie
+        return serie
+
+    def series(self) -> Iterable[Tuple[Tuple[str, ...], Any]]:
+        return self._series.items()
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _formatear_etiquetas(nombres: Sequence[str], valores: Sequence[str], extra: str = "") -> str:
+    partes = [f'{nombre}="{_escapar(str(valor))}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+def _formatear_numero(valor: float) -> str:
+    return repr(float(valor)) if valor != int(valor) else str(int(valor))
+
+
+def formatear_familia(
+    nombre: str,
+    ayuda: str,
+    tipo: str,
+    etiquetas: Sequence[str],
+    series: Iterable[Tuple[Sequence[str], Any]]
+) -> List[str]:
+    """
+    Lineas en formato de texto de Prometheus para una familia.
+    Las series pueden ser numeros, Contador o Histograma.
+    """
+    lineas = [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} {tipo}"]
+    for valores, serie in series:
+        if isinstance(serie, Histograma):
+            acumulado = 0
+            for limite, conteo in zip(serie.buckets, serie.conteos):
+                acumulado += conteo
+                le = _formatear_etiquetas(etiquetas, valores, f'le="{_formatear_numero(limite)}"')
+                lineas.append(f"{nombre}_bucket{le} {acumulado}")
+            le = _formatear_etiquetas(etiquetas, valores, 'le="+Inf"')
+            lineas.append(f"{nombre}_bucket{le} {serie.total}")
+            sufijo = _formatear_etiquetas(etiquetas, valores)
+            lineas.append(f"{nombre}_sum{sufijo} {_formatear_numero(round(serie.suma, 6))}")
+            lineas.append(f"{nombre}_count{sufijo} {serie.total}")
+        else:
+            valor = serie.valor if isinstance(serie, Contador) else serie
+            lineas.append(f"{nombre}{_formatear_etiquetas(etiquetas, valores)} {_formatear_numero(valor)}")
+    return lineas
+
+
+class RegistroMetricas:
+    """
+    Registro de metricas del servicio.
+
+    Las familias propias (contadores e histogramas) se actualizan en el
+    momento; los recolectores se invocan solo al exportar y traducen
+    estadisticas que ya existen (colas, partners) sin duplicarlas.
+    """
+
+    def __init__(self):
+        self._familias: Dict[str, FamiliaMetricas] = {}
+        self._recolectores: List[Callable[[], List[str]]] = []
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> FamiliaMetricas:
+        return self._registrar(FamiliaMetricas(nombre, ayuda, "counter", etiquetas))
+
+    def histograma(
+        self,
+        nombre: str,
+        ayuda: str,
+        etiquetas: Sequence[str] = (),
+        buckets: Optional[Sequence[float]] = None
+    ) -> FamiliaMetricas:
+        return self._registrar(FamiliaMetricas(nombre, ayuda, "histogram", etiquetas, buckets))
+
+    def _registrar(self, familia: FamiliaMetricas) -> FamiliaMetricas:
+        existente = self._familias.get(familia.nombre)
+        if existente is not None:
+            return existente
+        self._familias[familia.nombre] = familia
+        return familia
+
+    def registrar_recolector(self, recolector: Callable[[], List[str]]) -> None:
+        """Agrega una funcion que devuelve lineas de texto al exportar."""
+        self._recolectores.append(recolector)
+
+    def exportar(self) -> str:
+        """Todas las metricas en formato de texto de Prometheus."""
+        lineas: List[str] = []
+        for familia in self._familias.values():
+            lineas.extend(formatear_familia(
+                familia.nombre, familia.ayuda, familia.tipo,
+                familia.etiquetas_nombres, familia.series()
+            ))
+        for recolector in self._recolectores:
+            lineas.extend(recolector())
+        return "\n".join(lineas) + "\n"
+
+
+metricas = RegistroMetricas()
@@ -88,6 +88,7 @@ class ReembolsoRequest(BaseModel):
     pago_id: str = Field(..., description="ID del pago a reembolsar")
     monto: Optional[float] = Field(None, description="Monto a reembolsar (parcial)")
     razon: Optional[str] = Field(None, description="Razon del reembolso")
+    pasarela: Optional[str] = Field(None, description="Pasarela que proceso el pago (la de PagoResponse)")
 
 
 class ReembolsoResponse(BaseModel):
@@ -0,0 +1,81 @@
+"""
+Lectura incremental de NDJSON (un objeto JSON por linea).
+
+Los bodies de importacion pueden pesar cientos de MB: se leen fragmento a
+fragmento desde request.stream() y solo se mantiene en memoria la linea
+en curso.
+"""
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Tuple
+
+MAX_BYTES_LINEA = 64 * 1024
+
+
+class LineaInvalida(ValueError):
+    """Linea que no es un objeto JSON o que excede el tamanio maximo."""
+
+    def __init__(self, numero: int, mensaje: str):
+        super().__init__(f"Linea {numero}: {mensaje}")
+        self.numero = numero
+        self.mensaje = mensaje
+
+
+async def iterar_lineas(
+    fragmentos: AsyncIterable[bytes],
+    max_bytes_linea: int = MAX_BYTES_LINEA
+) -> AsyncIterator[Tuple[int, bytes]]:
+    """
+    Parte un stream de bytes en lineas no vacias.
+
+    Args:
+        fragmentos: Stream de bytes (ej. request.stream())
+        max_bytes_linea: Tamanio maximo de una linea
+
+    Yields:
+        (numero de linea, contenido sin el salto de linea)
+
+    Raises:
+        LineaInvalida: Si una linea excede max_bytes_linea. El stream no
+            puede resincronizarse, asi que la lectura se corta ahi.
+    """
+    pendiente = bytearray()
+    numero = 0
+    async for fragmento in fragmentos:
+        if not fragmento:
+            continue
+        pendiente.extend(fragmento)
+        inicio = 0
+        while True:
+            fin = pendiente.find(b"\n", inicio)
+            if fin < 0:
+                break
+            numero += 1
+            linea = bytes(pendiente[inicio:fin]).strip()
+            inicio = fin + 1
+            if len(linea) > max_bytes_linea:
+                raise LineaInvalida(numero, f"excede {max_bytes_linea} bytes")
+            if linea:
+                yield numero, linea
+        del pendiente[:inicio]
+        if len(pendiente) > max_bytes_linea:
+            raise LineaInvalida(numero + 1, f"excede {max_bytes_linea} bytes")
+
+    linea = bytes(pendiente).strip()
+    if linea:
+        yield numero + 1, linea
+
+
+def parsear_objeto(numero: int, linea: bytes) -> dict:
+    """
+    Parsea una linea como objeto JSON.
+
+    Raises:
+        LineaInvalida: Si no es JSON o no es un objeto
+    """
+    try:
+        valor: Any = json.loads(linea)
+    except ValueError:
+        raise LineaInvalida(numero, "JSON invalido") from None
+    if not isinstance(valor, dict):
+        raise LineaInvalida(numero, "se esperaba un objeto JSON")
+    return valor
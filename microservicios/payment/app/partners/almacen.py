@@ -4,6 +4,7 @@ Almacen en memoria para partners (reemplazar por DB en produccion).
 from datetime import datetime
 from typing import Optional, Dict, List, Any
 from app.modelos.partner import TipoEvento
+from app.metricas import metricas, formatear_familia
 
 
 class PartnerData:
@@ -33,6 +34,7 @@ class PartnerData:
         self.ultimo_webhook_recibido: Optional[Dict[str, Any]] = None
         self.webhooks_exitosos = 0
         self.webhooks_fallidos = 0
+        self.fallos_consecutivos = 0
         self.webhooks_recibidos_exitosos = 0
         self.webhooks_recibidos_fallidos = 0
         self.creado_en = datetime.utcnow()
@@ -65,12 +67,17 @@ class AlmacenPartners:
     """
     
     _partners: Dict[str, PartnerData] = {}
+    _secretos: Dict[str, str] = {}  # partner_id -> secreto HMAC (solo activos)
     
     @classmethod
     def guardar(cls, partner: PartnerData) -> PartnerData:
         """Guarda o actualiza un partner."""
         partner.actualizado_en = datetime.utcnow()
         cls._partners[partner.id] = partner
+        if partner.activo:
+            cls._secretos[partner.id] = partner.hmac_secret
+        else:
+            cls._secretos.pop(partner.id, None)
         return partner
     
     @classmethod
@@ -78,6 +85,11 @@ class AlmacenPartners:
         """Obtiene un partner por ID."""
         return cls._partners.get(partner_id)
     
+    @classmethod
+    def obtener_secreto(cls, partner_id: str) -> Optional[str]:
+        """Obtiene el secreto HMAC de un partner activo sin cargar el partner."""
+        return cls._secretos.get(partner_id)
+    
     @classmethod
     def obtener_por_nombre(cls, nombre: str) -> Optional[PartnerData]:
         """Obtiene un partner por nombre."""
@@ -99,6 +111,7 @@ class AlmacenPartners:
         """Elimina un partner."""
         if partner_id in cls._partners:
             del cls._partners[partner_id]
+            cls._secretos.pop(partner_id, None)
             return True
         return False
     
@@ -143,10 +156,44 @@ class AlmacenPartners:
             partner.ultimo_webhook_enviado = datetime.utcnow()
             if exitoso:
                 partner.webhooks_exitosos += 1
+                partner.fallos_consecutivos = 0
             else:
                 partner.webhooks_fallidos += 1
+                partner.fallos_consecutivos += 1
     
     @classmethod
     def limpiar(cls) -> None:
         """Limpia todos los partners (para testing)."""
         cls._partners.clear()
+        cls._secretos.clear()
+    
+    @classmethod
+    def metricas_prometheus(cls) -> List[str]:
+        """Contadores de entrega por partner (desde actualizar_estadisticas)."""
+        partners = list(cls._partners.values())
+        lineas = formatear_familia(
+            "payment_partner_webhooks_total",
+            "Webhooks enviados a partners por resultado",
+            "counter",
+            ("partner_id", "resultado"),
+            [((p.id, "exitoso"), p.webhooks_exitosos) for p in partners]
+            + [((p.id, "fallido"), p.webhooks_fallidos) for p in partners]
+        )
+        lineas += formatear_familia(
+            "payment_partner_fallos_consecutivos",
+            "Entregas fallidas seguidas desde el ultimo exito",
+            "gauge",
+            ("partner_id",),
+            [((p.id,), p.fallos_consecutivos) for p in partners]
+        )
+        lineas += formatear_familia(
+            "payment_partner_activo",
+            "1 si el partner esta activo",
+            "gauge",
+            ("partner_id",),
+            [((p.id,), int(p.activo)) for p in partners]
+        )
+        return lineas
+
+
+metricas.registrar_recolector(AlmacenPartners.metricas_prometheus)
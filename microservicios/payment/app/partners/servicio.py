@@ -4,6 +4,7 @@ Servicio de gestion de partners B2B.
 import uuid
 import json
 import asyncio
+import time
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 
@@ -19,6 +20,13 @@ from app.modelos.webhook import NotificacionPartner
 from app.partners.almacen import AlmacenPartners, PartnerData
 from app.seguridad.hmac_auth import generar_secreto, generar_firma_hmac
 from app.config import configuracion
+from app.metricas import metricas
+
+_latencia_entrega = metricas.histograma(
+    "payment_partner_entrega_ms",
+    "Latencia de entrega de webhooks a partners (incluye reintentos)",
+    ("partner_id", "resultado")
+)
 
 
 class ServicioPartners:
@@ -250,6 +258,7 @@ class ServicioPartners:
         }
         
         # Intentar enviar con reintentos
+        inicio = time.perf_counter()
         for intento in range(configuracion.WEBHOOK_REINTENTOS):
             try:
                 async with httpx.AsyncClient(timeout=configuracion.WEBHOOK_TIMEOUT) as cliente:
@@ -261,6 +270,9 @@ class ServicioPartners:
                     
                     if respuesta.status_code in [200, 201, 202, 204]:
                         AlmacenPartners.actualizar_estadisticas(partner.id, exitoso=True)
+                        _latencia_entrega.etiquetas(partner.id, "exitoso").observar(
+                            (time.perf_counter() - inicio) * 1000
+                        )
                         return True
                     
             except Exception as e:
@@ -269,6 +281,7 @@ class ServicioPartners:
                 continue
         
         AlmacenPartners.actualizar_estadisticas(partner.id, exitoso=False)
+        _latencia_entrega.etiquetas(partner.id, "fallido").observar((time.perf_counter() - inicio) * 1000)
         return False
     
     @staticmethod
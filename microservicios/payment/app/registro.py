@@ -0,0 +1,144 @@
+"""
+Logging asincrono del microservicio de pagos.
+
+Los loggers "payment.*" solo encolan el registro (QueueHandler); la
+escritura a stdout la hace un hilo aparte (QueueListener), asi que un
+log nunca bloquea el event loop esperando al terminal o al colector.
+
+Cada registro lleva el id de correlacion activo (id de evento o de pago),
+propagado con contextvars a traves de las tareas asyncio.
+"""
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional
+
+from app.config import configuracion
+
+RAIZ = "payment"
+
+# Atributos propios de LogRecord; el resto vino de extra={...}
+_CAMPOS_LOGRECORD = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+_correlacion: ContextVar[Optional[str]] = ContextVar("correlacion_id", default=None)
+
+
+def obtener_correlacion() -> Optional[str]:
+    """Id de correlacion del contexto actual."""
+    return _correlacion.get()
+
+
+@contextmanager
+def correlacion(valor: Optional[str]) -> Iterator[None]:
+    """
+    Asocia un id de correlacion a los logs emitidos dentro del bloque
+    (incluidas las tareas creadas desde el).
+
+    Args:
+        valor: Id del evento o del pago; None conserva el actual
+    """
+    if valor is None:
+        yield
+        return
+    token = _correlacion.set(str(valor))
+    try:
+        yield
+    finally:
+        _correlacion.reset(token)
+
+
+class FiltroCorrelacion(logging.Filter):
+    """
+    Copia el id de correlacion al registro. Corre en el hilo que emite el
+    log, antes de encolarlo, porque el contexto no viaja al QueueListener.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "correlacion_id"):
+            record.correlacion_id = _correlacion.get()
+        return True
+
+
+class ManejadorCola(logging.handlers.QueueHandler):
+    """
+    QueueHandler para un QueueListener del mismo proceso: solo resuelve el
+    mensaje antes de encolar. No copia el registro ni formatea la traza
+    (lo hace el hilo de escritura), asi el costo en el event loop es minimo.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+
+class FormateadorJSON(logging.Formatter):
+    """Una linea JSON por registro, con los campos de extra al primer nivel."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        datos: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensaje": record.getMessage()
+        }
+        for clave, valor in record.__dict__.items():
+            if clave not in _CAMPOS_LOGRECORD:
+                datos[clave] = valor
+        if record.exc_info:
+            datos["error"] = self.formatException(record.exc_info)
+        return json.dumps(datos, default=str, ensure_ascii=False)
+
+
+def configurar_logging(nivel: Optional[str] = None) -> None:
+    """
+    Instala el QueueHandler en el logger raiz del servicio y arranca el
+    hilo de escritura. Es idempotente.
+
+    Args:
+        nivel: Nivel minimo (default LOG_NIVEL)
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    cola: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    salida = logging.StreamHandler(sys.stdout)
+    if configuracion.LOG_FORMATO == "json":
+        salida.setFormatter(FormateadorJSON())
+    else:
+        salida.setFormatter(logging.Formatter(
+            "%(asctime)s %(levelname)s %(name)s [%(correlacion_id)s]: %(message)s"
+        ))
+
+    manejador = ManejadorCola(cola)
+    manejador.addFilter(FiltroCorrelacion())
+
+    raiz = logging.getLogger(RAIZ)
+    raiz.handlers = [manejador]
+    raiz.setLevel((nivel or configuracion.LOG_NIVEL).upper())
+    raiz.propagate = False
+
+    _listener = logging.handlers.QueueListener(cola, salida)
+    _listener.start()
+
+
+def detener_logging() -> None:
+    """Vacia la cola y detiene el hilo de escritura."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(nombre: str) -> logging.Logger:
+    """Logger hijo de la raiz del servicio (payment.<nombre>)."""
+    return logging.getLogger(f"{RAIZ}.{nombre}")
@@ -0,0 +1,223 @@
+"""
+Registro muestreado de requests HTTP y latencia por ruta.
+
+Middleware ASGI que mide cada request y registra su latencia en un
+histograma por (metodo, ruta). Solo una fraccion de las requests se
+escribe en el log (siempre las que terminan en 5xx), y el body solo se
+captura con LOG_REQUESTS_BODY activo, truncado y con campos sensibles
+ocultos.
+"""
+import json
+import logging
+import random
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import configuracion
+from app.metricas import Histograma, metricas, formatear_familia
+from app.registro import get_logger
+
+logger = get_logger("requests")
+
+OCULTO = "***"
+
+# Cabeceras y claves JSON que nunca se escriben en claro
+CABECERAS_SENSIBLES = frozenset({
+    "authorization", "cookie", "set-cookie", "stripe-signature",
+    "x-webhook-signature", "x-api-key"
+})
+CLAVES_SENSIBLES = frozenset({
+    "password", "token", "access_token", "secret", "hmac_secret",
+    "client_secret", "card", "card_number", "numero_tarjeta", "cvv", "cvc"
+})
+
+
+def ocultar_datos(valor: Any) -> Any:
+    """Copia de un valor JSON con las claves sensibles ocultas."""
+    if isinstance(valor, dict):
+        return {
+            clave: OCULTO if clave.lower() in CLAVES_SENSIBLES else ocultar_datos(v)
+            for clave, v in valor.items()
+        }
+    if isinstance(valor, list):
+        return [ocultar_datos(v) for v in valor]
+    return valor
+
+
+def ocultar_cabeceras(cabeceras: Iterable[Tuple[bytes, bytes]]) -> Dict[str, str]:
+    """Cabeceras ASGI como dict, con las sensibles ocultas."""
+    resultado = {}
+    for nombre, valor in cabeceras:
+        clave = nombre.decode("latin-1").lower()
+        resultado[clave] = OCULTO if clave in CABECERAS_SENSIBLES else valor.decode("latin-1")
+    return resultado
+
+
+def ocultar_body(body: bytes, truncado: bool) -> Any:
+    """
+    Body para el log: JSON con las claves sensibles ocultas. Lo que no se
+    puede parsear (truncado o no JSON) no se puede ocultar por claves, asi
+    que solo se informa su tamanio.
+    """
+    if not truncado:
+        try:
+            return ocultar_datos(json.loads(body)) if body else None
+        except ValueError:
+            pass
+    return {"bytes": len(body), "truncado": truncado}
+
+
+class MetricasRequests:
+    """Histogramas de latencia y conteo de status por ruta."""
+
+    def __init__(self):
+        self._latencias: Dict[Tuple[str, str], Histograma] = {}
+        self._status: Dict[Tuple[str, str], Dict[str, int]] = {}
+
+    def observar(self, metodo: str, ruta: str, status: int, duracion_ms: float) -> None:
+        clave = (metodo, ruta)
+        histograma = self._latencias.get(clave)
+        if histograma is None:
+            histograma = self._latencias[clave] = Histograma()
+            self._status[clave] = {}
+        histograma.observar(duracion_ms)
+        clase = f"{status // 100}xx"
+        conteos = self._status[clave]
+        conteos[clase] = conteos.get(clase, 0) + 1
+
+    def estadisticas(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "metodo": metodo,
+                "ruta": ruta,
+                "status": self._status[(metodo, ruta)],
+                "latencia_ms": histograma.to_dict()
+            }
+            for (metodo, ruta), histograma in sorted(self._latencias.items(), key=lambda i: i[0][1])
+        ]
+
+    def metricas_prometheus(self) -> List[str]:
+        """Latencia y conteo de requests por ruta en formato Prometheus."""
+        lineas = formatear_familia(
+            "payment_http_request_ms",
+            "Latencia de requests HTTP por metodo y ruta",
+            "histogram",
+            ("metodo", "ruta"),
+            list(self._latencias.items())
+        )
+        lineas += formatear_familia(
+            "payment_http_requests_total",
+            "Requests HTTP por metodo, ruta y clase de status",
+            "counter",
+            ("metodo", "ruta", "status"),
+            [
+                ((metodo, ruta, clase), conteo)
+                for (metodo, ruta), conteos in self._status.items()
+                for clase, conteo in conteos.items()
+            ]
+        )
+        return lineas
+
+    def limpiar(self) -> None:
+        self._latencias.clear()
+        self._status.clear()
+
+
+metricas_requests = MetricasRequests()
+metricas.registrar_recolector(metricas_requests.metricas_prometheus)
+
+
+class RegistroRequestsMiddleware:
+    """
+    Middleware ASGI de registro de requests.
+
+    Args:
+        app: Aplicacion ASGI
+        muestreo: Fraccion de requests a registrar (default LOG_REQUESTS_MUESTREO)
+        capturar_body: Incluir el body en el log (default LOG_REQUESTS_BODY)
+        rutas_body: Prefijos de ruta cuyo body se captura
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        muestreo: Optional[float] = None,
+        capturar_body: Optional[bool] = None,
+        rutas_body: Iterable[str] = ("/suscripciones",)
+    ):
+        self.app = app
+        self.muestreo = configuracion.LOG_REQUESTS_MUESTREO if muestreo is None else muestreo
+        self.capturar_body = configuracion.LOG_REQUESTS_BODY if capturar_body is None else capturar_body
+        self.rutas_body = tuple(rutas_body)
+        self.max_body = configuracion.LOG_REQUESTS_BODY_MAX
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        status = 500
+        capturado: Optional[bytearray] = None
+        truncado = False
+
+        if self.capturar_body and scope["path"].startswith(self.rutas_body) and logger.isEnabledFor(logging.DEBUG):
+            capturado = bytearray()
+            receive_original = receive
+
+            async def receive(_receive: Receive = receive_original) -> Message:
+                nonlocal truncado
+                mensaje = await _receive()
+                fragmento = mensaje.get("body", b"")
+                if fragmento and not truncado:
+                    disponible = self.max_body - len(capturado)
+                    capturado.extend(fragmento[:disponible])
+                    truncado = len(fragmento) > disponible
+                return mensaje
+
+        async def send_con_status(mensaje: Message) -> None:
+            nonlocal status
+            if mensaje["type"] == "http.response.start":
+                status = mensaje["status"]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, send_con_status)
+        finally:
+            duracion_ms = (time.perf_counter() - inicio) * 1000
+            # Plantilla de la ruta (/partners/{partner_id}) para no crear una serie por ID
+            ruta = getattr(scope.get("route"), "path", None) or "sin_ruta"
+            metricas_requests.observar(scope["method"], ruta, status, duracion_ms)
+
+            if status >= 500 or capturado is not None or random.random() < self.muestreo:
+                self._registrar(scope, ruta, status, duracion_ms, capturado, truncado)
+
+    def _registrar(
+        self,
+        scope: Scope,
+        ruta: str,
+        status: int,
+        duracion_ms: float,
+        capturado: Optional[bytearray],
+        truncado: bool
+    ) -> None:
+        if status >= 500:
+            nivel = logging.ERROR
+        else:
+            nivel = logging.DEBUG if capturado is not None else logging.INFO
+        if not logger.isEnabledFor(nivel):
+            return
+
+        extra: Dict[str, Any] = {
+            "metodo": scope["method"],
+            "path": scope["path"],
+            "ruta": ruta,
+            "status": status,
+            "duracion_ms": round(duracion_ms, 3)
+        }
+        if capturado is not None:
+            extra["cabeceras"] = ocultar_cabeceras(scope["headers"])
+            extra["body"] = ocultar_body(bytes(capturado), truncado)
+        logger.log(nivel, "request", extra=extra)
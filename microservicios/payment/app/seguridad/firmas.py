@@ -0,0 +1,107 @@
+"""
+Calculo y verificacion de firmas HMAC-SHA256 sin copias del payload.
+
+El mensaje firmado es "<timestamp>." + payload. En lugar de concatenarlo
+(lo que copia el body completo), se alimenta el HMAC en dos update().
+La clave se precalcula una sola vez por secreto: hmac.new(clave) deriva
+los pads internos y .copy() los reutiliza en cada verificacion.
+"""
+import hashlib
+import hmac
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple, Union
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+@lru_cache(maxsize=1024)
+def _prototipo(secreto: str) -> "hmac.HMAC":
+    """HMAC inicializado con la clave, listo para copiar."""
+    return hmac.new(secreto.encode(), digestmod=hashlib.sha256)
+
+
+def nuevo_hmac(secreto: str) -> "hmac.HMAC":
+    """Devuelve un HMAC-SHA256 vacio para el secreto, desde el prototipo cacheado."""
+    return _prototipo(secreto).copy()
+
+
+def calcular_firma(payload: BytesLike, secreto: str, timestamp: int) -> str:
+    """
+    Calcula la firma hexadecimal de "<timestamp>." + payload.
+
+    Args:
+        payload: Body en bytes
+        secreto: Secreto compartido
+        timestamp: Timestamp Unix incluido en la firma
+    """
+    firma = nuevo_hmac(secreto)
+    firma.update(b"%d." % timestamp)
+    firma.update(payload)
+    return firma.hexdigest()
+
+
+def firmas_iguales(esperada: str, recibida: str) -> bool:
+    """Comparacion en tiempo constante."""
+    return hmac.compare_digest(esperada, recibida)
+
+
+def alguna_firma_igual(esperada: str, recibidas: Sequence[str]) -> bool:
+    """
+    True si alguna de las firmas recibidas coincide con la esperada.
+
+    Durante una rotacion de secreto el emisor envia varias v1; se comparan
+    todas (sin cortar en la primera) para no filtrar cual coincidio.
+    """
+    coincide = False
+    for recibida in recibidas:
+        coincide |= hmac.compare_digest(esperada, recibida)
+    return coincide
+
+
+_ERROR_STRIPE = "Formato de firma Stripe inválido. Esperado: t=timestamp,v1=firma"
+
+
+def parsear_firmas(
+    cabecera_firma: str,
+    cabecera_timestamp: Optional[str] = None
+) -> Tuple[Tuple[str, ...], int]:
+    """
+    Extrae (firmas, timestamp) de cualquiera de los dos formatos soportados.
+
+    1. Formato Stripe: cabecera_firma = "t=<timestamp>,v1=<firma>[,v1=<firma>...]"
+       en cualquier orden; se devuelven todas las v1 y se ignoran otros
+       esquemas (v0, ...).
+    2. Formato Simple: cabecera_firma = "<firma>" y cabecera_timestamp = "<timestamp>"
+
+    Raises:
+        ValueError: Si la cabecera no es valida para ninguno de los formatos
+    """
+    if es_formato_stripe(cabecera_firma):
+        timestamp = None
+        firmas = []
+        for parte in cabecera_firma.split(","):
+            clave, separador, valor = parte.strip().partition("=")
+            if not separador:
+                raise ValueError(_ERROR_STRIPE)
+            if clave == "t":
+                timestamp = valor
+            elif clave == "v1" and valor:
+                firmas.append(valor)
+        if timestamp is None or not firmas:
+            raise ValueError(_ERROR_STRIPE)
+        try:
+            return tuple(firmas), int(timestamp)
+        except ValueError:
+            raise ValueError(_ERROR_STRIPE)
+
+    if not cabecera_timestamp:
+        raise ValueError("X-Webhook-Timestamp requerido para formato simple")
+    try:
+        return (cabecera_firma,), int(cabecera_timestamp)
+    except ValueError:
+        raise ValueError("Timestamp invalido")
+
+
+def es_formato_stripe(cabecera_firma: str) -> bool:
+    """Indica si la cabecera usa el formato t=...,v1=... (en cualquier orden)."""
+    return any(parte.strip().startswith(("t=", "v1=")) for parte in cabecera_firma.split(","))
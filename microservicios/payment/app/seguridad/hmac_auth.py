@@ -1,15 +1,15 @@
 """
 Utilidades de autenticacion HMAC para webhooks.
 """
-import hmac
-import hashlib
 import secrets
 import time
-from typing import Optional
-from fastapi import Request, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
+from typing import Optional, Sequence, Tuple, Union
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.config import configuracion
+from app.seguridad.firmas import alguna_firma_igual, calcular_firma, nuevo_hmac, parsear_firmas
 
 
 def generar_secreto(longitud: int = 32) -> str:
@@ -43,21 +43,13 @@ def generar_firma_hmac(
     """
     ts = timestamp or int(time.time())
     
-    # Concatenar timestamp con payload para prevenir ataques de replay
-    mensaje = f"{ts}.".encode() + payload
-    
-    firma = hmac.new(
-        secreto.encode(),
-        mensaje,
-        hashlib.sha256
-    ).hexdigest()
-    
-    return firma, ts
+    # El timestamp forma parte del mensaje firmado para prevenir ataques de replay
+    return calcular_firma(payload, secreto, ts), ts
 
 
 def verificar_firma_hmac(
     payload: bytes,
-    firma: str,
+    firma: Union[str, Sequence[str]],
     secreto: str,
     timestamp: int,
     tolerancia_segundos: int = 300
@@ -67,7 +59,7 @@ def verificar_firma_hmac(
     
     Args:
         payload: Datos firmados en bytes
-        firma: Firma a verificar
+        firma: Firma a verificar, o varias (rotacion de secreto): basta una
         secreto: Secreto compartido
         timestamp: Timestamp del mensaje
         tolerancia_segundos: Tolerancia para ataques de replay (default 5 min)
@@ -81,15 +73,11 @@ def verificar_firma_hmac(
         return False
     
     # Calcular firma esperada
-    mensaje = f"{timestamp}.".encode() + payload
-    firma_esperada = hmac.new(
-        secreto.encode(),
-        mensaje,
-        hashlib.sha256
-    ).hexdigest()
+    firma_esperada = calcular_firma(payload, secreto, timestamp)
     
     # Comparacion segura contra timing attacks
-    return hmac.compare_digest(firma_esperada, firma)
+    firmas = (firma,) if isinstance(firma, str) else firma
+    return alguna_firma_igual(firma_esperada, firmas)
 
 
 def construir_cabecera_firma(firma: str, timestamp: int) -> str:
@@ -106,85 +94,151 @@ def construir_cabecera_firma(firma: str, timestamp: int) -> str:
     return f"t={timestamp},v1={firma}"
 
 
-def parsear_cabecera_firma(cabecera: str) -> tuple[Optional[str], Optional[int]]:
+def parsear_cabecera_firma(cabecera: str) -> Tuple[Optional[Tuple[str, ...]], Optional[int]]:
     """
     Parsea una cabecera de firma.
     
     Args:
-        cabecera: Cabecera en formato "t=timestamp,v1=firma"
+        cabecera: Cabecera en formato "t=timestamp,v1=firma" (pares en
+            cualquier orden, una o varias v1)
         
     Returns:
-        Tupla con (firma, timestamp) o (None, None) si es invalida
+        Tupla con (firmas v1, timestamp) o (None, None) si es invalida
     """
     try:
-        partes = dict(p.split("=", 1) for p in cabecera.split(","))
-        return partes.get("v1"), int(partes.get("t", 0))
+        return parsear_firmas(cabecera)
     except (ValueError, AttributeError):
         return None, None
 
 
-class HMACMiddleware(BaseHTTPMiddleware):
+class HMACMiddleware:
     """
-    Middleware para verificar firmas HMAC en webhooks entrantes.
+    Middleware ASGI para verificar firmas HMAC en webhooks entrantes.
     Solo se aplica a rutas especificas.
+
+    Cada request debe identificar a su partner (ruta /partners/{id} o
+    cabecera X-Partner-ID) y se verifica con el secreto de ese partner:
+    sin partner se responde 401, partner desconocido 404 e inactivo 403.
+    No hay secreto global de respaldo. El partner verificado queda en
+    request.state.partner_id para el endpoint.
+
+    La firma se calcula a medida que llegan los fragmentos del body, que
+    luego se reenvian tal cual a la aplicacion: el body no se lee dos veces
+    ni se concatena para firmarlo.
     """
     
     def __init__(
         self,
-        app,
+        app: ASGIApp,
         rutas_protegidas: list[str] = None,
         cabecera_firma: str = "X-Webhook-Signature",
-        cabecera_timestamp: str = "X-Webhook-Timestamp"
+        cabecera_timestamp: str = "X-Webhook-Timestamp",
+        max_body_bytes: Optional[int] = None,
+        tolerancia_segundos: int = 300
     ):
-        super().__init__(app)
-        self.rutas_protegidas = rutas_protegidas or ["/webhooks/external"]
+        self.app = app
+        self.rutas_protegidas = tuple(rutas_protegidas or ["/webhooks/external", "/webhooks/partners/"])
         self.cabecera_firma = cabecera_firma
         self.cabecera_timestamp = cabecera_timestamp
+        self.max_body_bytes = max_body_bytes or configuracion.HMAC_MAX_BODY_BYTES
+        self.tolerancia_segundos = tolerancia_segundos
+        
+        # Import diferido: app.partners depende de este modulo
+        from app.partners.almacen import AlmacenPartners
+        self._obtener_secreto_partner = AlmacenPartners.obtener_secreto
+        self._obtener_partner = AlmacenPartners.obtener
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         # Solo verificar rutas protegidas
-        ruta_actual = request.url.path
+        if scope["type"] != "http" or not scope["path"].startswith(self.rutas_protegidas):
+            await self.app(scope, receive, send)
+            return
+        
+        headers = Headers(scope=scope)
+        cabecera = headers.get(self.cabecera_firma)
+        if not cabecera:
+            await self._rechazar(scope, receive, send, 401, "Cabeceras de firma HMAC requeridas")
+            return
         
-        requiere_verificacion = any(
-            ruta_actual.startswith(ruta) 
-            for ruta in self.rutas_protegidas
-        )
+        try:
+            firmas, timestamp = parsear_firmas(cabecera, headers.get(self.cabecera_timestamp))
+        except ValueError as e:
+            await self._rechazar(scope, receive, send, 401, str(e))
+            return
         
-        if not requiere_verificacion:
-            return await call_next(request)
+        if abs(int(time.time()) - timestamp) > self.tolerancia_segundos:
+            await self._rechazar(scope, receive, send, 401, "Firma HMAC invalida")
+            return
         
-        # Obtener cabeceras de firma
-        firma = request.headers.get(self.cabecera_firma)
-        timestamp_str = request.headers.get(self.cabecera_timestamp)
+        partner_id = self._partner_id(scope["path"], headers)
+        if not partner_id:
+            await self._rechazar(scope, receive, send, 401, "X-Partner-ID requerido")
+            return
+        secreto = self._obtener_secreto_partner(partner_id)
+        if not secreto:
+            # Sin secreto activo: distinguir partner inexistente de inactivo
+            if self._obtener_partner(partner_id) is None:
+                await self._rechazar(scope, receive, send, 404, f"Partner '{partner_id}' no encontrado")
+            else:
+                await self._rechazar(scope, receive, send, 403, f"Partner '{partner_id}' no está activo")
+            return
         
-        if not firma or not timestamp_str:
-            raise HTTPException(
-                status_code=401,
-                detail="Cabeceras de firma HMAC requeridas"
-            )
+        longitud = headers.get("content-length")
+        if longitud and longitud.isdigit() and int(longitud) > self.max_body_bytes:
+            await self._rechazar(scope, receive, send, 413, "Payload demasiado grande")
+            return
         
-        try:
-            timestamp = int(timestamp_str)
-        except ValueError:
-            raise HTTPException(
-                status_code=401,
-                detail="Timestamp invalido"
-            )
-        
-        # Leer body
-        body = await request.body()
-        
-        # Obtener partner_id del path o header para buscar su secreto
-        partner_id = request.headers.get("X-Partner-ID")
-        
-        # Por ahora usamos el secreto global, en produccion
-        # se buscaria el secreto especifico del partner
-        secreto = configuracion.HMAC_SECRET_GLOBAL
-        
-        if not verificar_firma_hmac(body, firma, secreto, timestamp):
-            raise HTTPException(
-                status_code=401,
-                detail="Firma HMAC invalida"
-            )
-        
-        return await call_next(request)
+        # Calcular la firma mientras se recibe el body
+        calculo = nuevo_hmac(secreto)
+        calculo.update(b"%d." % timestamp)
+        fragmentos: list[bytes] = []
+        recibidos = 0
+        while True:
+            mensaje = await receive()
+            if mensaje["type"] == "http.disconnect":
+                return
+            fragmento = mensaje.get("body", b"")
+            recibidos += len(fragmento)
+            if recibidos > self.max_body_bytes:
+                await self._rechazar(scope, receive, send, 413, "Payload demasiado grande")
+                return
+            if fragmento:
+                calculo.update(fragmento)
+                fragmentos.append(fragmento)
+            if not mensaje.get("more_body", False):
+                break
+        
+        if not alguna_firma_igual(calculo.hexdigest(), firmas):
+            await self._rechazar(scope, receive, send, 401, "Firma HMAC invalida")
+            return
+        
+        scope.setdefault("state", {})["partner_id"] = partner_id
+        await self.app(scope, self._reproducir(fragmentos, receive), send)
+    
+    @staticmethod
+    def _partner_id(ruta: str, headers: Headers) -> Optional[str]:
+        """Partner de la ruta /partners/{id} o, si no, de X-Partner-ID."""
+        if "/partners/" in ruta:
+            return ruta.rsplit("/partners/", 1)[1].split("/", 1)[0] or None
+        return headers.get("X-Partner-ID")
+    
+    @staticmethod
+    def _reproducir(fragmentos: list[bytes], receive: Receive) -> Receive:
+        """Reenvia los fragmentos ya recibidos y despues delega en receive."""
+        mensajes = [
+            {"type": "http.request", "body": fragmento, "more_body": True}
+            for fragmento in fragmentos
+        ] or [{"type": "http.request", "body": b"", "more_body": True}]
+        mensajes[-1]["more_body"] = False
+        pendientes = iter(mensajes)
+        
+        async def receive_reproducido() -> Message:
+            mensaje = next(pendientes, None)
+            return mensaje if mensaje is not None else await receive()
+        
+        return receive_reproducido
+    
+    @staticmethod
+    async def _rechazar(scope: Scope, receive: Receive, send: Send, status: int, detalle: str) -> None:
+        respuesta = JSONResponse({"detail": detalle}, status_code=status)
+        await respuesta(scope, receive, send)
@@ -3,11 +3,32 @@ Sistema de colas con prioridad para usuarios premium.
 """
 import asyncio
 import heapq
+import time
 from datetime import datetime
 from dataclasses import dataclass, field
 from typing import Optional, List, Dict, Any
 from enum import Enum
 
+from app.metricas import (
+    metricas,
+    formatear_familia,
+    BUCKETS_OPERACION_MS,
+    BUCKETS_ESPERA_MS
+)
+
+_latencia_operacion = metricas.histograma(
+    "payment_cola_operacion_ms",
+    "Duracion de encolar y desencolar en la cola con prioridad",
+    ("operacion",),
+    BUCKETS_OPERACION_MS
+)
+_espera_en_cola = metricas.histograma(
+    "payment_cola_espera_ms",
+    "Tiempo que un elemento espera en la cola hasta ser atendido",
+    ("prioridad",),
+    BUCKETS_ESPERA_MS
+)
+
 
 class PrioridadCola(int, Enum):
     """Niveles de prioridad en la cola."""
@@ -73,6 +94,7 @@ class ColaPremium:
         Returns:
             Posicion en la cola
         """
+        inicio = time.perf_counter()
         negocio_id = elemento.negocio_id
         
         if negocio_id not in cls._colas:
@@ -81,7 +103,9 @@ class ColaPremium:
         heapq.heappush(cls._colas[negocio_id], elemento)
         cls._elementos_por_cita[elemento.cita_id] = negocio_id
         
-        return cls.obtener_posicion(elemento.cita_id)
+        posicion = cls.obtener_posicion(elemento.cita_id)
+        _latencia_operacion.etiquetas("encolar").observar((time.perf_counter() - inicio) * 1000)
+        return posicion
     
     @classmethod
     def siguiente(cls, negocio_id: str) -> Optional[ElementoCola]:
@@ -97,10 +121,15 @@ class ColaPremium:
         if negocio_id not in cls._colas or not cls._colas[negocio_id]:
             return None
         
+        inicio = time.perf_counter()
         elemento = heapq.heappop(cls._colas[negocio_id])
         if elemento.cita_id in cls._elementos_por_cita:
             del cls._elementos_por_cita[elemento.cita_id]
         
+        _latencia_operacion.etiquetas("desencolar").observar((time.perf_counter() - inicio) * 1000)
+        _espera_en_cola.etiquetas("premium" if elemento.es_premium else "normal").observar(
+            (datetime.utcnow().timestamp() - elemento.timestamp) * 1000
+        )
         return elemento
     
     @classmethod
@@ -209,6 +238,25 @@ class ColaPremium:
         else:
             cls._colas.clear()
             cls._elementos_por_cita.clear()
+    
+    @classmethod
+    def metricas_prometheus(cls) -> List[str]:
+        """Profundidad de cada cola por negocio y prioridad (desde estadisticas)."""
+        series = []
+        for negocio_id in list(cls._colas):
+            stats = cls.estadisticas(negocio_id)
+            series.append(((negocio_id, "premium"), stats["premium"]))
+            series.append(((negocio_id, "normal"), stats["normal"]))
+        return formatear_familia(
+            "payment_cola_profundidad",
+            "Elementos en la cola de cada negocio",
+            "gauge",
+            ("negocio_id", "prioridad"),
+            series
+        )
+
+
+metricas.registrar_recolector(ColaPremium.metricas_prometheus)
 
 
 class ServicioPrioridad:
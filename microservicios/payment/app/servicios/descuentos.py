@@ -1,8 +1,9 @@
 """
 Servicio de gestión de descuentos por eventos de partners.
 """
+import heapq
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Set, Tuple
 from enum import Enum
 
 from app.servicios.suscripciones import (
@@ -53,31 +54,64 @@ class DescuentoData:
 
 
 class AlmacenDescuentos:
-    """Almacén en memoria para descuentos."""
+    """
+    Almacén en memoria para descuentos.
+
+    Los índices por usuario y por email son sets. El índice (usuario, tipo)
+    guarda el descuento activo de cada tipo, así la verificación de
+    duplicados no recorre los descuentos del usuario; junto a él se guardan
+    todos los activos de ese tipo para elegir otro (el más antiguo) cuando
+    el vigente se desactiva o expira. Las expiraciones van
+    en un min-heap que se purga antes de cada lectura: un descuento vencido
+    se desactiva y sale de los índices, y las consultas de activos solo
+    miran el flag.
+    """
     
     _descuentos: Dict[str, DescuentoData] = {}
-    _por_usuario: Dict[str, list[str]] = {}  # usuario_id -> [descuento_ids]
-    _pendientes_por_email: Dict[str, list[str]] = {}  # email -> [descuento_ids]
+    _por_usuario: Dict[str, Set[str]] = {}  # usuario_id -> {descuento_ids}
+    _pendientes_por_email: Dict[str, Set[str]] = {}  # email -> {descuento_ids}
+    _activo_por_tipo: Dict[Tuple[str, TipoDescuento], str] = {}  # (usuario_id, tipo) -> descuento_id
+    _pendiente_por_tipo: Dict[Tuple[str, TipoDescuento], str] = {}  # (email, tipo) -> descuento_id
+    _activos_de_tipo: Dict[Tuple[str, TipoDescuento], Set[str]] = {}  # (usuario_id, tipo) -> {descuento_ids}
+    _pendientes_de_tipo: Dict[Tuple[str, TipoDescuento], Set[str]] = {}  # (email, tipo) -> {descuento_ids}
+    _expiraciones: List[Tuple[datetime, str]] = []  # heap de (fecha_expiracion, descuento_id)
+    _expiracion_programada: Dict[str, datetime] = {}  # descuento_id -> fecha en el heap
     
     @classmethod
     def guardar(cls, descuento: DescuentoData) -> DescuentoData:
-        """Guarda un descuento."""
+        """
+        Guarda un descuento.
+
+        Si ya hay otro descuento activo del mismo tipo para el usuario (o
+        email pendiente), el índice conserva el primero; el nuevo queda
+        como candidato por si aquel se desactiva.
+        """
         cls._descuentos[descuento.id] = descuento
         
         # Si tiene usuario_id, indexar por usuario
         if descuento.usuario_id:
-            if descuento.usuario_id not in cls._por_usuario:
-                cls._por_usuario[descuento.usuario_id] = []
-            if descuento.id not in cls._por_usuario[descuento.usuario_id]:
-                cls._por_usuario[descuento.usuario_id].append(descuento.id)
+            cls._por_usuario.setdefault(descuento.usuario_id, set()).add(descuento.id)
+            if descuento.activo:
+                clave = (descuento.usuario_id, descuento.tipo)
+                cls._activos_de_tipo.setdefault(clave, set()).add(descuento.id)
+                cls._activo_por_tipo.setdefault(clave, descuento.id)
                 
         # Si NO tiene usuario_id pero tiene email en metadata, indexar por email (pendiente)
-        elif 'email' in descuento.metadata:
+        elif 'email' in descuento.metadata and descuento.activo:
             email = descuento.metadata['email']
-            if email not in cls._pendientes_por_email:
-                cls._pendientes_por_email[email] = []
-            if descuento.id not in cls._pendientes_por_email[email]:
-                cls._pendientes_por_email[email].append(descuento.id)
+            cls._pendientes_por_email.setdefault(email, set()).add(descuento.id)
+            clave = (email, descuento.tipo)
+            cls._pendientes_de_tipo.setdefault(clave, set()).add(descuento.id)
+            cls._pendiente_por_tipo.setdefault(clave, descuento.id)
+        
+        # Programar la expiración una sola vez por fecha
+        if (
+            descuento.activo
+            and descuento.fecha_expiracion is not None
+            and cls._expiracion_programada.get(descuento.id) != descuento.fecha_expiracion
+        ):
+            cls._expiracion_programada[descuento.id] = descuento.fecha_expiracion
+            heapq.heappush(cls._expiraciones, (descuento.fecha_expiracion, descuento.id))
         
         return descuento
     
@@ -89,22 +123,32 @@ class AlmacenDescuentos:
     @classmethod
     def obtener_por_usuario(cls, usuario_id: str, solo_activos: bool = True) -> list[DescuentoData]:
         """Obtiene todos los descuentos de un usuario."""
-        descuento_ids = cls._por_usuario.get(usuario_id, [])
-        descuentos = [cls._descuentos[did] for did in descuento_ids if did in cls._descuentos]
+        cls.purgar_expirados()
+        descuentos = [cls._descuentos[did] for did in cls._por_usuario.get(usuario_id, ())]
         
         if solo_activos:
-            ahora = datetime.utcnow()
-            return [
-                d for d in descuentos 
-                if d.activo and (d.fecha_expiracion is None or d.fecha_expiracion > ahora)
-            ]
+            return [d for d in descuentos if d.activo]
         return descuentos
 
+    @classmethod
+    def obtener_activo(cls, usuario_id: str, tipo: TipoDescuento) -> Optional[DescuentoData]:
+        """Obtiene el descuento activo de un tipo para un usuario."""
+        cls.purgar_expirados()
+        descuento_id = cls._activo_por_tipo.get((usuario_id, tipo))
+        return cls._descuentos.get(descuento_id) if descuento_id else None
+
     @classmethod
     def obtener_pendientes_por_email(cls, email: str) -> list[DescuentoData]:
         """Obtiene descuentos pendientes por email."""
-        descuento_ids = cls._pendientes_por_email.get(email, [])
-        return [cls._descuentos[did] for did in descuento_ids if did in cls._descuentos]
+        cls.purgar_expirados()
+        return [cls._descuentos[did] for did in cls._pendientes_por_email.get(email, ())]
+
+    @classmethod
+    def obtener_pendiente(cls, email: str, tipo: TipoDescuento) -> Optional[DescuentoData]:
+        """Obtiene el descuento pendiente de un tipo para un email."""
+        cls.purgar_expirados()
+        descuento_id = cls._pendiente_por_tipo.get((email, tipo))
+        return cls._descuentos.get(descuento_id) if descuento_id else None
 
     @classmethod
     def asignar_usuario(cls, descuento_id: str, usuario_id: str):
@@ -113,15 +157,124 @@ class AlmacenDescuentos:
         if not descuento: return
         
         # Remover de pendientes si estaba ahí
-        if 'email' in descuento.metadata:
-            email = descuento.metadata['email']
-            if email in cls._pendientes_por_email and descuento_id in cls._pendientes_por_email[email]:
-                cls._pendientes_por_email[email].remove(descuento_id)
+        cls._quitar_pendiente(descuento)
         
         # Asignar usuario
         descuento.usuario_id = usuario_id
         cls.guardar(descuento)
 
+    @classmethod
+    def desactivar(cls, descuento_id: str) -> bool:
+        """Desactiva un descuento y lo saca de los índices de activos y pendientes."""
+        descuento = cls._descuentos.get(descuento_id)
+        if not descuento or not descuento.activo:
+            return False
+        
+        descuento.activo = False
+        cls._quitar_pendiente(descuento)
+        cls._quitar_de_tipo(
+            cls._activo_por_tipo, cls._activos_de_tipo,
+            (descuento.usuario_id, descuento.tipo), descuento.id
+        )
+        cls._expiracion_programada.pop(descuento.id, None)
+        return True
+
+    @classmethod
+    def purgar_expirados(cls, ahora: Optional[datetime] = None) -> int:
+        """
+        Desactiva los descuentos cuya fecha de expiración ya pasó.
+
+        Solo mira la cima del heap, así que sin vencimientos cuesta O(1).
+        Las entradas de descuentos ya desactivados o reprogramados se
+        descartan al salir.
+
+        Returns:
+            Cantidad de descuentos desactivados
+        """
+        ahora = ahora or datetime.utcnow()
+        purgados = 0
+        while cls._expiraciones and cls._expiraciones[0][0] <= ahora:
+            fecha, descuento_id = heapq.heappop(cls._expiraciones)
+            if cls._expiracion_programada.get(descuento_id) == fecha and cls.desactivar(descuento_id):
+                descuento = cls._descuentos[descuento_id]
+                descuento.metadata['estado'] = 'expirado'
+                purgados += 1
+        return purgados
+
+    @classmethod
+    def estadisticas(cls) -> Dict[str, Any]:
+        """Totales de descuentos asignados a usuarios, por tipo."""
+        cls.purgar_expirados()
+        total = 0
+        activos = 0
+        por_tipo: Dict[str, Dict[str, int]] = {}
+        for descuento_ids in cls._por_usuario.values():
+            for descuento_id in descuento_ids:
+                descuento = cls._descuentos[descuento_id]
+                conteo = por_tipo.setdefault(descuento.tipo.value, {"total": 0, "activos": 0})
+                conteo["total"] += 1
+                total += 1
+                if descuento.activo:
+                    conteo["activos"] += 1
+                    activos += 1
+        
+        return {
+            "total_descuentos": total,
+            "descuentos_activos": activos,
+            "por_tipo": por_tipo,
+            "usuarios_con_descuento": len(cls._por_usuario),
+            "descuentos_pendientes_email": sum(1 for ids in cls._pendientes_por_email.values() if ids)
+        }
+
+    @classmethod
+    def limpiar(cls) -> None:
+        """Limpia todos los descuentos (para testing)."""
+        cls._descuentos.clear()
+        cls._por_usuario.clear()
+        cls._pendientes_por_email.clear()
+        cls._activo_por_tipo.clear()
+        cls._pendiente_por_tipo.clear()
+        cls._activos_de_tipo.clear()
+        cls._pendientes_de_tipo.clear()
+        cls._expiraciones.clear()
+        cls._expiracion_programada.clear()
+
+    @classmethod
+    def _quitar_pendiente(cls, descuento: DescuentoData) -> None:
+        email = descuento.metadata.get('email')
+        if email is None:
+            return
+        pendientes = cls._pendientes_por_email.get(email)
+        if pendientes is not None:
+            pendientes.discard(descuento.id)
+            if not pendientes:
+                del cls._pendientes_por_email[email]
+        cls._quitar_de_tipo(
+            cls._pendiente_por_tipo, cls._pendientes_de_tipo,
+            (email, descuento.tipo), descuento.id
+        )
+
+    @classmethod
+    def _quitar_de_tipo(
+        cls,
+        vigente: Dict[Tuple[str, TipoDescuento], str],
+        candidatos: Dict[Tuple[str, TipoDescuento], Set[str]],
+        clave: Tuple[str, TipoDescuento],
+        descuento_id: str
+    ) -> None:
+        """Saca el descuento de su tipo y, si era el vigente, elige el más antiguo que quede."""
+        ids = candidatos.get(clave)
+        if ids is not None:
+            ids.discard(descuento_id)
+            if not ids:
+                del candidatos[clave]
+        if vigente.get(clave) != descuento_id:
+            return
+        if ids:
+            vigente[clave] = min(ids, key=lambda did: cls._descuentos[did].fecha_aplicado)
+        else:
+            del vigente[clave]
+
 
 class ServicioDescuentos:
     """
@@ -148,18 +301,12 @@ class ServicioDescuentos:
         usuario_id_check = usuario_id or "PENDIENTE"
 
         # Verificar duplicados
-        descuentos_existentes = []
         if usuario_id:
-            descuentos_existentes = AlmacenDescuentos.obtener_por_usuario(usuario_id)
+            existente = AlmacenDescuentos.obtener_activo(usuario_id, TipoDescuento.ADOPCION_ANIMAL)
         else:
-            descuentos_existentes = AlmacenDescuentos.obtener_pendientes_por_email(usuario_email)
-
-        tiene_descuento_adopcion = any(
-            d.tipo == TipoDescuento.ADOPCION_ANIMAL 
-            for d in descuentos_existentes
-        )
+            existente = AlmacenDescuentos.obtener_pendiente(usuario_email, TipoDescuento.ADOPCION_ANIMAL)
         
-        if tiene_descuento_adopcion:
+        if existente:
             print(f"ℹ️ Usuario {usuario_id_check} ya tiene descuento por adopción")
             return {
                 "status": "already_applied",
@@ -202,25 +349,79 @@ class ServicioDescuentos:
 
     @staticmethod
     async def reclamar_descuentos_pendientes(email: str, usuario_id: str) -> dict:
-        """Asigna descuentos pendientes de un email a un usuario."""
+        """
+        Asigna descuentos pendientes de un email a un usuario.
+
+        Todos los reclamados se aplican a la suscripción en una sola
+        escritura (ver _aplicar_lote_a_suscripcion).
+        """
         pendientes = AlmacenDescuentos.obtener_pendientes_por_email(email)
-        reclamados = 0
+        reclamados: List[DescuentoData] = []
         
         for descuento in pendientes:
+            # El usuario ya tiene uno activo de este tipo: no se acumula
+            if AlmacenDescuentos.obtener_activo(usuario_id, descuento.tipo):
+                AlmacenDescuentos.desactivar(descuento.id)
+                descuento.metadata['estado'] = 'duplicado'
+                continue
             print(f"🔗 Asignando descuento {descuento.id} a usuario {usuario_id}")
             AlmacenDescuentos.asignar_usuario(descuento.id, usuario_id)
             descuento.metadata['estado'] = 'reclamado'
-            reclamados += 1
-            
-            # Intentar aplicar a suscripción si existe
-            await ServicioDescuentos._aplicar_a_suscripcion(usuario_id, descuento)
+            reclamados.append(descuento)
+        
+        # Intentar aplicar a suscripción si existe
+        resultado = {"aplicado": False}
+        if reclamados:
+            resultado = await ServicioDescuentos._aplicar_lote_a_suscripcion(usuario_id, reclamados)
             
         return {
             "usuario_id": usuario_id,
             "email": email,
-            "descuentos_reclamados": reclamados
+            "descuentos_reclamados": len(reclamados),
+            "aplicado_a_suscripcion": resultado.get("aplicado", False)
         }
 
+    @staticmethod
+    async def importar_adopcion(partner_id: str, registro: Dict[str, Any]) -> str:
+        """
+        Aplica el descuento de un registro de la exportación de adopciones
+        de un partner (carga retroactiva, ver /descuentos/importar).
+
+        El registro necesita el email del adoptante (usuario_email, email
+        o adopter_email) y pasa por aplicar_descuento_adopcion, así que los
+        duplicados y los pendientes se resuelven igual que en el webhook.
+
+        Args:
+            partner_id: ID del partner dueño de la exportación
+            registro: Registro de adopción ya verificado
+
+        Returns:
+            "aplicado", "pendiente" o "duplicado"
+
+        Raises:
+            ValueError: Si el registro no trae email
+        """
+        datos = registro.get("data") if isinstance(registro.get("data"), dict) else registro
+        email = datos.get("usuario_email") or datos.get("email") or datos.get("adopter_email")
+        if not email:
+            raise ValueError("usuario_email requerido")
+
+        resultado = await ServicioDescuentos.aplicar_descuento_adopcion(
+            usuario_email=email,
+            partner_id=partner_id,
+            metadata={
+                "animal_id": datos.get("animal_id"),
+                "animal_nombre": datos.get("animal_nombre") or datos.get("animal_name"),
+                "fecha_adopcion": datos.get("fecha_adopcion"),
+                "importado": True
+            }
+        )
+        if resultado.get("status") == "already_applied":
+            return "duplicado"
+        if resultado.get("estado") == "pendiente":
+            return "pendiente"
+        return "aplicado"
+
     @staticmethod
     async def _buscar_usuario_por_email(email: str) -> Optional[str]:
         """Busca un usuario por email."""
@@ -232,6 +433,21 @@ class ServicioDescuentos:
     @staticmethod
     async def _aplicar_a_suscripcion(usuario_id: str, descuento: DescuentoData) -> Dict[str, Any]:
         """Aplica el descuento a la suscripción del usuario."""
+        return await ServicioDescuentos._aplicar_lote_a_suscripcion(usuario_id, [descuento])
+    
+    @staticmethod
+    async def _aplicar_lote_a_suscripcion(
+        usuario_id: str,
+        descuentos: List[DescuentoData]
+    ) -> Dict[str, Any]:
+        """
+        Aplica varios descuentos a la suscripción del usuario con una sola
+        lectura y una sola escritura.
+
+        Los porcentajes se componen sobre el precio ya descontado (20% y
+        10% dan 28%, no 30%), igual que aplicarlos de a uno. Los descuentos
+        ya aplicados a esta suscripción se omiten.
+        """
         suscripcion = AlmacenSuscripciones.obtener_por_usuario(usuario_id)
         
         if not suscripcion:
@@ -240,14 +456,23 @@ class ServicioDescuentos:
         if suscripcion.estado not in [EstadoSuscripcion.ACTIVA, EstadoSuscripcion.PRUEBA]:
             return {"aplicado": False, "razon": "inactive_subscription"}
         
+        nuevos = [d for d in descuentos if suscripcion.id not in d.aplicado_a_suscripciones]
+        if not nuevos:
+            return {"aplicado": False, "razon": "already_applied"}
+        
+        factor = 1.0
+        for descuento in nuevos:
+            factor *= 1 - descuento.porcentaje / 100
+        
         precio_original = suscripcion.precio_mensual
-        precio_con_descuento = precio_original * (1 - descuento.porcentaje / 100)
+        precio_con_descuento = precio_original * factor
         
         suscripcion.precio_mensual = precio_con_descuento
         suscripcion.metadata = getattr(suscripcion, 'metadata', {})
         suscripcion.metadata['descuento_aplicado'] = {
-            'id': descuento.id,
-            'porcentaje': descuento.porcentaje,
+            'id': nuevos[-1].id,
+            'ids': [d.id for d in nuevos],
+            'porcentaje': round((1 - factor) * 100, 4),
             'precio_original': precio_original,
             'precio_con_descuento': precio_con_descuento
         }
@@ -255,11 +480,10 @@ class ServicioDescuentos:
         AlmacenSuscripciones.guardar(suscripcion)
         
         # Registrar
-        if suscripcion.id not in descuento.aplicado_a_suscripciones:
+        for descuento in nuevos:
             descuento.aplicado_a_suscripciones.append(suscripcion.id)
-            AlmacenDescuentos.guardar(descuento)
         
-        return {"aplicado": True}
+        return {"aplicado": True, "descuentos": len(nuevos)}
     
     @staticmethod
     async def obtener_descuentos_usuario(usuario_id: str) -> list[Dict[str, Any]]:
@@ -4,18 +4,39 @@ Envia eventos normalizados a n8n para orquestacion centralizada.
 """
 import httpx
 import os
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Set, Tuple
 import asyncio
+import time
 from datetime import datetime
 
 from app.webhooks.normalizador import EventoNormalizado
 from app.config import configuracion
+from app.registro import get_logger
+from app.metricas import metricas
+
+logger = get_logger("n8n")
+
+_latencia_envio = metricas.histograma(
+    "payment_n8n_envio_ms",
+    "Latencia de cada POST a n8n",
+    ("modo", "resultado")
+)
+_envios = metricas.contador(
+    "payment_n8n_envios_total",
+    "Envios a n8n tras agotar reintentos, por resultado",
+    ("modo", "resultado")
+)
 
 
 class N8NEventBusClient:
     """
     Cliente para enviar eventos al Event Bus de n8n.
     Implementa retry logic y fallback en caso de falla.
+    
+    Reutiliza un unico httpx.AsyncClient (pool de conexiones keep-alive) y,
+    con N8N_BATCH_HABILITADO, agrupa eventos en lotes que se envian como un
+    array JSON al alcanzar N8N_BATCH_TAMANIO o tras N8N_BATCH_ESPERA_MS.
+    Cada llamada a enviar_evento sigue recibiendo su propio resultado.
     """
     
     def __init__(self):
@@ -26,6 +47,41 @@ class N8NEventBusClient:
         self.timeout = float(os.getenv('N8N_TIMEOUT', '10.0'))
         self.max_retries = int(os.getenv('N8N_MAX_RETRIES', '3'))
         self.retry_delay = float(os.getenv('N8N_RETRY_DELAY', '2.0'))
+        
+        # Pool de conexiones
+        self.max_conexiones = int(os.getenv('N8N_MAX_CONEXIONES', '20'))
+        self._client: Optional[httpx.AsyncClient] = None
+        
+        # Envio por lotes
+        self.batch_habilitado = os.getenv('N8N_BATCH_HABILITADO', 'false').lower() == 'true'
+        self.batch_url = os.getenv('N8N_BATCH_WEBHOOK_URL') or self.webhook_url  # vacia = la misma URL
+        self.batch_tamanio = int(os.getenv('N8N_BATCH_TAMANIO', '100'))
+        self.batch_espera = float(os.getenv('N8N_BATCH_ESPERA_MS', '50')) / 1000
+        self._lote: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._temporizador: Optional[asyncio.TimerHandle] = None
+        self._envios_lote: Set[asyncio.Task] = set()
+    
+    def _obtener_client(self) -> httpx.AsyncClient:
+        """Obtiene el cliente HTTP compartido, creandolo si es necesario."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_conexiones,
+                    max_keepalive_connections=self.max_conexiones
+                )
+            )
+        return self._client
+    
+    async def cerrar(self) -> None:
+        """Envia los lotes pendientes y cierra el pool de conexiones."""
+        if self._lote:
+            self._despachar_lote()
+        if self._envios_lote:
+            await asyncio.gather(*self._envios_lote, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
     async def enviar_evento(
         self,
@@ -52,41 +108,126 @@ class N8NEventBusClient:
         if partner_signature:
             payload["partner_signature"] = partner_signature
         
-        # Intentar enviar con retries
+        if self.batch_habilitado:
+            return await self._encolar_en_lote(payload)
+        
+        exitoso = await self._post_con_reintentos(
+            self.webhook_url,
+            payload,
+            headers={
+                'Content-Type': 'application/json',
+                'X-Event-Source': 'payment-service',
+                'X-Event-Type': evento.event_type.value,
+                'X-Provider': evento.pasarela
+            }
+        )
+        if exitoso:
+            logger.debug("Evento enviado a n8n: %s", evento.event_type.value)
+        return exitoso
+    
+    async def _post_con_reintentos(
+        self,
+        url: str,
+        contenido: Any,
+        headers: Dict[str, str],
+        modo: str = "evento"
+    ) -> bool:
+        """
+        Hace POST a n8n reutilizando el pool, con reintentos y backoff lineal.
+        
+        Returns:
+            True si n8n respondio 200/201/202
+        """
+        client = self._obtener_client()
+        
         for intento in range(self.max_retries):
+            inicio = time.perf_counter()
+            resultado = "error"
             try:
-                async with httpx.AsyncClient(timeout=self.timeout) as client:
-                    response = await client.post(
-                        self.webhook_url,
-                        json=payload,
-                        headers={
-                            'Content-Type': 'application/json',
-                            'X-Event-Source': 'payment-service',
-                            'X-Event-Type': evento.event_type.value,
-                            'X-Provider': evento.provider
-                        }
+                response = await client.post(url, json=contenido, headers=headers)
+                
+                if response.status_code in [200, 201, 202]:
+                    resultado = "exitoso"
+                    _envios.etiquetas(modo, "exitoso").incrementar()
+                    return True
+                else:
+                    resultado = "rechazado"
+                    logger.warning(
+                        "n8n respondió con status %s", response.status_code,
+                        extra={"status": response.status_code, "respuesta": response.text[:500]}
                     )
                     
-                    if response.status_code in [200, 201, 202]:
-                        print(f"✅ Evento enviado a n8n: {evento.event_type.value} - {evento.payment_id}")
-                        return True
-                    else:
-                        print(f"⚠️ n8n respondió con status {response.status_code}: {response.text}")
-                        
             except httpx.TimeoutException:
-                print(f"⏱️ Timeout enviando a n8n (intento {intento + 1}/{self.max_retries})")
+                logger.warning("Timeout enviando a n8n (intento %d/%d)", intento + 1, self.max_retries)
             except httpx.ConnectError:
-                print(f"🔌 Error de conexión con n8n (intento {intento + 1}/{self.max_retries})")
+                logger.warning("Error de conexión con n8n (intento %d/%d)", intento + 1, self.max_retries)
             except Exception as e:
-                print(f"❌ Error inesperado enviando a n8n: {e}")
+                logger.exception("Error inesperado enviando a n8n: %s", e)
+            finally:
+                _latencia_envio.etiquetas(modo, resultado).observar((time.perf_counter() - inicio) * 1000)
             
             # Esperar antes de reintentar
             if intento < self.max_retries - 1:
                 await asyncio.sleep(self.retry_delay * (intento + 1))
         
-        print(f"🚨 Falló envío a n8n después de {self.max_retries} intentos")
+        logger.error("Falló envío a n8n después de %d intentos", self.max_retries)
+        _envios.etiquetas(modo, "fallido").incrementar()
         return False
     
+    async def _encolar_en_lote(self, payload: Dict[str, Any]) -> bool:
+        """
+        Agrega un evento al lote actual y espera el resultado de su envio.
+        """
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        self._lote.append((payload, futuro))
+        
+        if len(self._lote) >= self.batch_tamanio:
+            self._despachar_lote()
+        elif self._temporizador is None:
+            self._temporizador = loop.call_later(self.batch_espera, self._despachar_lote)
+        
+        return await futuro
+    
+    def _despachar_lote(self) -> None:
+        """Toma el lote acumulado y lo envia en segundo plano."""
+        if self._temporizador is not None:
+            self._temporizador.cancel()
+            self._temporizador = None
+        
+        lote, self._lote = self._lote, []
+        if not lote:
+            return
+        
+        tarea = asyncio.ensure_future(self._enviar_lote(lote))
+        self._envios_lote.add(tarea)
+        tarea.add_done_callback(self._envios_lote.discard)
+    
+    async def _enviar_lote(self, lote: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        """Envia un lote como array JSON y resuelve el resultado de cada evento."""
+        try:
+            exitoso = await self._post_con_reintentos(
+                self.batch_url,
+                [payload for payload, _ in lote],
+                headers={
+                    'Content-Type': 'application/json',
+                    'X-Event-Source': 'payment-service',
+                    'X-Event-Type': 'batch',
+                    'X-Batch-Size': str(len(lote))
+                },
+                modo="lote"
+            )
+        except Exception as e:
+            logger.exception("Error inesperado enviando lote a n8n: %s", e)
+            exitoso = False
+        
+        if exitoso:
+            logger.debug("Lote de %d eventos enviado a n8n", len(lote))
+        
+        for _, futuro in lote:
+            if not futuro.done():
+                futuro.set_result(exitoso)
+    
     async def enviar_evento_con_fallback(
         self,
         evento: EventoNormalizado,
@@ -105,12 +246,12 @@ class N8NEventBusClient:
         success = await self.enviar_evento(evento)
         
         if not success and fallback_callback:
-            print(f"🔄 Ejecutando fallback para {evento.event_type.value}")
+            logger.info("Ejecutando fallback para %s", evento.event_type.value)
             try:
                 await fallback_callback(evento)
                 return True
             except Exception as e:
-                print(f"❌ Error en fallback: {e}")
+                logger.exception("Error en fallback: %s", e)
                 return False
         
         return success
@@ -123,11 +264,10 @@ class N8NEventBusClient:
             True si n8n responde, False en caso contrario
         """
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                # Intentar hacer un health check al endpoint de n8n
-                health_url = self.webhook_url.replace('/webhook/payment-webhook', '/healthz')
-                response = await client.get(health_url)
-                return response.status_code == 200
+            # Intentar hacer un health check al endpoint de n8n
+            health_url = self.webhook_url.replace('/webhook/payment-webhook', '/healthz')
+            response = await self._obtener_client().get(health_url, timeout=5.0)
+            return response.status_code == 200
         except:
             return False
 
@@ -17,9 +17,17 @@ from app.modelos.suscripcion import (
     VerificarPremiumResponse
 )
 from app.adaptador import obtener_adaptador
+from app.adaptador.enrutador import AdaptadorEnrutado
 from app.config import configuracion
 from app.partners.servicio import ServicioPartners
 from app.modelos.partner import TipoEvento
+from app.registro import correlacion, get_logger
+
+logger = get_logger("suscripciones")
+
+
+class ErrorPasarela(Exception):
+    """La pasarela de pago rechazo o no confirmo la operacion."""
 
 
 class SuscripcionData:
@@ -174,6 +182,7 @@ class ServicioSuscripciones:
         
         # Crear en pasarela de pago si no es prueba
         id_externo = None
+        pasarela = None
         if not request.con_prueba_gratis:
             adaptador = obtener_adaptador()
             resultado = await adaptador.crear_suscripcion(
@@ -184,6 +193,7 @@ class ServicioSuscripciones:
             )
             if resultado.exitoso:
                 id_externo = resultado.id_externo
+                pasarela = resultado.metadatos.get("pasarela", adaptador.nombre)
         
         # Crear suscripcion
         suscripcion = SuscripcionData(
@@ -197,7 +207,10 @@ class ServicioSuscripciones:
             dias_prueba_restantes=dias_prueba,
             id_suscripcion_externa=id_externo,
             email=request.email,  # Guardar email para descuentos
-            metadata={"email": request.email} if request.email else {}
+            metadata={
+                **({"email": request.email} if request.email else {}),
+                **({"pasarela": pasarela} if pasarela else {})
+            }
         )
         
         AlmacenSuscripciones.guardar(suscripcion)
@@ -275,18 +288,32 @@ class ServicioSuscripciones:
     async def cancelar_suscripcion(
         request: CancelarSuscripcionRequest
     ) -> Optional[SuscripcionResponse]:
-        """Cancela una suscripcion."""
+        """
+        Cancela una suscripcion.
+        
+        Raises:
+            ErrorPasarela: Si la pasarela no confirma la cancelacion; la
+                suscripcion queda como estaba
+        """
         suscripcion = AlmacenSuscripciones.obtener(request.suscripcion_id)
         if not suscripcion:
             return None
         
-        # Cancelar en pasarela
+        # Cancelar en pasarela (con el enrutador, en la que la creo)
         if suscripcion.id_suscripcion_externa:
             adaptador = obtener_adaptador()
-            await adaptador.cancelar_suscripcion(
+            if isinstance(adaptador, AdaptadorEnrutado):
+                adaptador.recordar_origen(
+                    suscripcion.id_suscripcion_externa, suscripcion.metadata.get("pasarela")
+                )
+            resultado = await adaptador.cancelar_suscripcion(
                 suscripcion.id_suscripcion_externa,
                 inmediatamente=request.cancelar_inmediatamente
             )
+            if not resultado.exitoso:
+                raise ErrorPasarela(
+                    f"La pasarela no cancelo la suscripcion: {resultado.error or 'error desconocido'}"
+                )
         
         # Actualizar estado
         if request.cancelar_inmediatamente:
@@ -365,41 +392,35 @@ class ServicioSuscripciones:
             True si se actualizo correctamente
         """
         url = f"{configuracion.REST_API_URL}/api/usuarios/{usuario_id}/premium"
-        print(f"[PREMIUM] Iniciando actualizacion de usuario premium")
-        print(f"[PREMIUM] URL destino: {url}")
-        print(f"[PREMIUM] Usuario ID: {usuario_id}")
-        print(f"[PREMIUM] Nuevo estado premium: {es_premium}")
         
-        try:
-            async with httpx.AsyncClient(timeout=30) as cliente:
-                respuesta = await cliente.patch(
-                    url,
-                    json={"es_premium": es_premium}
-                )
-                
-                print(f"[PREMIUM] Respuesta recibida - Status: {respuesta.status_code}")
-                print(f"[PREMIUM] Respuesta body: {respuesta.text}")
-                
-                if respuesta.status_code in [200, 204]:
-                    print(f"[PREMIUM] Usuario {usuario_id} actualizado exitosamente a premium={es_premium}")
-                    return True
-                else:
-                    print(f"[PREMIUM] ERROR: Status code inesperado: {respuesta.status_code}")
-                    print(f"[PREMIUM] ERROR: Response: {respuesta.text}")
-                    return False
+        with correlacion(usuario_id):
+            logger.debug("Actualizando usuario premium=%s", es_premium, extra={"url": url})
+            try:
+                async with httpx.AsyncClient(timeout=30) as cliente:
+                    respuesta = await cliente.patch(
+                        url,
+                        json={"es_premium": es_premium}
+                    )
                     
-        except httpx.ConnectError as e:
-            print(f"[PREMIUM] ERROR DE CONEXION: No se pudo conectar al servicio REST")
-            print(f"[PREMIUM] URL intentada: {url}")
-            print(f"[PREMIUM] Detalles: {e}")
-            return False
-        except httpx.TimeoutException as e:
-            print(f"[PREMIUM] ERROR DE TIMEOUT: La solicitud excedio el tiempo limite")
-            print(f"[PREMIUM] Detalles: {e}")
-            return False
-        except Exception as e:
-            print(f"[PREMIUM] ERROR INESPERADO: {type(e).__name__}: {e}")
-            return False
+                    if respuesta.status_code in [200, 204]:
+                        logger.info("Usuario actualizado a premium=%s", es_premium)
+                        return True
+                    else:
+                        logger.error(
+                            "Status code inesperado del servicio REST: %s", respuesta.status_code,
+                            extra={"url": url, "respuesta": respuesta.text[:500]}
+                        )
+                        return False
+                        
+            except httpx.ConnectError as e:
+                logger.error("No se pudo conectar al servicio REST: %s", e, extra={"url": url})
+                return False
+            except httpx.TimeoutException as e:
+                logger.error("Timeout actualizando usuario premium: %s", e, extra={"url": url})
+                return False
+            except Exception as e:
+                logger.exception("Error inesperado actualizando usuario premium: %s", e)
+                return False
     
     @staticmethod
     def _to_response(suscripcion: SuscripcionData) -> SuscripcionResponse:
@@ -3,8 +3,11 @@ Modulo de webhooks y procesamiento de eventos.
 """
 from app.webhooks.procesador import ProcesadorWebhooks
 from app.webhooks.normalizador import NormalizadorWebhooks
+from app.webhooks.cola_ingesta import ColaIngestaWebhooks, get_cola_ingesta
 
 __all__ = [
     "ProcesadorWebhooks",
-    "NormalizadorWebhooks"
+    "NormalizadorWebhooks",
+    "ColaIngestaWebhooks",
+    "get_cola_ingesta"
 ]
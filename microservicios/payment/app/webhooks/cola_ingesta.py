@@ -0,0 +1,399 @@
+"""
+Cola local de ingesta para webhooks de pasarelas.
+
+Permite responder 2xx a la pasarela apenas el webhook fue verificado y
+normalizado. El reenvio a n8n (con sus reintentos) lo hace un pool de
+workers que drena la cola en segundo plano.
+
+Si se configura WEBHOOK_COLA_DIRECTORIO, cada evento se escribe en un
+journal append-only antes de confirmarse, y los eventos no confirmados
+se reencolan al reiniciar el servicio. Un evento solo se confirma cuando
+su procesamiento termino bien; si fallo se mueve a fallidos.jsonl (dead
+letter) y si un worker se cancela en pleno proceso queda pendiente. El
+journal se compacta tambien en marcha, cada COMPACTAR_CADA confirmaciones,
+escribiendo el archivo nuevo en un hilo.
+
+Durabilidad de cada evento aceptado: por defecto el append solo hace
+flush al sistema operativo, asi que sobrevive a una caida del proceso
+pero no a una del host. Con WEBHOOK_COLA_FSYNC=true la respuesta espera
+ademas un fsync del journal (en un hilo; los webhooks concurrentes
+comparten el mismo fsync).
+"""
+import asyncio
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from app.config import configuracion
+from app.webhooks.normalizador import EventoNormalizado
+from app.registro import get_logger
+from app.metricas import metricas, formatear_familia
+
+logger = get_logger("webhooks.cola")
+
+_espera_ingesta = metricas.histograma(
+    "payment_ingesta_espera_ms",
+    "Tiempo entre encolar un webhook y que un worker lo tome"
+)
+
+
+class ColaIngestaWebhooks:
+    """
+    Cola acotada con pool de workers para procesar eventos normalizados.
+    """
+
+    ARCHIVO_PENDIENTES = "pendientes.jsonl"
+    ARCHIVO_CONFIRMADOS = "confirmados.log"
+    ARCHIVO_FALLIDOS = "fallidos.jsonl"
+    COMPACTAR_CADA = 1000
+
+    def __init__(self):
+        self.capacidad = configuracion.WEBHOOK_COLA_CAPACIDAD
+        self.num_workers = configuracion.WEBHOOK_COLA_WORKERS
+        self.directorio = configuracion.WEBHOOK_COLA_DIRECTORIO
+        self.fsync = configuracion.WEBHOOK_COLA_FSYNC
+
+        self._cola: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._procesar: Optional[Callable[[EventoNormalizado], Awaitable[Any]]] = None
+        self._secuencia = 0
+        self._en_proceso = 0
+
+        # Journal en disco (opcional)
+        self._journal = None
+        self._confirmados = None
+        self._fallidos_dlq = None
+        self._sin_confirmar: Dict[int, str] = {}  # secuencia -> linea del journal
+        self._confirmados_desde_compactar = 0
+        self._compactacion: Optional[asyncio.Task] = None
+        self._disco: Optional[asyncio.Lock] = None  # fsync y compactacion no se pisan
+        self._fsync_en_curso: Optional[asyncio.Future] = None
+        self._escritos = 0  # lineas agregadas al journal
+        self._sincronizados = 0  # lineas cubiertas por el ultimo fsync
+
+        # Metricas de backpressure
+        self._encolados = 0
+        self._procesados = 0
+        self._fallidos = 0
+        self._rechazados = 0
+        self._reencolados_al_iniciar = 0
+        self._profundidad_maxima = 0
+        self._espera_total_ms = 0.0
+        self._espera_maxima_ms = 0.0
+
+    @property
+    def activa(self) -> bool:
+        """Indica si los workers estan corriendo."""
+        return bool(self._workers)
+
+    async def iniciar(
+        self,
+        procesar: Callable[[EventoNormalizado], Awaitable[Any]]
+    ) -> None:
+        """
+        Arranca el pool de workers.
+
+        Args:
+            procesar: Funcion async que procesa cada evento de la cola
+        """
+        if self.activa:
+            return
+
+        self._procesar = procesar
+        self._disco = asyncio.Lock()
+        pendientes = self._abrir_journal() if self.directorio else []
+
+        # Nunca descartar lo que sobrevivio a un reinicio
+        self._cola = asyncio.Queue(maxsize=max(self.capacidad, len(pendientes)))
+        for secuencia, evento in pendientes:
+            self._cola.put_nowait((secuencia, evento, time.monotonic()))
+        self._reencolados_al_iniciar = len(pendientes)
+
+        self._workers = [
+            asyncio.create_task(self._worker(i))
+            for i in range(self.num_workers)
+        ]
+
+    async def detener(self, timeout: float = 10.0) -> None:
+        """
+        Detiene los workers esperando (hasta timeout) a que la cola se vacie.
+        Los eventos que queden, incluido el que un worker estuviera
+        procesando al cancelarse, quedan en el journal para el proximo arranque.
+        """
+        if not self.activa:
+            return
+
+        try:
+            await asyncio.wait_for(self._cola.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._compactacion is not None:
+            await self._compactacion
+
+        if self._journal:
+            self._journal.close()
+            self._confirmados.close()
+            self._fallidos_dlq.close()
+            self._journal = None
+            self._confirmados = None
+            self._fallidos_dlq = None
+
+    def encolar(self, evento: EventoNormalizado) -> bool:
+        """
+        Agrega un evento a la cola sin bloquear.
+
+        Args:
+            evento: Evento normalizado
+
+        Returns:
+            True si se encolo, False si la cola no esta activa o esta llena
+        """
+        if not self.activa or self._cola.full():
+            self._rechazados += 1
+            return False
+
+        self._secuencia += 1
+        secuencia = self._secuencia
+
+        if self._journal:
+            registro = {"seq": secuencia, "evento": evento.to_dict()}
+            linea = json.dumps(registro, separators=(",", ":")) + "\n"
+            self._journal.write(linea)
+            self._journal.flush()
+            self._escritos += 1
+            self._sin_confirmar[secuencia] = linea
+
+        self._cola.put_nowait((secuencia, evento, time.monotonic()))
+        self._encolados += 1
+
+        profundidad = self._cola.qsize()
+        if profundidad > self._profundidad_maxima:
+            self._profundidad_maxima = profundidad
+
+        return True
+
+    async def asegurar_en_disco(self) -> None:
+        """
+        Con WEBHOOK_COLA_FSYNC, espera a que lo encolado hasta ahora este en
+        disco. El fsync corre en un hilo y cubre a todos los que esperan.
+        """
+        if not (self._journal and self.fsync):
+            return
+        objetivo = self._escritos
+        while self._sincronizados < objetivo:
+            if self._fsync_en_curso is None:
+                self._fsync_en_curso = asyncio.ensure_future(self._sincronizar())
+            await asyncio.shield(self._fsync_en_curso)
+
+    async def _sincronizar(self) -> None:
+        try:
+            async with self._disco:
+                if self._journal is None:
+                    return
+                cubiertos = self._escritos
+                await asyncio.to_thread(os.fsync, self._journal.fileno())
+                self._sincronizados = cubiertos
+        finally:
+            self._fsync_en_curso = None
+
+    async def _worker(self, numero: int) -> None:
+        """Drena la cola procesando un evento a la vez."""
+        while True:
+            secuencia, evento, encolado_en = await self._cola.get()
+            espera_ms = (time.monotonic() - encolado_en) * 1000
+            _espera_ingesta.etiquetas().observar(espera_ms)
+            self._espera_total_ms += espera_ms
+            if espera_ms > self._espera_maxima_ms:
+                self._espera_maxima_ms = espera_ms
+
+            self._en_proceso += 1
+            try:
+                await self._procesar(evento)
+                self._procesados += 1
+                self._confirmar(secuencia)
+            except asyncio.CancelledError:
+                # Sin confirmar: se reencola en el proximo arranque
+                raise
+            except Exception as e:
+                self._fallidos += 1
+                logger.exception(
+                    "Worker %d fallo procesando evento: %s", numero, e,
+                    extra={"correlacion_id": evento.payment_id}
+                )
+                self._mover_a_fallidos(secuencia, e)
+            finally:
+                self._en_proceso -= 1
+                self._cola.task_done()
+
+    def _confirmar(self, secuencia: int) -> None:
+        """Marca un evento como procesado en el journal."""
+        if not self._confirmados:
+            return
+        self._confirmados.write(f"{secuencia}\n")
+        self._confirmados.flush()
+        self._sin_confirmar.pop(secuencia, None)
+        self._confirmados_desde_compactar += 1
+        if self._confirmados_desde_compactar >= self.COMPACTAR_CADA and self._compactacion is None:
+            self._compactacion = asyncio.create_task(self._compactar())
+
+    def _mover_a_fallidos(self, secuencia: int, error: Exception) -> None:
+        """Guarda el evento fallido en el dead letter y lo saca del journal."""
+        if not self._fallidos_dlq:
+            return
+        linea = self._sin_confirmar.get(secuencia)
+        if linea is None:
+            return
+        registro = json.loads(linea)
+        registro["error"] = str(error)
+        registro["fallido_en"] = time.time()
+        self._fallidos_dlq.write(json.dumps(registro, separators=(",", ":")) + "\n")
+        self._fallidos_dlq.flush()
+        self._confirmar(secuencia)
+
+    async def _compactar(self) -> None:
+        """
+        Reescribe el journal con solo los eventos sin confirmar.
+
+        El archivo nuevo se escribe y sincroniza en un hilo a partir de una
+        foto de los pendientes; lo que se encola o confirma mientras tanto
+        se aplica al volver al event loop, antes de reemplazar el journal.
+        """
+        ruta_pendientes = os.path.join(self.directorio, self.ARCHIVO_PENDIENTES)
+        ruta_confirmados = os.path.join(self.directorio, self.ARCHIVO_CONFIRMADOS)
+        temporal = ruta_pendientes + ".tmp"
+        try:
+            async with self._disco:
+                foto = dict(self._sin_confirmar)
+                self._confirmados_desde_compactar = 0
+                await asyncio.to_thread(self._escribir_sincronizado, temporal, list(foto.values()))
+                if self._journal is None:
+                    return
+
+                # De vuelta en el loop: sin awaits hasta terminar el reemplazo
+                ultima = max(foto, default=0)
+                nuevas = [linea for seq, linea in self._sin_confirmar.items() if seq > ultima]
+                confirmadas = [seq for seq in foto if seq not in self._sin_confirmar]
+                with open(temporal, "a", encoding="utf-8") as archivo:
+                    archivo.writelines(nuevas)
+                self._journal.close()
+                os.replace(temporal, ruta_pendientes)
+                self._journal = open(ruta_pendientes, "a", encoding="utf-8")
+                # Solo hace falta recordar lo confirmado que sigue en el journal nuevo
+                self._confirmados.close()
+                self._confirmados = open(ruta_confirmados, "w", encoding="utf-8")
+                self._confirmados.writelines(f"{seq}\n" for seq in confirmadas)
+                self._confirmados.flush()
+        except Exception:
+            logger.exception("Error compactando el journal de ingesta")
+        finally:
+            self._compactacion = None
+
+    @staticmethod
+    def _escribir_sincronizado(ruta: str, lineas: List[str]) -> None:
+        with open(ruta, "w", encoding="utf-8") as archivo:
+            archivo.writelines(lineas)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+
+    def _abrir_journal(self) -> List[tuple]:
+        """
+        Lee el journal existente, compacta los eventos pendientes y lo reabre
+        en modo append.
+
+        Returns:
+            Lista de (secuencia, evento) que no fueron confirmados
+        """
+        os.makedirs(self.directorio, exist_ok=True)
+        ruta_pendientes = os.path.join(self.directorio, self.ARCHIVO_PENDIENTES)
+        ruta_confirmados = os.path.join(self.directorio, self.ARCHIVO_CONFIRMADOS)
+
+        confirmados: Set[int] = set()
+        if os.path.exists(ruta_confirmados):
+            with open(ruta_confirmados, "r", encoding="utf-8") as archivo:
+                confirmados = {int(linea) for linea in archivo if linea.strip()}
+
+        pendientes = []
+        if os.path.exists(ruta_pendientes):
+            with open(ruta_pendientes, "r", encoding="utf-8") as archivo:
+                for linea in archivo:
+                    try:
+                        registro = json.loads(linea)
+                    except json.JSONDecodeError:
+                        continue  # Linea truncada por una caida
+                    if registro["seq"] in confirmados:
+                        continue
+                    pendientes.append(registro)
+
+        # Renumerar y reescribir solo lo pendiente
+        eventos = []
+        with open(ruta_pendientes, "w", encoding="utf-8") as archivo:
+            for registro in pendientes:
+                self._secuencia += 1
+                registro["seq"] = self._secuencia
+                linea = json.dumps(registro, separators=(",", ":")) + "\n"
+                archivo.write(linea)
+                self._sin_confirmar[self._secuencia] = linea
+                eventos.append((self._secuencia, EventoNormalizado.from_dict(registro["evento"])))
+        open(ruta_confirmados, "w").close()
+
+        self._journal = open(ruta_pendientes, "a", encoding="utf-8")
+        self._confirmados = open(ruta_confirmados, "a", encoding="utf-8")
+        self._fallidos_dlq = open(
+            os.path.join(self.directorio, self.ARCHIVO_FALLIDOS), "a", encoding="utf-8"
+        )
+        return eventos
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Metricas de la cola para monitoreo de backpressure."""
+        profundidad = self._cola.qsize() if self._cola else 0
+        atendidos = self._procesados + self._fallidos
+        return {
+            "activa": self.activa,
+            "workers": len(self._workers),
+            "capacidad": self.capacidad,
+            "profundidad": profundidad,
+            "profundidad_maxima": self._profundidad_maxima,
+            "ocupacion": round(profundidad / self.capacidad, 4) if self.capacidad else 0,
+            "en_proceso": self._en_proceso,
+            "encolados": self._encolados,
+            "procesados": self._procesados,
+            "fallidos": self._fallidos,
+            "rechazados": self._rechazados,
+            "reencolados_al_iniciar": self._reencolados_al_iniciar,
+            "espera_promedio_ms": round(self._espera_total_ms / atendidos, 2) if atendidos else 0.0,
+            "espera_maxima_ms": round(self._espera_maxima_ms, 2),
+            "journal": bool(self._journal)
+        }
+
+
+    def metricas_prometheus(self) -> List[str]:
+        """Estado de la cola en formato Prometheus (desde estadisticas)."""
+        stats = self.estadisticas()
+        lineas: List[str] = []
+        for nombre, ayuda, tipo, clave in (
+            ("payment_ingesta_profundidad", "Eventos esperando en la cola de ingesta", "gauge", "profundidad"),
+            ("payment_ingesta_en_proceso", "Eventos siendo procesados por workers", "gauge", "en_proceso"),
+            ("payment_ingesta_encolados_total", "Eventos aceptados por la cola", "counter", "encolados"),
+            ("payment_ingesta_procesados_total", "Eventos procesados sin error", "counter", "procesados"),
+            ("payment_ingesta_fallidos_total", "Eventos cuyo procesamiento fallo", "counter", "fallidos"),
+            ("payment_ingesta_rechazados_total", "Eventos rechazados por cola llena", "counter", "rechazados"),
+        ):
+            lineas += formatear_familia(nombre, ayuda, tipo, (), [((), stats[clave])])
+        return lineas
+
+
+# Singleton global
+_cola_ingesta = None
+
+def get_cola_ingesta() -> ColaIngestaWebhooks:
+    """Obtiene la instancia singleton de la cola de ingesta."""
+    global _cola_ingesta
+    if _cola_ingesta is None:
+        _cola_ingesta = ColaIngestaWebhooks()
+    return _cola_ingesta
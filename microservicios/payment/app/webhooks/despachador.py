@@ -0,0 +1,165 @@
+"""
+Motor de despacho de handlers locales de webhooks.
+
+Ejecuta los handlers de un evento de forma concurrente y aislada: cada
+handler tiene su propio timeout y semaforo, un handler lento o con error
+no afecta a los demas, y los handlers sincronos pesados pueden correr en
+un pool de hilos.
+"""
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config import configuracion
+from app.metricas import Histograma
+from app.registro import get_logger
+
+logger = get_logger("webhooks.handlers")
+
+
+@dataclass
+class HandlerRegistrado:
+    """Handler con su configuracion de ejecucion."""
+    handler: Callable
+    nombre: str
+    timeout: float
+    semaforo: asyncio.Semaphore
+    en_hilo: bool = False
+    latencia_ms: Histograma = field(default_factory=Histograma)
+    exitosos: int = 0
+    fallidos: int = 0
+    timeouts: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "nombre": self.nombre,
+            "timeout": self.timeout,
+            "en_hilo": self.en_hilo,
+            "exitosos": self.exitosos,
+            "fallidos": self.fallidos,
+            "timeouts": self.timeouts,
+            "latencia_ms": self.latencia_ms.to_dict()
+        }
+
+
+class DespachadorHandlers:
+    """
+    Registro de handlers por tipo de evento y ejecucion concurrente.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[Any, List[HandlerRegistrado]] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def registrar(
+        self,
+        evento: Any,
+        handler: Callable,
+        timeout: Optional[float] = None,
+        max_concurrencia: Optional[int] = None,
+        en_hilo: bool = False
+    ) -> None:
+        """
+        Registra un handler para un tipo de evento.
+
+        Args:
+            evento: Tipo de evento
+            handler: Funcion sync o async que recibe el evento
+            timeout: Segundos maximos por ejecucion (default HANDLER_TIMEOUT)
+            max_concurrencia: Ejecuciones simultaneas permitidas del handler
+            en_hilo: Ejecutar un handler sincrono en el pool de hilos
+        """
+        registro = HandlerRegistrado(
+            handler=handler,
+            nombre=getattr(handler, "__name__", repr(handler)),
+            timeout=timeout or configuracion.HANDLER_TIMEOUT,
+            semaforo=asyncio.Semaphore(max_concurrencia or configuracion.HANDLER_MAX_CONCURRENCIA),
+            en_hilo=en_hilo and not asyncio.iscoroutinefunction(handler)
+        )
+        self._handlers.setdefault(evento, []).append(registro)
+
+    def obtener(self, evento: Any) -> List[HandlerRegistrado]:
+        """Handlers registrados para un tipo de evento."""
+        return self._handlers.get(evento, [])
+
+    async def despachar(self, evento: Any, datos: Any) -> Dict[str, int]:
+        """
+        Ejecuta concurrentemente todos los handlers del evento.
+
+        Args:
+            evento: Tipo de evento (clave de registro)
+            datos: Objeto que recibe cada handler
+
+        Returns:
+            Conteo de handlers exitosos y fallidos
+        """
+        registros = self._handlers.get(evento, [])
+        if not registros:
+            return {"exitosos": 0, "fallidos": 0}
+
+        resultados = await asyncio.gather(*[
+            self._ejecutar(registro, datos) for registro in registros
+        ])
+        exitosos = sum(1 for r in resultados if r)
+        return {"exitosos": exitosos, "fallidos": len(resultados) - exitosos}
+
+    async def _ejecutar(self, registro: HandlerRegistrado, datos: Any) -> bool:
+        """Ejecuta un handler aislado con su semaforo y timeout."""
+        async with registro.semaforo:
+            inicio = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._invocar(registro, datos), timeout=registro.timeout)
+                registro.exitosos += 1
+                return True
+            except asyncio.TimeoutError:
+                registro.timeouts += 1
+                logger.warning("Handler %s excedio %ss", registro.nombre, registro.timeout)
+                return False
+            except Exception as e:
+                registro.fallidos += 1
+                logger.exception("Error en handler %s: %s", registro.nombre, e)
+                return False
+            finally:
+                registro.latencia_ms.observar((time.perf_counter() - inicio) * 1000)
+
+    async def _invocar(self, registro: HandlerRegistrado, datos: Any) -> Any:
+        """Llama al handler segun su tipo."""
+        if asyncio.iscoroutinefunction(registro.handler):
+            return await registro.handler(datos)
+        if registro.en_hilo:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._obtener_executor(),
+                functools.partial(registro.handler, datos)
+            )
+        return registro.handler(datos)
+
+    def _obtener_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=configuracion.HANDLER_HILOS,
+                thread_name_prefix="webhook-handler"
+            )
+        return self._executor
+
+    def registros(self) -> List[Tuple[str, HandlerRegistrado]]:
+        """Pares (evento, handler registrado) de todos los eventos."""
+        return [
+            (getattr(evento, "value", str(evento)), registro)
+            for evento, registros in self._handlers.items()
+            for registro in registros
+        ]
+
+    def limpiar(self) -> None:
+        """Elimina todos los handlers registrados."""
+        self._handlers.clear()
+
+    def estadisticas(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Metricas por handler agrupadas por evento."""
+        return {
+            getattr(evento, "value", str(evento)): [r.to_dict() for r in registros]
+            for evento, registros in self._handlers.items()
+        }
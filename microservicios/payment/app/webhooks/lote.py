@@ -0,0 +1,202 @@
+"""
+Importacion de eventos de partners por lotes (NDJSON en streaming).
+
+El body se lee linea a linea (app.ndjson) y cada evento verificado se
+procesa en una tarea, con un maximo de tareas en vuelo: si se llena, la
+lectura del body espera, asi un envio de 100k eventos usa memoria
+acotada.
+
+Hay dos modos de firma. En ambos el mensaje firmado empieza con
+"<X-Webhook-Timestamp>.", igual que en los webhooks individuales.
+
+- registro: cada linea es {"payload": "<evento como string JSON>",
+  "firma": "<hex>"} y la firma cubre los bytes UTF-8 de payload.
+- lote: las lineas son los eventos en JSON y, cada como mucho
+  WEBHOOK_LOTE_MAX_REGISTROS eventos, una linea {"firma_lote": "<hex>"}
+  firma las lineas anteriores desde la firma previa (cada una sin
+  espacios al borde y seguida de "\\n"). Los eventos de un lote solo se
+  procesan al verificar su firma; los que quedan sin firma al final se
+  descartan.
+"""
+import asyncio
+from enum import Enum
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from app.config import configuracion
+from app.ndjson import LineaInvalida, parsear_objeto
+from app.seguridad.firmas import calcular_firma, firmas_iguales, nuevo_hmac
+from app.registro import get_logger
+
+logger = get_logger("webhooks.lote")
+
+# Recibe el evento y devuelve una etiqueta de resultado para el resumen
+ProcesarEvento = Callable[[Dict[str, Any]], Awaitable[str]]
+
+
+class ModoFirma(str, Enum):
+    """Como se firman los eventos de un lote."""
+    REGISTRO = "registro"
+    LOTE = "lote"
+
+
+class ImportadorLote:
+    """
+    Procesa un stream NDJSON de eventos firmados.
+
+    Args:
+        procesar: Corutina que procesa un evento verificado
+        secreto: Secreto HMAC del partner
+        timestamp: Timestamp del envio (X-Webhook-Timestamp)
+        modo: Modo de firma
+        concurrencia: Eventos en proceso a la vez (default WEBHOOK_LOTE_CONCURRENCIA)
+        max_registros: Eventos por firma de lote (default WEBHOOK_LOTE_MAX_REGISTROS)
+        max_errores: Errores detallados en el resumen
+    """
+
+    def __init__(
+        self,
+        procesar: ProcesarEvento,
+        secreto: str,
+        timestamp: int,
+        modo: ModoFirma = ModoFirma.REGISTRO,
+        concurrencia: Optional[int] = None,
+        max_registros: Optional[int] = None,
+        max_errores: int = 20
+    ):
+        self.procesar = procesar
+        self.secreto = secreto
+        self.timestamp = timestamp
+        self.modo = modo
+        self.concurrencia = concurrencia or configuracion.WEBHOOK_LOTE_CONCURRENCIA
+        self.max_registros = max_registros or configuracion.WEBHOOK_LOTE_MAX_REGISTROS
+        self.max_errores = max_errores
+
+        self._en_vuelo: Set[asyncio.Task] = set()
+        self._conteos = {"lineas": 0, "procesados": 0, "firma_invalida": 0, "invalidos": 0, "sin_firma": 0, "errores": 0}
+        self._resultados: Dict[str, int] = {}
+        self._errores: List[Dict[str, Any]] = []
+        self._interrumpido = False
+
+    async def importar(self, lineas: AsyncIterable[Tuple[int, bytes]]) -> Dict[str, Any]:
+        """
+        Lee, verifica y procesa todo el stream.
+
+        Args:
+            lineas: (numero, contenido), ej. iterar_lineas(request.stream())
+
+        Returns:
+            Conteos por resultado y los primeros errores por linea
+        """
+        try:
+            if self.modo == ModoFirma.LOTE:
+                await self._importar_por_lote(lineas)
+            else:
+                await self._importar_por_registro(lineas)
+        except LineaInvalida as e:
+            # Linea sin fin dentro del limite: no se puede seguir leyendo
+            self._error(e.numero, e.mensaje, "invalidos")
+            self._interrumpido = True
+        finally:
+            if self._en_vuelo:
+                await asyncio.gather(*self._en_vuelo)
+
+        logger.info(
+            "Lote importado", extra={**self._conteos, "modo": self.modo.value, "interrumpido": self._interrumpido}
+        )
+        return {
+            **self._conteos,
+            "resultados": self._resultados,
+            "interrumpido": self._interrumpido,
+            "detalle_errores": self._errores
+        }
+
+    async def _importar_por_registro(self, lineas: AsyncIterable[Tuple[int, bytes]]) -> None:
+        async for numero, linea in lineas:
+            self._conteos["lineas"] += 1
+            try:
+                envoltura = parsear_objeto(numero, linea)
+                payload, firma = envoltura.get("payload"), envoltura.get("firma")
+                if not isinstance(payload, str) or not isinstance(firma, str):
+                    raise LineaInvalida(numero, "se esperaba {\"payload\": \"...\", \"firma\": \"...\"}")
+                payload_bytes = payload.encode()
+                if not firmas_iguales(calcular_firma(payload_bytes, self.secreto, self.timestamp), firma):
+                    self._error(numero, "firma invalida", "firma_invalida")
+                    continue
+                evento = parsear_objeto(numero, payload_bytes)
+            except LineaInvalida as e:
+                self._error(numero, e.mensaje, "invalidos")
+                continue
+            await self._lanzar(numero, evento)
+
+    async def _importar_por_lote(self, lineas: AsyncIterable[Tuple[int, bytes]]) -> None:
+        firma = self._nueva_firma_lote()
+        pendientes: List[Tuple[int, Dict[str, Any]]] = []
+        invalidos_en_lote = 0
+
+        async for numero, linea in lineas:
+            self._conteos["lineas"] += 1
+            try:
+                objeto = parsear_objeto(numero, linea)
+            except LineaInvalida as e:
+                # Tambien va a la firma: el partner firmo la linea tal cual
+                firma.update(linea + b"\n")
+                invalidos_en_lote += 1
+                self._error(numero, e.mensaje, "invalidos")
+                continue
+
+            firma_lote = objeto.get("firma_lote") if len(objeto) == 1 else None
+            if firma_lote is None:
+                if len(pendientes) + invalidos_en_lote >= self.max_registros:
+                    self._error(numero, f"lote sin firma de mas de {self.max_registros} registros", "sin_firma")
+                    self._conteos["sin_firma"] += len(pendientes)
+                    self._interrumpido = True
+                    return
+                firma.update(linea + b"\n")
+                pendientes.append((numero, objeto))
+                continue
+
+            if not isinstance(firma_lote, str) or not firmas_iguales(firma.hexdigest(), firma_lote):
+                # Un lote alterado invalida lo que sigue: se corta el stream
+                self._conteos["firma_invalida"] += len(pendientes)
+                self._error(numero, "firma de lote invalida", None)
+                self._interrumpido = True
+                return
+
+            for numero_evento, evento in pendientes:
+                await self._lanzar(numero_evento, evento)
+            firma = self._nueva_firma_lote()
+            pendientes = []
+            invalidos_en_lote = 0
+
+        if pendientes:
+            self._conteos["sin_firma"] += len(pendientes)
+            self._error(pendientes[-1][0], "eventos al final del stream sin firma_lote", None)
+
+    def _nueva_firma_lote(self):
+        firma = nuevo_hmac(self.secreto)
+        firma.update(b"%d." % self.timestamp)
+        return firma
+
+    async def _lanzar(self, numero: int, evento: Dict[str, Any]) -> None:
+        """Crea la tarea del evento; si hay demasiadas en vuelo, espera a que termine alguna."""
+        while len(self._en_vuelo) >= self.concurrencia:
+            await asyncio.wait(self._en_vuelo, return_when=asyncio.FIRST_COMPLETED)
+        tarea = asyncio.create_task(self._ejecutar(numero, evento))
+        self._en_vuelo.add(tarea)
+        tarea.add_done_callback(self._en_vuelo.discard)
+
+    async def _ejecutar(self, numero: int, evento: Dict[str, Any]) -> None:
+        try:
+            resultado = await self.procesar(evento)
+        except Exception as e:
+            logger.exception("Error procesando evento del lote", extra={"linea": numero})
+            self._error(numero, str(e) or type(e).__name__, "errores")
+            return
+        self._conteos["procesados"] += 1
+        self._resultados[resultado] = self._resultados.get(resultado, 0) + 1
+
+    def _error(self, numero: int, mensaje: str, contador: Optional[str]) -> None:
+        if contador:
+            self._conteos[contador] += 1
+        if len(self._errores) < self.max_errores:
+            self._errores.append({"linea": numero, "error": mensaje})
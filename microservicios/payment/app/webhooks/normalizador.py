@@ -50,6 +50,22 @@ class EventoNormalizado:
             "timestamp": self.timestamp.isoformat()
         }
 
+    @classmethod
+    def from_dict(cls, datos: Dict[str, Any]) -> "EventoNormalizado":
+        """Reconstruye un evento a partir de su forma serializada (to_dict)."""
+        return cls(
+            payment_id=datos.get("payment_id", ""),
+            event_type=TipoEventoPago(datos["event_type"]),
+            pasarela=datos.get("pasarela", ""),
+            monto=datos.get("monto", 0),
+            moneda=datos.get("moneda", "USD"),
+            usuario_id=datos.get("usuario_id"),
+            negocio_id=datos.get("negocio_id"),
+            cita_id=datos.get("cita_id"),
+            metadatos=datos.get("metadatos") or {},
+            timestamp=datetime.fromisoformat(datos["timestamp"]) if datos.get("timestamp") else datetime.utcnow()
+        )
+
 
 class NormalizadorWebhooks:
     """
@@ -13,6 +13,20 @@ from app.partners.servicio import ServicioPartners
 from app.servicios.n8n_event_bus import get_n8n_client
 from app.seguridad.hmac_auth import generar_firma_hmac
 from app.partners.almacen import AlmacenPartners
+from app.webhooks.cola_ingesta import get_cola_ingesta
+from app.webhooks.despachador import DespachadorHandlers
+from app.webhooks.registro_eventos import RegistroEventos
+from app.config import configuracion
+from app.registro import correlacion, get_logger
+from app.metricas import metricas, formatear_familia
+
+logger = get_logger("webhooks")
+
+_webhooks_recibidos = metricas.contador(
+    "payment_webhooks_recibidos_total",
+    "Webhooks recibidos por origen (pasarela o externo)",
+    ("origen",)
+)
 
 
 class ProcesadorWebhooks:
@@ -20,14 +34,17 @@ class ProcesadorWebhooks:
     Procesa webhooks entrantes y ejecuta handlers registrados.
     """
     
-    _handlers: Dict[TipoEvento, List[Callable]] = {}
-    _eventos_procesados: List[WebhookEventoInterno] = []
+    _despachador = DespachadorHandlers()
+    _eventos_procesados = RegistroEventos(configuracion.WEBHOOK_EVENTOS_CAPACIDAD)
     
     @classmethod
     def registrar_handler(
         cls,
         evento: TipoEvento,
-        handler: Callable
+        handler: Callable,
+        timeout: Optional[float] = None,
+        max_concurrencia: Optional[int] = None,
+        en_hilo: bool = False
     ) -> None:
         """
         Registra un handler para un tipo de evento.
@@ -35,10 +52,17 @@ class ProcesadorWebhooks:
         Args:
             evento: Tipo de evento
             handler: Funcion async que procesa el evento
+            timeout: Segundos maximos por ejecucion (opcional)
+            max_concurrencia: Ejecuciones simultaneas del handler (opcional)
+            en_hilo: Ejecutar un handler sincrono en el pool de hilos
         """
-        if evento not in cls._handlers:
-            cls._handlers[evento] = []
-        cls._handlers[evento].append(handler)
+        cls._despachador.registrar(
+            evento,
+            handler,
+            timeout=timeout,
+            max_concurrencia=max_concurrencia,
+            en_hilo=en_hilo
+        )
     
     @classmethod
     async def procesar_webhook_pasarela(
@@ -50,6 +74,9 @@ class ProcesadorWebhooks:
         Procesa un webhook de una pasarela de pago.
         Normaliza y envia a n8n Event Bus para orquestacion.
         
+        Con WEBHOOK_INGESTA_ASINCRONA el envio a n8n se delega a la cola de
+        ingesta y la respuesta vuelve sin esperar a n8n.
+        
         Args:
             pasarela: Nombre de la pasarela (stripe, mercadopago, mock)
             payload: Payload del webhook
@@ -63,9 +90,64 @@ class ProcesadorWebhooks:
             payload
         )
         
-        print(f"📥 Webhook recibido de {pasarela}: {evento_normalizado.event_type.value}")
+        _webhooks_recibidos.etiquetas(pasarela).incrementar()
+        with correlacion(evento_normalizado.payment_id):
+            logger.info(
+                "Webhook recibido de %s: %s", pasarela, evento_normalizado.event_type.value,
+                extra={"pasarela": pasarela}
+            )
+            return await cls._confirmar_o_despachar(pasarela, evento_normalizado)
+    
+    @classmethod
+    async def _confirmar_o_despachar(
+        cls,
+        pasarela: str,
+        evento_normalizado: EventoNormalizado
+    ) -> WebhookRecibidoResponse:
+        """Encola el evento (modo asincrono) o lo despacha antes de responder."""
+        # 2. Modo asincrono: encolar y confirmar de inmediato a la pasarela
+        if configuracion.WEBHOOK_INGESTA_ASINCRONA:
+            cola = get_cola_ingesta()
+            if cola.encolar(evento_normalizado):
+                await cola.asegurar_en_disco()
+                return WebhookRecibidoResponse(
+                    recibido=True,
+                    evento_id=evento_normalizado.payment_id,
+                    mensaje=f"Webhook de {pasarela} encolado para envio a Event Bus",
+                    procesado=False
+                )
+            # Cola llena o detenida: procesar en linea (backpressure hacia la pasarela)
+            logger.warning("Cola de ingesta no disponible, procesando en linea")
+        
+        # 3. Modo sincrono: procesar antes de responder
+        await cls.despachar_evento(evento_normalizado)
+        
+        return WebhookRecibidoResponse(
+            recibido=True,
+            evento_id=evento_normalizado.payment_id,
+            mensaje=f"Webhook de {pasarela} procesado y enviado a Event Bus",
+            procesado=True
+        )
+    
+    @classmethod
+    async def despachar_evento(cls, evento_normalizado: EventoNormalizado) -> bool:
+        """
+        Envia un evento normalizado a n8n Event Bus (con fallback local).
+        Lo usan tanto el modo sincrono como los workers de la cola de ingesta.
         
-        # 2. Obtener información de partner si existe
+        Args:
+            evento_normalizado: Evento ya normalizado
+            
+        Returns:
+            True si n8n o el fallback procesaron el evento
+        """
+        with correlacion(evento_normalizado.payment_id):
+            return await cls._enviar_a_event_bus(evento_normalizado)
+    
+    @classmethod
+    async def _enviar_a_event_bus(cls, evento_normalizado: EventoNormalizado) -> bool:
+        """Firma para el partner asociado (si existe) y envia a n8n."""
+        # 1. Obtener información de partner si existe
         partner_webhook_url = None
         partner_signature = None
         
@@ -85,7 +167,7 @@ class ProcesadorWebhooks:
                 )
                 partner_signature = f"{timestamp}.{firma}"
         
-        # 3. Enviar a n8n Event Bus (orquestador central)
+        # 2. Enviar a n8n Event Bus (orquestador central)
         n8n_client = get_n8n_client()
         success = await n8n_client.enviar_evento_con_fallback(
             evento=evento_normalizado,
@@ -93,17 +175,12 @@ class ProcesadorWebhooks:
         )
         
         if not success:
-            print(f"⚠️ n8n Event Bus no disponible, ejecutando fallback local")
+            logger.warning("n8n Event Bus no disponible, ejecutando fallback local")
         
-        # 4. Ejecutar handlers locales (opcional, para procesamiento inmediato)
+        # 3. Ejecutar handlers locales (opcional, para procesamiento inmediato)
         # await cls._ejecutar_handlers_locales(evento_normalizado)
         
-        return WebhookRecibidoResponse(
-            recibido=True,
-            evento_id=evento_normalizado.payment_id,
-            mensaje=f"Webhook de {pasarela} procesado y enviado a Event Bus",
-            procesado=True
-        )
+        return success
     
     @classmethod
     async def procesar_webhook_externo(
@@ -123,16 +200,21 @@ class ProcesadorWebhooks:
         Returns:
             WebhookRecibidoResponse
         """
-        print(f"📥 Webhook externo recibido de {origen}: {tipo_evento}")
-        
         # Normalizar
         evento = NormalizadorWebhooks.normalizar_externo(origen, tipo_evento, datos)
+        _webhooks_recibidos.etiquetas("externo").incrementar()
         
-        # Ejecutar handlers locales
-        await cls._ejecutar_handlers(evento)
+        with correlacion(evento.id):
+            logger.info(
+                "Webhook externo recibido de %s: %s", origen, tipo_evento,
+                extra={"origen": origen}
+            )
+            
+            # Ejecutar handlers locales
+            await cls._ejecutar_handlers(evento)
         
         evento.procesado = True
-        cls._eventos_procesados.append(evento)
+        cls._eventos_procesados.agregar(evento)
         
         return WebhookRecibidoResponse(
             recibido=True,
@@ -147,13 +229,13 @@ class ProcesadorWebhooks:
         Fallback cuando n8n Event Bus no está disponible.
         Ejecuta acciones críticas directamente.
         """
-        print(f"🔄 Ejecutando fallback local para {evento.event_type.value}")
+        logger.info("Ejecutando fallback local para %s", evento.event_type.value)
         
         # Solo ejecutar acciones críticas
         if evento.event_type == TipoEventoPago.PAGO_APROBADO:
             # Aquí deberías actualizar el estado de la cita directamente
             # Por ejemplo: await actualizar_estado_cita(evento.cita_id, "confirmed")
-            print(f"💳 Pago aprobado (fallback): {evento.payment_id}")
+            logger.info("Pago aprobado (fallback)", extra={"cita_id": evento.cita_id})
             
             # Notificar a partners críticos directamente (bypass n8n)
             if evento.negocio_id:
@@ -179,29 +261,12 @@ class ProcesadorWebhooks:
         if not tipo_evento:
             return
         
-        handlers = cls._handlers.get(tipo_evento, [])
-        for handler in handlers:
-            try:
-                if asyncio.iscoroutinefunction(handler):
-                    await handler(evento)
-                else:
-                    handler(evento)
-            except Exception as e:
-                print(f"❌ Error en handler local: {e}")
+        await cls._despachador.despachar(tipo_evento, evento)
     
     @classmethod
     async def _ejecutar_handlers(cls, evento: WebhookEventoInterno) -> None:
-        """Ejecuta todos los handlers registrados para el evento."""
-        handlers = cls._handlers.get(evento.tipo, [])
-        
-        for handler in handlers:
-            try:
-                if asyncio.iscoroutinefunction(handler):
-                    await handler(evento)
-                else:
-                    handler(evento)
-            except Exception as e:
-                print(f"Error en handler para {evento.tipo}: {e}")
+        """Ejecuta concurrentemente los handlers registrados para el evento."""
+        await cls._despachador.despachar(evento.tipo, evento)
     
     @classmethod
     def obtener_eventos_procesados(
@@ -209,30 +274,74 @@ class ProcesadorWebhooks:
         limite: int = 100
     ) -> List[WebhookEventoInterno]:
         """Obtiene los ultimos eventos procesados."""
-        return cls._eventos_procesados[-limite:]
+        return cls._eventos_procesados.ultimos(limite)
+    
+    @classmethod
+    def consultar_eventos_procesados(
+        cls,
+        tipo: Optional[str] = None,
+        pasarela: Optional[str] = None,
+        desde: Optional[datetime] = None,
+        hasta: Optional[datetime] = None,
+        cursor: Optional[int] = None,
+        limite: int = 50
+    ):
+        """
+        Consulta eventos procesados usando los indices del registro.
+        
+        Returns:
+            Tupla (lista de (seq, registrado_en, evento), siguiente_cursor)
+        """
+        return cls._eventos_procesados.consultar(
+            tipo=tipo,
+            pasarela=pasarela,
+            desde=desde,
+            hasta=hasta,
+            cursor=cursor,
+            limite=limite
+        )
+    
+    @classmethod
+    def estadisticas_handlers(cls) -> Dict[str, List[Dict[str, Any]]]:
+        """Latencias y resultados por handler registrado."""
+        return cls._despachador.estadisticas()
+    
+    @classmethod
+    def metricas_prometheus(cls) -> List[str]:
+        """Latencia de handlers locales por evento y handler."""
+        return formatear_familia(
+            "payment_handler_ms",
+            "Latencia de handlers locales de webhooks",
+            "histogram",
+            ("evento", "handler"),
+            [
+                ((evento, registro.nombre), registro.latencia_ms)
+                for evento, registro in cls._despachador.registros()
+            ]
+        )
     
     @classmethod
     def limpiar_handlers(cls) -> None:
         """Limpia todos los handlers (para testing)."""
-        cls._handlers.clear()
+        cls._despachador.limpiar()
 
 
 # Handlers por defecto
 async def handler_pago_exitoso(evento: WebhookEventoInterno) -> None:
     """Handler para pagos exitosos."""
-    print(f"Pago exitoso recibido: {evento.datos}")
+    logger.info("Pago exitoso recibido", extra={"datos": evento.datos})
     # Aqui se podria actualizar el estado en la base de datos
 
 
 async def handler_suscripcion_creada(evento: WebhookEventoInterno) -> None:
     """Handler para suscripciones creadas."""
-    print(f"Suscripcion creada: {evento.datos}")
+    logger.info("Suscripcion creada", extra={"datos": evento.datos})
     # Aqui se activarian los beneficios premium
 
 
 async def handler_booking_confirmed(evento: WebhookEventoInterno) -> None:
     """Handler para citas confirmadas (integracion B2B)."""
-    print(f"Reserva confirmada recibida: {evento.datos}")
+    logger.info("Reserva confirmada recibida", extra={"datos": evento.datos})
     # Procesar la reserva y responder si es necesario
 
 
@@ -240,3 +349,6 @@ async def handler_booking_confirmed(evento: WebhookEventoInterno) -> None:
 ProcesadorWebhooks.registrar_handler(TipoEvento.PAYMENT_SUCCESS, handler_pago_exitoso)
 ProcesadorWebhooks.registrar_handler(TipoEvento.SUBSCRIPTION_CREATED, handler_suscripcion_creada)
 ProcesadorWebhooks.registrar_handler(TipoEvento.BOOKING_CONFIRMED, handler_booking_confirmed)
+
+
+metricas.registrar_recolector(ProcesadorWebhooks.metricas_prometheus)
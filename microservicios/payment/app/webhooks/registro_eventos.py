@@ -0,0 +1,218 @@
+"""
+Registro acotado de eventos de webhooks procesados.
+
+Buffer circular de capacidad fija con indices secundarios por tipo y por
+pasarela. Cada evento recibe una secuencia creciente que sirve de cursor
+de paginacion; como las secuencias y las horas de registro crecen juntas,
+los filtros por rango de tiempo se resuelven con busqueda binaria.
+"""
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.modelos.webhook import WebhookEventoInterno
+
+
+def _primer_indice(total: int, clave: Callable[[int], Any], valor: Any) -> int:
+    """Primer indice i en [0, total) con clave(i) >= valor (busqueda binaria)."""
+    bajo, alto = 0, total
+    while bajo < alto:
+        medio = (bajo + alto) // 2
+        if clave(medio) < valor:
+            bajo = medio + 1
+        else:
+            alto = medio
+    return bajo
+
+
+def _utc_sin_zona(fecha: Optional[datetime]) -> Optional[datetime]:
+    """Lleva una fecha con zona horaria a UTC naive (como las de registro)."""
+    if fecha is None or fecha.tzinfo is None:
+        return fecha
+    return fecha.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class _Secuencias:
+    """
+    Secuencias crecientes de un indice secundario.
+
+    Lista con desplazamiento de inicio: agregar al final y descartar del
+    inicio son O(1) amortizado, y el acceso por posicion (que usa la
+    busqueda binaria) es O(1), a diferencia de un deque.
+    """
+
+    __slots__ = ("_datos", "_inicio")
+
+    def __init__(self):
+        self._datos: List[int] = []
+        self._inicio = 0
+
+    def append(self, seq: int) -> None:
+        self._datos.append(seq)
+
+    def popleft(self) -> int:
+        seq = self._datos[self._inicio]
+        self._inicio += 1
+        # Compactar cuando la mitad de la lista ya fue descartada
+        if self._inicio > 64 and self._inicio * 2 > len(self._datos):
+            del self._datos[:self._inicio]
+            self._inicio = 0
+        return seq
+
+    def __len__(self) -> int:
+        return len(self._datos) - self._inicio
+
+    def __getitem__(self, i: int) -> int:
+        return self._datos[self._inicio + i]
+
+
+class RegistroEventos:
+    """
+    Buffer circular de eventos procesados con indices por tipo y pasarela.
+    """
+
+    def __init__(self, capacidad: int = 1000):
+        if capacidad < 1:
+            raise ValueError("La capacidad del registro de eventos debe ser al menos 1")
+        self.capacidad = capacidad
+        self._slots: List[Optional[Tuple[int, datetime, WebhookEventoInterno]]] = [None] * capacidad
+        self._siguiente_seq = 1
+        self._por_tipo: Dict[str, _Secuencias] = {}
+        self._por_pasarela: Dict[str, _Secuencias] = {}
+
+    @property
+    def primera_seq(self) -> int:
+        """Secuencia del evento mas antiguo que sigue en el buffer."""
+        return max(1, self._siguiente_seq - self.capacidad)
+
+    @property
+    def ultima_seq(self) -> int:
+        """Secuencia del evento mas reciente (0 si esta vacio)."""
+        return self._siguiente_seq - 1
+
+    def __len__(self) -> int:
+        return self.ultima_seq - self.primera_seq + 1 if self.ultima_seq else 0
+
+    def agregar(self, evento: WebhookEventoInterno) -> int:
+        """
+        Registra un evento, desalojando el mas antiguo si el buffer esta lleno.
+
+        Returns:
+            Secuencia asignada al evento
+        """
+        seq = self._siguiente_seq
+        slot = seq % self.capacidad
+
+        desalojado = self._slots[slot]
+        if desalojado is not None:
+            self._desindexar(desalojado[2])
+
+        self._slots[slot] = (seq, datetime.utcnow(), evento)
+        self._por_tipo.setdefault(evento.tipo.value, _Secuencias()).append(seq)
+        self._por_pasarela.setdefault(evento.pasarela, _Secuencias()).append(seq)
+        self._siguiente_seq += 1
+        return seq
+
+    def _desindexar(self, evento: WebhookEventoInterno) -> None:
+        """Quita el evento mas antiguo de sus indices (siempre esta al inicio)."""
+        for indice, clave in ((self._por_tipo, evento.tipo.value), (self._por_pasarela, evento.pasarela)):
+            secuencias = indice.get(clave)
+            if secuencias:
+                secuencias.popleft()
+                if not secuencias:
+                    del indice[clave]
+
+    def _slot(self, seq: int) -> Tuple[int, datetime, WebhookEventoInterno]:
+        return self._slots[seq % self.capacidad]
+
+    def ultimos(self, limite: int = 100) -> List[WebhookEventoInterno]:
+        """Ultimos eventos en orden cronologico."""
+        desde = max(self.primera_seq, self.ultima_seq - limite + 1)
+        return [self._slot(seq)[2] for seq in range(desde, self.ultima_seq + 1)]
+
+    def consultar(
+        self,
+        tipo: Optional[str] = None,
+        pasarela: Optional[str] = None,
+        desde: Optional[datetime] = None,
+        hasta: Optional[datetime] = None,
+        cursor: Optional[int] = None,
+        limite: int = 50
+    ) -> Tuple[List[Tuple[int, datetime, WebhookEventoInterno]], Optional[int]]:
+        """
+        Consulta eventos del mas reciente al mas antiguo.
+
+        Args:
+            tipo: Filtrar por tipo de evento
+            pasarela: Filtrar por pasarela/origen
+            desde: Registrados en o despues de esta fecha (naive = UTC)
+            hasta: Registrados en o antes de esta fecha (naive = UTC)
+            cursor: Devolver solo eventos con secuencia menor a este valor
+            limite: Maximo de eventos a devolver
+
+        Returns:
+            Tupla (lista de (seq, registrado_en, evento), siguiente_cursor)
+        """
+        if not len(self):
+            return [], None
+        desde = _utc_sin_zona(desde)
+        hasta = _utc_sin_zona(hasta)
+
+        # Rango de secuencias a partir de tiempo y cursor
+        primera = self.primera_seq
+        total = len(self)
+        seq_min = primera
+        seq_max = self.ultima_seq
+        if desde is not None:
+            seq_min = primera + _primer_indice(total, lambda i: self._slot(primera + i)[1], desde)
+        if hasta is not None:
+            seq_max = primera + _primer_indice(
+                total, lambda i: (self._slot(primera + i)[1] > hasta), True
+            ) - 1
+        if cursor is not None:
+            seq_max = min(seq_max, cursor - 1)
+        if seq_min > seq_max:
+            return [], None
+
+        # Elegir el indice mas selectivo como fuente de candidatos
+        candidatos: Sequence[int]
+        filtro_extra: Optional[Callable[[WebhookEventoInterno], bool]] = None
+        por_tipo = self._por_tipo.get(tipo, _Secuencias()) if tipo else None
+        por_pasarela = self._por_pasarela.get(pasarela, _Secuencias()) if pasarela else None
+
+        if por_tipo is not None and por_pasarela is not None:
+            if len(por_tipo) <= len(por_pasarela):
+                candidatos = por_tipo
+                filtro_extra = lambda e: e.pasarela == pasarela
+            else:
+                candidatos = por_pasarela
+                filtro_extra = lambda e: e.tipo.value == tipo
+        elif por_tipo is not None:
+            candidatos = por_tipo
+        elif por_pasarela is not None:
+            candidatos = por_pasarela
+        else:
+            candidatos = range(primera, self.ultima_seq + 1)
+
+        # Recorrer hacia atras desde seq_max
+        fin = _primer_indice(len(candidatos), lambda i: candidatos[i], seq_max + 1)
+        resultado = []
+        i = fin - 1
+        while i >= 0 and len(resultado) < limite:
+            seq = candidatos[i]
+            if seq < seq_min:
+                break
+            registro = self._slot(seq)
+            if filtro_extra is None or filtro_extra(registro[2]):
+                resultado.append(registro)
+            i -= 1
+
+        hay_mas = i >= 0 and candidatos[i] >= seq_min
+        siguiente_cursor = resultado[-1][0] if resultado and hay_mas else None
+        return resultado, siguiente_cursor
+
+    def limpiar(self) -> None:
+        """Vacia el registro."""
+        self._slots = [None] * self.capacidad
+        self._siguiente_seq = 1
+        self._por_tipo.clear()
+        self._por_pasarela.clear()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark del enrutador de pasarelas con MockAdapter y fallos inyectados.
+
+Dos pasarelas simuladas: "lenta" (120 ms) y "rapida" (15 ms). Fases:
+  1. solo lenta: referencia sin enrutador
+  2. enrutado: el trafico converge a la rapida
+  3. rechazo: la rapida rechaza todo sin tomar el pago (fallo definitivo);
+     cada pago pasa a la lenta sin error para el cliente y el circuito de
+     la rapida se abre tras ENRUTADOR_FALLOS_PARA_ABRIR
+  4. recuperacion: la rapida vuelve y la sonda la rehabilita
+  5. sin red: la rapida falla con error de red (resultado incierto); no
+     hay failover, asi que los pagos en vuelo hacia ella devuelven error
+     hasta que el circuito se abre y el trafico va a la lenta
+
+Uso (desde microservicios/payment):
+    PYTHONPATH=. DEBUG=true python benchmarks/bench_enrutador.py [pagos_por_fase] [concurrencia]
+"""
+import asyncio
+import sys
+import time
+from collections import Counter
+from typing import List
+
+PAGOS = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+CONCURRENCIA = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+
+def percentil(valores: List[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+async def fase(nombre: str, adaptador) -> None:
+    semaforo = asyncio.Semaphore(CONCURRENCIA)
+    latencias: List[float] = []
+    pasarelas: Counter = Counter()
+    errores = 0
+
+    async def pagar(i: int) -> None:
+        nonlocal errores
+        async with semaforo:
+            inicio = time.perf_counter()
+            resultado = await adaptador.crear_pago(10.0, "USD", f"bench {i}")
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            if resultado.exitoso:
+                pasarelas[resultado.metadatos.get("pasarela", adaptador.nombre)] += 1
+            else:
+                errores += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(pagar(i) for i in range(PAGOS)))
+    duracion = time.perf_counter() - inicio
+    print(
+        f"{nombre:>14}: {PAGOS / duracion:7.0f} pagos/s  p50 {percentil(latencias, 0.5):6.1f} ms  "
+        f"p99 {percentil(latencias, 0.99):6.1f} ms  errores {errores:3d}  {dict(pasarelas)}"
+    )
+
+
+async def main() -> None:
+    from app import registro
+    from app.adaptador.mock_adapter import MockAdapter
+    from app.adaptador.enrutador import AdaptadorEnrutado
+
+    registro.configurar_logging("CRITICAL")
+
+    lenta = MockAdapter("lenta", retardo_segundos=0.120)
+    rapida = MockAdapter("rapida", retardo_segundos=0.015)
+    enrutador = AdaptadorEnrutado(
+        [lenta, rapida], timeout_segundos=1.0, fallos_para_abrir=3,
+        enfriamiento_segundos=5.0, intervalo_sondeo=0.2
+    )
+
+    print(f"{PAGOS} pagos por fase, concurrencia {CONCURRENCIA}")
+    await fase("solo lenta", lenta)
+    await fase("enrutado", enrutador)
+
+    rapida.tasa_rechazo = 1.0
+    await fase("rapida rechaza", enrutador)
+    print(f"{'':>14}  estado: {enrutador.estado()['pasarelas']['rapida']}")
+
+    rapida.tasa_rechazo = 0.0
+    enrutador.iniciar_sondeo()
+    await asyncio.sleep(0.5)
+    await fase("recuperada", enrutador)
+    await enrutador.detener_sondeo()
+
+    rapida.tasa_fallo = 1.0
+    await fase("rapida sin red", enrutador)
+    print(f"{'':>14}  estado: {enrutador.estado()['pasarelas']['rapida']}")
+    registro.detener_logging()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Benchmark de verificacion de firmas HMAC.
+
+Compara el calculo anterior (hmac.new por llamada + concatenacion
+"<ts>." + body) con la ruta de app.seguridad.firmas (prototipo cacheado
+y dos update() sin copia) para bodies de 1KB, 100KB y 1MB.
+
+Uso (desde microservicios/payment):
+    PYTHONPATH=. python benchmarks/bench_firmas_hmac.py
+"""
+import hashlib
+import hmac
+import os
+import time
+import timeit
+
+from app.seguridad.firmas import calcular_firma
+
+SECRETO = "whsec_" + "a" * 64
+TAMANIOS = {"1KB": 1024, "100KB": 100 * 1024, "1MB": 1024 * 1024}
+
+
+def firma_concatenando(payload: bytes, secreto: str, timestamp: int) -> str:
+    """Implementacion original: copia el body completo en cada llamada."""
+    mensaje = f"{timestamp}.".encode() + payload
+    return hmac.new(secreto.encode(), mensaje, hashlib.sha256).hexdigest()
+
+
+def medir(funcion, payload: bytes, timestamp: int, repeticiones: int) -> float:
+    """Microsegundos por llamada (mejor de 5 rondas)."""
+    tiempos = timeit.repeat(
+        lambda: funcion(payload, SECRETO, timestamp),
+        number=repeticiones,
+        repeat=5
+    )
+    return min(tiempos) / repeticiones * 1e6
+
+
+def main() -> None:
+    timestamp = int(time.time())
+    print(f"{'body':>6} | {'concatenando (us)':>18} | {'prototipo (us)':>15} | {'mejora':>7}")
+    print("-" * 56)
+    for etiqueta, tamanio in TAMANIOS.items():
+        payload = os.urandom(tamanio)
+        assert firma_concatenando(payload, SECRETO, timestamp) == calcular_firma(payload, SECRETO, timestamp)
+
+        repeticiones = max(20, 20_000_000 // (tamanio + 1024))
+        anterior = medir(firma_concatenando, payload, timestamp, repeticiones)
+        nuevo = medir(calcular_firma, payload, timestamp, repeticiones)
+        print(f"{etiqueta:>6} | {anterior:>18.2f} | {nuevo:>15.2f} | {anterior / nuevo:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
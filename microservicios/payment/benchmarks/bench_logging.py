@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark de logging: print sincrono vs logger con cola (app.registro).
+
+Simula N requests concurrentes en un event loop; cada una emite varios
+logs y hace un await corto. Se mide el throughput del loop con:
+  - print con f-string (lo que hacian los hot paths)
+  - logger.info con la cola de app.registro
+  - logger.debug descartado por nivel (no formatea ni encola)
+
+y con dos destinos de stdout:
+  - archivo: escritura a page cache, el mejor caso para print
+  - lento: cada write tarda LATENCIA_US, como un pipe saturado hacia el
+    colector de logs; print bloquea el loop, la cola no
+
+Uso (desde microservicios/payment):
+    PYTHONPATH=. python benchmarks/bench_logging.py [requests] [latencia_us]
+"""
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import time
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+LATENCIA_US = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+LOGS_POR_REQUEST = 5
+CONCURRENCIA = 100
+
+
+class SalidaLenta(io.TextIOBase):
+    """Destino cuyo write bloquea LATENCIA_US microsegundos."""
+
+    def write(self, texto: str) -> int:
+        time.sleep(LATENCIA_US / 1e6)
+        return len(texto)
+
+
+async def simular(emitir) -> float:
+    """Requests por segundo procesadas por el loop."""
+    semaforo = asyncio.Semaphore(CONCURRENCIA)
+
+    async def request(i: int) -> None:
+        async with semaforo:
+            for paso in range(LOGS_POR_REQUEST):
+                emitir(i, paso)
+                await asyncio.sleep(0)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(request(i) for i in range(REQUESTS)))
+    return REQUESTS / (time.perf_counter() - inicio)
+
+
+def ejecutar(destino: str) -> None:
+    from app import registro
+
+    if destino == "archivo":
+        salida = tempfile.NamedTemporaryFile("w", suffix=".log", delete=False)
+    else:
+        salida = SalidaLenta()
+    # El StreamHandler toma sys.stdout al configurarse, por eso se redirige antes
+    sys.stdout = salida
+    registro.configurar_logging("INFO")
+    logger = registro.get_logger("benchmark")
+    datos = {"usuario_id": "usr_123", "monto": 29.99, "moneda": "USD"}
+
+    resultados = {
+        "print": asyncio.run(simular(
+            lambda i, paso: print(f"📥 Webhook recibido de stripe: payment.success {i}.{paso} {datos}", flush=True)
+        )),
+        "logger.info (cola)": asyncio.run(simular(
+            lambda i, paso: logger.info("Webhook recibido de %s: %s", "stripe", i, extra={"datos": datos})
+        )),
+        "logger.debug (descartado)": asyncio.run(simular(
+            lambda i, paso: logger.debug("Webhook recibido de %s: %s", "stripe", i, extra={"datos": datos})
+        ))
+    }
+
+    inicio = time.perf_counter()
+    registro.detener_logging()
+    vaciado_ms = (time.perf_counter() - inicio) * 1000
+    sys.stdout = sys.__stdout__
+    if destino == "archivo":
+        salida.close()
+        os.unlink(salida.name)
+
+    base = resultados["print"]
+    etiqueta = "archivo" if destino == "archivo" else f"lento ({LATENCIA_US} us/write)"
+    print(f"\nDestino: {etiqueta}")
+    for nombre, rps in resultados.items():
+        print(f"  {nombre:>26}: {rps:10.0f} req/s  ({rps / base:5.2f}x)")
+    print(f"  {'vaciado de la cola':>26}: {vaciado_ms:10.1f} ms")
+
+
+def main() -> None:
+    print(f"{REQUESTS} requests, {LOGS_POR_REQUEST} logs por request, concurrencia {CONCURRENCIA}")
+    ejecutar("archivo")
+    ejecutar("lento")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Benchmark de carga del microservicio de pagos.
+
+Levanta la aplicacion FastAPI en el mismo proceso (PASARELA_ACTIVA=mock)
+y reemplaza n8n, el backend REST y el receptor de un partner por
+servidores ASGI locales que responden 200. Ejecuta tres escenarios:
+
+  - cola: churn de la cola con prioridad (agregar, posicion, siguiente)
+  - suscripciones: alta de suscripciones (notifica al partner y al REST)
+  - webhooks: rafagas de webhooks de pasarela, externos y de partner
+    firmados como generar_firma_webhook.py
+
+Reporta throughput por escenario y p50/p95/p99 por endpoint, y guarda el
+resultado en benchmarks/resultados/ para comparar entre commits.
+
+Uso (desde microservicios/payment):
+    PYTHONPATH=. python benchmarks/carga_pagos.py
+    PYTHONPATH=. python benchmarks/carga_pagos.py --operaciones 5000 --concurrencia 100
+    PYTHONPATH=. python benchmarks/carga_pagos.py --comparar benchmarks/resultados/anterior.json
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import uvicorn
+
+DIRECTORIO_RESULTADOS = Path(__file__).parent / "resultados"
+
+
+# ========== RECEPTORES LOCALES ==========
+
+class Receptor:
+    """Servidor ASGI minimo que responde 200 y cuenta las requests."""
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self.recibidas = 0
+        self.puerto = 0
+        self._servidor: Optional[uvicorn.Server] = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                mensaje = await receive()
+                if mensaje["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif mensaje["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        mas = True
+        while mas:
+            mensaje = await receive()
+            mas = mensaje.get("more_body", False)
+        self.recibidas += 1
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b'{"ok":true}'})
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.puerto}"
+
+    def iniciar(self) -> None:
+        """Arranca uvicorn en un hilo sobre un puerto libre."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(("127.0.0.1", 0))
+        self.puerto = sock.getsockname()[1]
+        config = uvicorn.Config(self, log_level="warning", access_log=False)
+        self._servidor = uvicorn.Server(config)
+        threading.Thread(target=self._servidor.run, kwargs={"sockets": [sock]}, daemon=True).start()
+        while not self._servidor.started:
+            time.sleep(0.01)
+
+    def detener(self) -> None:
+        if self._servidor is not None:
+            self._servidor.should_exit = True
+
+
+def configurar_entorno(receptores: Dict[str, Receptor]) -> None:
+    """Variables de entorno leidas por app.config al importarse."""
+    os.environ.update({
+        "PASARELA_ACTIVA": "mock",
+        "DEBUG": "true",
+        "LOG_NIVEL": "WARNING",
+        "LOG_REQUESTS_MUESTREO": "0",
+        "N8N_WEBHOOK_URL": f"{receptores['n8n'].url}/webhook/payment-webhook",
+        "REST_API_URL": receptores["rest"].url,
+        "WEBHOOK_REINTENTOS": "1",
+    })
+
+
+# ========== MEDICION ==========
+
+class Medidor:
+    """Latencias por endpoint (plantilla de ruta) y errores."""
+
+    def __init__(self):
+        self.latencias: Dict[str, List[float]] = defaultdict(list)
+        self.errores: Dict[str, int] = defaultdict(int)
+
+    async def medir(self, endpoint: str, peticion) -> Optional[httpx.Response]:
+        inicio = time.perf_counter()
+        try:
+            respuesta = await peticion
+        except Exception:
+            self.errores[endpoint] += 1
+            return None
+        self.latencias[endpoint].append((time.perf_counter() - inicio) * 1000)
+        if respuesta.status_code >= 400:
+            self.errores[endpoint] += 1
+        return respuesta
+
+
+def percentil(ordenadas: List[float], p: float) -> float:
+    if not ordenadas:
+        return 0.0
+    indice = min(len(ordenadas) - 1, max(0, int(round(p / 100 * len(ordenadas) + 0.5)) - 1))
+    return ordenadas[indice]
+
+
+def resumir(medidor: Medidor, duracion_s: float) -> Dict[str, Any]:
+    endpoints = {}
+    total = 0
+    for endpoint, valores in sorted(medidor.latencias.items()):
+        ordenadas = sorted(valores)
+        total += len(ordenadas)
+        endpoints[endpoint] = {
+            "requests": len(ordenadas),
+            "errores": medidor.errores.get(endpoint, 0),
+            "rps": round(len(ordenadas) / duracion_s, 1) if duracion_s else 0.0,
+            "p50_ms": round(percentil(ordenadas, 50), 3),
+            "p95_ms": round(percentil(ordenadas, 95), 3),
+            "p99_ms": round(percentil(ordenadas, 99), 3),
+            "max_ms": round(ordenadas[-1], 3) if ordenadas else 0.0
+        }
+    return {
+        "duracion_s": round(duracion_s, 3),
+        "requests": total,
+        "rps": round(total / duracion_s, 1) if duracion_s else 0.0,
+        "endpoints": endpoints
+    }
+
+
+async def en_paralelo(total: int, concurrencia: int, tarea: Callable[[int], Any]) -> float:
+    """Ejecuta tarea(i) para i en [0, total) con concurrencia acotada."""
+    indices = iter(range(total))
+
+    async def trabajador():
+        for i in indices:
+            await tarea(i)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+    return time.perf_counter() - inicio
+
+
+# ========== ESCENARIOS ==========
+
+def firmar(payload: Dict[str, Any], secreto: str) -> Tuple[bytes, Dict[str, str]]:
+    """Firma igual que generar_firma_webhook.py (timestamp + "." + body)."""
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    timestamp = int(time.time())
+    firma = hmac.new(secreto.encode(), f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+    return body, {
+        "Content-Type": "application/json",
+        "X-Webhook-Signature": firma,
+        "X-Webhook-Timestamp": str(timestamp)
+    }
+
+
+async def escenario_cola(cliente: httpx.AsyncClient, operaciones: int, concurrencia: int) -> Dict[str, Any]:
+    medidor = Medidor()
+    negocios = [f"neg_{i}" for i in range(20)]
+
+    async def paso(i: int) -> None:
+        negocio = negocios[i % len(negocios)]
+        cita = f"cita_{i}_{uuid.uuid4().hex[:6]}"
+        await medidor.medir("POST /cola/agregar", cliente.post("/cola/agregar", json={
+            "cita_id": cita,
+            "negocio_id": negocio,
+            "usuario_id": f"usr_{i}",
+            "es_premium": i % 4 == 0
+        }))
+        await medidor.medir("GET /cola/posicion/{cita_id}", cliente.get(f"/cola/posicion/{cita}"))
+        if i % 2:
+            await medidor.medir("GET /cola/siguiente/{negocio_id}", cliente.get(f"/cola/siguiente/{negocio}"))
+
+    duracion = await en_paralelo(operaciones, concurrencia, paso)
+    return resumir(medidor, duracion)
+
+
+async def escenario_suscripciones(cliente: httpx.AsyncClient, operaciones: int, concurrencia: int) -> Dict[str, Any]:
+    medidor = Medidor()
+    prefijo = uuid.uuid4().hex[:6]
+
+    async def paso(i: int) -> None:
+        usuario = f"usr_{prefijo}_{i}"
+        await medidor.medir("POST /suscripciones", cliente.post("/suscripciones", json={
+            "usuario_id": usuario,
+            "con_prueba_gratis": i % 2 == 0,
+            "email": f"{usuario}@ejemplo.com"
+        }))
+        await medidor.medir(
+            "GET /suscripciones/usuario/{usuario_id}/verificar",
+            cliente.get(f"/suscripciones/usuario/{usuario}/verificar")
+        )
+
+    duracion = await en_paralelo(operaciones, concurrencia, paso)
+    return resumir(medidor, duracion)
+
+
+async def escenario_webhooks(
+    cliente: httpx.AsyncClient,
+    operaciones: int,
+    concurrencia: int,
+    partner_id: str,
+    secreto_partner: str
+) -> Dict[str, Any]:
+    medidor = Medidor()
+
+    async def paso(i: int) -> None:
+        tipo = i % 3
+        if tipo == 0:
+            await medidor.medir("POST /webhooks/mock", cliente.post("/webhooks/mock", json={
+                "id": f"evt_{i}",
+                "type": "payment.success",
+                "data": {"payment_id": f"pay_{i}", "amount": 29.99, "currency": "USD"}
+            }))
+        elif tipo == 1:
+            body, headers = firmar({
+                "event_type": "booking.confirmed",
+                "data": {"reserva_id": f"res_{i}", "negocio_id": "neg_1"}
+            }, secreto_partner)
+            await medidor.medir(
+                "POST /webhooks/partners/{partner_id}",
+                cliente.post(f"/webhooks/partners/{partner_id}", content=body, headers=headers)
+            )
+        else:
+            body, headers = firmar({
+                "origen": "benchmark",
+                "tipo_evento": "external.service",
+                "datos": {"n": i}
+            }, secreto_partner)
+            headers["X-Partner-ID"] = partner_id
+            await medidor.medir("POST /webhooks/external", cliente.post("/webhooks/external", content=body, headers=headers))
+
+    duracion = await en_paralelo(operaciones, concurrencia, paso)
+    return resumir(medidor, duracion)
+
+
+# ========== EJECUCION ==========
+
+async def ejecutar(args: argparse.Namespace, receptores: Dict[str, Receptor]) -> Dict[str, Any]:
+    import app.webhooks  # noqa: F401  (orden de imports igual que main)
+    from main import app
+    from app.modelos.partner import RegistrarPartnerRequest, TipoEvento
+    from app.partners.servicio import ServicioPartners
+
+    resultados: Dict[str, Any] = {}
+    async with app.router.lifespan_context(app):
+        partner = await ServicioPartners.registrar_partner(RegistrarPartnerRequest(
+            nombre=f"benchmark-{uuid.uuid4().hex[:6]}",
+            webhook_url=f"{receptores['partner'].url}/webhook",
+            eventos_suscritos=[TipoEvento.SUBSCRIPTION_CREATED, TipoEvento.PAYMENT_SUCCESS]
+        ))
+
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://payment") as cliente:
+            escenarios = {
+                "cola": lambda: escenario_cola(cliente, args.operaciones, args.concurrencia),
+                "suscripciones": lambda: escenario_suscripciones(cliente, args.operaciones, args.concurrencia),
+                "webhooks": lambda: escenario_webhooks(
+                    cliente, args.operaciones, args.concurrencia,
+                    partner.id, partner.hmac_secret
+                )
+            }
+            for nombre in args.escenarios:
+                print(f"▶ {nombre}...", file=sys.stderr)
+                resultados[nombre] = await escenarios[nombre]()
+
+    resultados["receptores"] = {nombre: r.recibidas for nombre, r in receptores.items()}
+    return resultados
+
+
+def commit_actual() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def imprimir(resultados: Dict[str, Any], anterior: Optional[Dict[str, Any]]) -> None:
+    for escenario, datos in resultados["escenarios"].items():
+        if not isinstance(datos, dict) or "endpoints" not in datos:
+            continue
+        print(f"\n{escenario}: {datos['requests']} requests en {datos['duracion_s']}s ({datos['rps']} req/s)")
+        print(f"  {'endpoint':<48} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>5}")
+        for endpoint, e in datos["endpoints"].items():
+            linea = (f"  {endpoint:<48} {e['rps']:>8} {e['p50_ms']:>8.2f} "
+                     f"{e['p95_ms']:>8.2f} {e['p99_ms']:>8.2f} {e['errores']:>5}")
+            previo = (anterior or {}).get("escenarios", {}).get(escenario, {}).get("endpoints", {}).get(endpoint)
+            if previo and previo["p95_ms"]:
+                linea += f"   p95 {((e['p95_ms'] / previo['p95_ms']) - 1) * 100:+.1f}%"
+            print(linea)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--operaciones", type=int, default=2000, help="Operaciones por escenario")
+    parser.add_argument("--concurrencia", type=int, default=50, help="Clientes concurrentes")
+    parser.add_argument("--escenarios", nargs="+", default=["cola", "suscripciones", "webhooks"],
+                        choices=["cola", "suscripciones", "webhooks"])
+    parser.add_argument("--salida", type=Path, help="Archivo JSON de resultados")
+    parser.add_argument("--comparar", type=Path, help="JSON de una corrida anterior")
+    args = parser.parse_args()
+
+    receptores = {nombre: Receptor(nombre) for nombre in ("n8n", "rest", "partner")}
+    for receptor in receptores.values():
+        receptor.iniciar()
+    configurar_entorno(receptores)
+
+    try:
+        escenarios = asyncio.run(ejecutar(args, receptores))
+    finally:
+        for receptor in receptores.values():
+            receptor.detener()
+
+    commit = commit_actual()
+    resultados = {
+        "fecha": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "parametros": {
+            "operaciones": args.operaciones,
+            "concurrencia": args.concurrencia,
+            "escenarios": args.escenarios
+        },
+        "escenarios": escenarios
+    }
+
+    anterior = json.loads(args.comparar.read_text()) if args.comparar else None
+    imprimir(resultados, anterior)
+
+    salida = args.salida
+    if salida is None:
+        DIRECTORIO_RESULTADOS.mkdir(exist_ok=True)
+        marca = datetime.now().strftime("%Y%m%d-%H%M%S")
+        salida = DIRECTORIO_RESULTADOS / f"{marca}-{commit or 'sin-commit'}.json"
+    salida.write_text(json.dumps(resultados, indent=2))
+    print(f"\nResultados guardados en {salida}")
+
+
+if __name__ == "__main__":
+    main()
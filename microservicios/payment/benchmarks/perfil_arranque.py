@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Perfil de arranque del microservicio de pagos: tiempo de import y RSS.
+
+Cada medicion corre en un proceso nuevo (import en frio) y reporta:
+  - import: importar main (la app completa, sin lifespan)
+  - pasarela: obtener el adaptador e inicializar su SDK; sin precalentar
+    esto lo paga el primer pago, con PASARELA_PRECALENTAR lo paga el lifespan
+  - RSS maximo tras cada fase
+
+Con --comparar-con <rev> mide tambien el arbol de ese commit (extraido con
+git archive a un directorio temporal) para ver el antes y el despues.
+
+Uso (desde microservicios/payment):
+    PYTHONPATH=. python benchmarks/perfil_arranque.py
+    PYTHONPATH=. python benchmarks/perfil_arranque.py --pasarela stripe --comparar-con HEAD~1
+    PYTHONPATH=. python benchmarks/perfil_arranque.py --detalle   # top de -X importtime
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+# Se ejecuta en el proceso hijo; solo usa API presente antes y despues del cambio
+CODIGO_HIJO = r"""
+import json, resource, sys, time
+inicio = time.perf_counter()
+import app.webhooks, main
+importado = time.perf_counter()
+rss_import = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+from app.adaptador import obtener_adaptador
+adaptador = obtener_adaptador(sys.argv[1])
+for metodo in ("_inicializar_stripe", "_inicializar_sdk"):
+    if hasattr(adaptador, metodo):
+        getattr(adaptador, metodo)()
+cargado = time.perf_counter()
+print(json.dumps({
+    "import_ms": (importado - inicio) * 1000,
+    "pasarela_ms": (cargado - importado) * 1000,
+    "rss_import_mb": rss_import / 1024,
+    "rss_pasarela_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "sdks": sorted(m for m in ("stripe", "mercadopago") if m in sys.modules)
+}))
+"""
+
+
+def entorno(pasarela: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "DEBUG": "true",
+        "PASARELA_ACTIVA": pasarela,
+        "STRIPE_SECRET_KEY": env.get("STRIPE_SECRET_KEY", "sk_test_perfil"),
+        "MERCADOPAGO_ACCESS_TOKEN": env.get("MERCADOPAGO_ACCESS_TOKEN", "TEST-perfil")
+    })
+    return env
+
+
+def medir(directorio: Path, pasarela: str, repeticiones: int) -> Dict[str, float]:
+    """Mediana de varias corridas en frio."""
+    env = entorno(pasarela)
+    env["PYTHONPATH"] = str(directorio)
+    corridas: List[dict] = []
+    for _ in range(repeticiones):
+        salida = subprocess.run(
+            [sys.executable, "-c", CODIGO_HIJO, pasarela],
+            cwd=directorio, env=env, capture_output=True, text=True, check=True
+        )
+        corridas.append(json.loads(salida.stdout.strip().splitlines()[-1]))
+    resultado = {
+        clave: statistics.median(c[clave] for c in corridas)
+        for clave in ("import_ms", "pasarela_ms", "rss_import_mb", "rss_pasarela_mb")
+    }
+    resultado["sdks"] = corridas[-1]["sdks"]
+    return resultado
+
+
+def detalle_importtime(directorio: Path, pasarela: str, top: int) -> None:
+    """Modulos con mayor tiempo propio de import segun -X importtime."""
+    env = entorno(pasarela)
+    env["PYTHONPATH"] = str(directorio)
+    salida = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.webhooks, main"],
+        cwd=directorio, env=env, capture_output=True, text=True, check=True
+    )
+    filas = []
+    for linea in salida.stderr.splitlines():
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, acumulado, modulo = linea[len("import time:"):].split("|")
+        filas.append((int(propio), int(acumulado), modulo.strip()))
+    print(f"\nTop {top} por tiempo propio de import:")
+    for propio, acumulado, modulo in sorted(filas, reverse=True)[:top]:
+        print(f"  {propio / 1000:8.1f} ms  (acum. {acumulado / 1000:8.1f} ms)  {modulo}")
+
+
+def extraer_revision(revision: str, destino: Path) -> Path:
+    """Extrae microservicios/payment de una revision de git en destino."""
+    raiz_git = Path(subprocess.run(
+        ["git", "rev-parse", "--show-toplevel"], cwd=RAIZ, capture_output=True, text=True, check=True
+    ).stdout.strip())
+    ruta = RAIZ.relative_to(raiz_git).as_posix()
+    archivo = destino / "arbol.tar"
+    with open(archivo, "wb") as tar:
+        subprocess.run(["git", "archive", revision, ruta], cwd=raiz_git, stdout=tar, check=True)
+    with tarfile.open(archivo) as tar:
+        tar.extractall(destino)
+    return destino / ruta
+
+
+def imprimir(etiqueta: str, datos: Dict[str, float], base: Optional[Dict[str, float]] = None) -> None:
+    def delta(clave: str) -> str:
+        if base is None:
+            return ""
+        return f" ({datos[clave] - base[clave]:+.1f})"
+
+    print(f"\n{etiqueta}")
+    print(f"  import de la app : {datos['import_ms']:8.1f} ms{delta('import_ms')}")
+    print(f"  carga pasarela   : {datos['pasarela_ms']:8.1f} ms{delta('pasarela_ms')}")
+    print(f"  RSS tras import  : {datos['rss_import_mb']:8.1f} MB{delta('rss_import_mb')}")
+    print(f"  RSS tras pasarela: {datos['rss_pasarela_mb']:8.1f} MB{delta('rss_pasarela_mb')}")
+    print(f"  SDKs cargados    : {', '.join(datos['sdks']) or '-'}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pasarela", default="mock", choices=("mock", "stripe", "mercadopago"))
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--comparar-con", metavar="REV", help="Revision de git a medir como referencia")
+    parser.add_argument("--detalle", action="store_true", help="Mostrar el top de -X importtime")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    print(f"Pasarela: {args.pasarela}, {args.repeticiones} corridas en frio (mediana)")
+    base = None
+    if args.comparar_con:
+        with tempfile.TemporaryDirectory() as temporal:
+            directorio = extraer_revision(args.comparar_con, Path(temporal))
+            base = medir(directorio, args.pasarela, args.repeticiones)
+        imprimir(f"Referencia ({args.comparar_con})", base)
+
+    actual = medir(RAIZ, args.pasarela, args.repeticiones)
+    imprimir("Arbol actual", actual, base)
+
+    if args.detalle:
+        detalle_importtime(RAIZ, args.pasarela, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -48,7 +48,7 @@ print()
 print("📋 Headers a enviar:")
 print(f"   X-Webhook-Signature: {firma}")
 print(f"   X-Webhook-Timestamp: {timestamp}")
-print(f"   X-Partner-ID: {PARTNER_ID} (opcional)")
+print(f"   X-Partner-ID: {PARTNER_ID} (requerido)")
 print()
 print("🌐 URL del endpoint:")
 print(f"   POST http://localhost:8002/webhooks/partners/{PARTNER_ID}")
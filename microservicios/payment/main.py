@@ -4,7 +4,8 @@ Microservicio de Pagos - Virtual Queue CMS
 Sistema de pagos con abstraccion de pasarela, webhooks B2B y suscripciones premium.
 """
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 import json
 import os
@@ -21,6 +22,14 @@ from app.controladores import (
 )
 from app.partners.almacen import AlmacenPartners, PartnerData
 from app.modelos.partner import TipoEvento
+from app.adaptador import AdaptadorFactory
+from app.webhooks.procesador import ProcesadorWebhooks
+from app.webhooks.cola_ingesta import get_cola_ingesta
+from app.servicios.n8n_event_bus import get_n8n_client
+from app.registro import configurar_logging, detener_logging
+from app.registro_requests import RegistroRequestsMiddleware, metricas_requests
+from app.seguridad.hmac_auth import HMACMiddleware
+from app.metricas import metricas
 
 
 def registrar_partners_configurados():
@@ -61,6 +70,7 @@ async def lifespan(app: FastAPI):
     Gestiona el ciclo de vida de la aplicacion.
     """
     # Startup
+    configurar_logging()
     print("Iniciando Microservicio de Pagos...")
     
     # Validar configuracion
@@ -71,16 +81,31 @@ async def lifespan(app: FastAPI):
         raise
     
     print(f"Pasarela activa: {configuracion.PASARELA_ACTIVA}")
+    if configuracion.PASARELA_PRECALENTAR:
+        # El SDK se importa aqui y no en el primer pago
+        AdaptadorFactory.precalentar()
+    if configuracion.PASARELA_ACTIVA == "enrutado":
+        AdaptadorFactory.obtener().iniciar_sondeo()
     print(f"Precio suscripcion: ${configuracion.PRECIO_SUSCRIPCION_MENSUAL}")
     print(f"Dias de prueba: {configuracion.DIAS_PRUEBA_GRATIS}")
     
     # Registrar partners configurados
     #registrar_partners_configurados()
     
+    # Workers de la cola de ingesta de webhooks
+    if configuracion.WEBHOOK_INGESTA_ASINCRONA:
+        await get_cola_ingesta().iniciar(ProcesadorWebhooks.despachar_evento)
+        print(f"Cola de ingesta de webhooks activa ({configuracion.WEBHOOK_COLA_WORKERS} workers)")
+    
     yield
     
     # Shutdown
     print("Cerrando Microservicio de Pagos...")
+    if configuracion.PASARELA_ACTIVA == "enrutado":
+        await AdaptadorFactory.obtener().detener_sondeo()
+    await get_cola_ingesta().detener()
+    await get_n8n_client().cerrar()
+    detener_logging()
 
 
 app = FastAPI(
@@ -104,6 +129,13 @@ app = FastAPI(
 origins_str = os.getenv("ALLOWED_ORIGINS", "*")
 allowed_origins = origins_str.split(",") if origins_str != "*" else ["*"]
 
+# Firma HMAC por partner de los webhooks B2B (dentro de CORS para no
+# interceptar los preflight)
+app.add_middleware(
+    HMACMiddleware,
+    rutas_protegidas=["/webhooks/external", "/webhooks/partners/"],
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
@@ -112,17 +144,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Middleware para debugging
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    """Log de requests para debugging."""
-    if request.url.path.startswith("/suscripciones"):
-        body = await request.body()
-        print(f"[DEBUG] {request.method} {request.url.path}")
-        print(f"[DEBUG] Headers: {dict(request.headers)}")
-        print(f"[DEBUG] Body: {body.decode() if body else 'empty'}")
-    response = await call_next(request)
-    return response
+# Registro muestreado de requests y latencia por ruta
+app.add_middleware(RegistroRequestsMiddleware)
 
 # Incluir routers
 app.include_router(pagos_router)
@@ -162,4 +185,28 @@ async def health_check():
         "service": "payment-service",
         "version": "1.0.0",
         "pasarela": configuracion.PASARELA_ACTIVA
-    }
\ No newline at end of file
+    }
+
+
+@app.get("/health/requests")
+async def estadisticas_requests():
+    """Latencia (p50/p95/p99) y conteo de status por ruta."""
+    return {"rutas": metricas_requests.estadisticas()}
+
+
+# Estado de la cola de ingesta (se lee al exportar, sin costo por request)
+metricas.registrar_recolector(lambda: get_cola_ingesta().metricas_prometheus())
+# Circuito y puntaje de cada pasarela del enrutador
+metricas.registrar_recolector(
+    lambda: AdaptadorFactory.obtener().metricas_prometheus()
+    if configuracion.PASARELA_ACTIVA == "enrutado" else []
+)
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def exportar_metricas():
+    """Metricas en formato de texto de Prometheus."""
+    return PlainTextResponse(
+        metricas.exportar(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,174 @@
+"""
+Pruebas del enrutador de pasarelas (app/adaptador/enrutador.py) con
+MockAdapter: promedios moviles, circuito y failover segun el tipo de fallo.
+
+Uso (desde microservicios/payment):
+    python -m pytest tests
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.adaptador.enrutador import ALFA, AdaptadorEnrutado, EstadoPasarela
+from app.adaptador.mock_adapter import MockAdapter
+
+
+def crear_enrutador(*adaptadores: MockAdapter, fallos_para_abrir: int = 3) -> AdaptadorEnrutado:
+    return AdaptadorEnrutado(
+        list(adaptadores), timeout_segundos=1.0, fallos_para_abrir=fallos_para_abrir,
+        enfriamiento_segundos=60.0, intervalo_sondeo=60.0
+    )
+
+
+def pagar(enrutador: AdaptadorEnrutado):
+    return asyncio.run(enrutador.crear_pago(10.0, "USD", "prueba"))
+
+
+@pytest.fixture
+def primaria_y_respaldo():
+    """Dos pasarelas con la primaria adelante en el orden de enrutamiento."""
+    primaria, respaldo = MockAdapter("primaria"), MockAdapter("respaldo")
+    enrutador = crear_enrutador(primaria, respaldo)
+    enrutador._estados["primaria"].latencia_ms = 10.0
+    enrutador._estados["respaldo"].latencia_ms = 100.0
+    return enrutador, primaria, respaldo
+
+
+# --- Promedios moviles y puntaje ---
+
+def test_latencia_ewma():
+    estado = EstadoPasarela()
+    AdaptadorEnrutado._observar_latencia(estado, 100.0)
+    assert estado.latencia_ms == 100.0
+    AdaptadorEnrutado._observar_latencia(estado, 200.0)
+    assert estado.latencia_ms == pytest.approx(100.0 + ALFA * 100.0)
+
+
+def test_tasa_error_ewma(primaria_y_respaldo):
+    enrutador, primaria, _ = primaria_y_respaldo
+    estado = enrutador._estados["primaria"]
+    primaria.tasa_rechazo = 1.0
+    pagar(enrutador)
+    assert estado.tasa_error == pytest.approx(ALFA)
+    primaria.tasa_rechazo = 0.0
+    pagar(enrutador)
+    assert estado.tasa_error == pytest.approx(ALFA * (1 - ALFA))
+
+
+def test_orden_por_puntaje():
+    enrutador = crear_enrutador(MockAdapter("a"), MockAdapter("b"))
+    enrutador._estados["a"].latencia_ms = 50.0
+    enrutador._estados["b"].latencia_ms = 20.0
+    assert enrutador.orden() == ["b", "a"]
+    # Mas rapida pero con errores: la penalizacion la manda atras
+    enrutador._estados["b"].tasa_error = 0.5
+    assert enrutador.orden() == ["a", "b"]
+
+
+# --- Circuito ---
+
+def test_circuito_se_abre_tras_fallos_seguidos(primaria_y_respaldo):
+    enrutador, primaria, _ = primaria_y_respaldo
+    primaria.tasa_rechazo = 1.0
+    for _ in range(enrutador.fallos_para_abrir - 1):
+        pagar(enrutador)
+        assert enrutador.estado()["pasarelas"]["primaria"]["circuito"] == "cerrado"
+    pagar(enrutador)
+    assert enrutador.estado()["pasarelas"]["primaria"]["circuito"] == "abierto"
+    assert enrutador.orden() == ["respaldo", "primaria"]
+
+
+def test_circuito_semiabierto_tras_enfriamiento(primaria_y_respaldo):
+    enrutador, primaria, _ = primaria_y_respaldo
+    primaria.tasa_rechazo = 1.0
+    for _ in range(enrutador.fallos_para_abrir):
+        pagar(enrutador)
+    estado = enrutador._estados["primaria"]
+    estado.abierto_hasta = time.monotonic() - 1
+    assert enrutador.estado()["pasarelas"]["primaria"]["circuito"] == "semiabierto"
+
+    # Un nuevo fallo la vuelve a abrir sin esperar otros tres
+    estado.latencia_ms = 0.0
+    pagar(enrutador)
+    assert enrutador.estado()["pasarelas"]["primaria"]["circuito"] == "abierto"
+
+    # Un exito la cierra
+    estado.abierto_hasta = time.monotonic() - 1
+    estado.latencia_ms = 0.0
+    primaria.tasa_rechazo = 0.0
+    assert pagar(enrutador).metadatos["pasarela"] == "primaria"
+    assert enrutador.estado()["pasarelas"]["primaria"]["circuito"] == "cerrado"
+
+
+def test_sonda_rehabilita(primaria_y_respaldo):
+    enrutador, primaria, _ = primaria_y_respaldo
+    primaria.tasa_rechazo = 1.0
+    for _ in range(enrutador.fallos_para_abrir):
+        pagar(enrutador)
+    assert not asyncio.run(enrutador._sondear("primaria"))
+
+    primaria.tasa_rechazo = 0.0
+    assert asyncio.run(enrutador._sondear("primaria"))
+    estado = enrutador._estados["primaria"]
+    assert enrutador.estado()["pasarelas"]["primaria"]["circuito"] == "cerrado"
+    assert estado.tasa_error == 0.0
+
+
+# --- Failover segun el tipo de fallo ---
+
+def test_fallo_definitivo_pasa_a_la_siguiente(primaria_y_respaldo):
+    enrutador, primaria, _ = primaria_y_respaldo
+    primaria.tasa_rechazo = 1.0
+    resultado = pagar(enrutador)
+    assert resultado.exitoso
+    assert resultado.metadatos["pasarela"] == "respaldo"
+    assert enrutador.pasarela_de(resultado.id_transaccion) == "respaldo"
+    assert enrutador._estados["primaria"].fallos == 1
+
+
+def test_fallo_incierto_no_reintenta(primaria_y_respaldo):
+    enrutador, primaria, _ = primaria_y_respaldo
+    primaria.tasa_fallo = 1.0
+    resultado = pagar(enrutador)
+    assert not resultado.exitoso
+    assert resultado.incierto
+    assert resultado.metadatos["pasarela"] == "primaria"
+    assert enrutador._estados["respaldo"].llamadas == 0
+
+
+def test_timeout_es_incierto(primaria_y_respaldo):
+    enrutador, primaria, _ = primaria_y_respaldo
+    enrutador.timeout = 0.01
+    primaria.retardo_segundos = 0.1
+    resultado = pagar(enrutador)
+    assert resultado.incierto
+    assert enrutador._estados["respaldo"].llamadas == 0
+
+
+def test_todas_rechazan(primaria_y_respaldo):
+    enrutador, primaria, respaldo = primaria_y_respaldo
+    primaria.tasa_rechazo = respaldo.tasa_rechazo = 1.0
+    resultado = pagar(enrutador)
+    assert not resultado.exitoso
+    assert not resultado.incierto
+    assert "primaria" in resultado.error and "respaldo" in resultado.error
+
+
+# --- Webhooks ---
+
+def test_webhook_se_delega_a_la_pasarela_de_los_metadatos(primaria_y_respaldo):
+    enrutador, primaria, _ = primaria_y_respaldo
+    pago = pagar(enrutador)
+    assert primaria._pagos[pago.id_transaccion]["metadatos"]["pasarela"] == "primaria"
+
+    payload = {"id": "evt_1", "type": "payment.completed", "data": {"metadata": {"pasarela": "respaldo"}}}
+    assert enrutador.pasarela_del_webhook(payload) == "respaldo"
+    assert enrutador.normalizar_webhook(payload)["evento_original"] == "payment.completed"
+
+
+def test_webhook_sin_pasarela(primaria_y_respaldo):
+    enrutador, _, _ = primaria_y_respaldo
+    with pytest.raises(ValueError):
+        enrutador.normalizar_webhook({"type": "payment.completed", "data": {}})
+    assert not enrutador.verificar_firma_webhook(b'{"type": "payment.completed"}', "firma", "secreto")